@@ -0,0 +1,61 @@
+"""get_market_snapshot over whole-market symbol lists against the fake OpenD
+
+The fake OpenD rejects snapshot requests above 400 codes like OpenD does.
+For each list length in ``--sizes`` the tool is called once with chunking
+effectively disabled (one request with every code) and once with the
+default chunk size, reporting rows returned, OpenD requests and wall time.
+Caches are disabled so every call goes to OpenD.
+
+Usage:
+    python benchmarks/bench_chunking.py [--sizes 100 400 1000 3000] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 400, 1000, 3000])
+    parser.add_argument('--latency-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_FAKE_LATENCY_MS': str(args.latency_ms),
+        'FUTU_FAKE_UNIVERSE': str(max(args.sizes)),
+        'FUTU_SNAPSHOT_CACHE_TTL': '0',
+        'FUTU_KLINE_STORE_DIR': '',
+    })
+    from futu_stock_mcp_server import server
+    from futu_stock_mcp_server.fake_opend import default_opend
+
+    opend = default_opend()
+    default_chunk = server.chunk_sizes['get_market_snapshot']
+    server.init_quote_connection()
+    server.quote_pool.wait_ready(10)
+    print(f"{'symbols':>8} {'chunk':>7} {'rows':>6} {'requests':>9} {'total ms':>9}  error")
+    try:
+        for size in args.sizes:
+            symbols = opend.codes('HK')[:size]
+            for chunk in (size, default_chunk):
+                server.chunk_sizes['get_market_snapshot'] = chunk
+                before = opend.stats()['calls'].get('get_market_snapshot', 0)
+                started = time.perf_counter()
+                result = asyncio.run(server.get_market_snapshot.fn(symbols,
+                                                                   response_format='compact'))
+                elapsed = (time.perf_counter() - started) * 1000
+                requests = opend.stats()['calls'].get('get_market_snapshot', 0) - before
+                rows = len(result['snapshot_list']['rows']) if 'snapshot_list' in result else 0
+                print(f"{size:>8} {chunk:>7} {rows:>6} {requests:>9} {elapsed:>9.0f}  "
+                      f"{result.get('error', '')}")
+    finally:
+        server.cleanup_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Concurrent identical tool calls against the fake OpenD, with and without call coalescing
+
+``--callers`` MCP calls with the same tool and arguments are sent at once,
+``--waves`` times in a row, through an in-process client so they pass the
+server's middleware. Response caches are disabled so every call that is
+not coalesced reaches OpenD. Reported are the OpenD requests made, the
+latency per call and the wall time, once with the coalescing middleware
+removed and once with it in place.
+
+Usage:
+    python benchmarks/bench_coalescing.py [--callers 50] [--waves 10] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from fastmcp import Client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+def scenarios():
+    today = datetime.now().date()
+    return [
+        ('get_market_snapshot', {'symbols': ['HK.00700']}, 'get_market_snapshot'),
+        ('get_option_chain',
+         {'symbol': 'US.AAPL', 'start': str(today), 'end': str(today + timedelta(days=30))},
+         'get_option_chain'),
+    ]
+
+
+async def burst(server, tool, arguments, callers: int, waves: int):
+    latencies = []
+    errors = 0
+    async with Client(server.mcp) as client:
+        async def one():
+            started = time.perf_counter()
+            result = await client.call_tool_mcp(tool, arguments)
+            latencies.append((time.perf_counter() - started) * 1000)
+            return result.isError
+
+        started = time.perf_counter()
+        for _ in range(waves):
+            errors += sum(await asyncio.gather(*(one() for _ in range(callers))))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--callers', type=int, default=50)
+    parser.add_argument('--waves', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_FAKE_LATENCY_MS': str(args.latency_ms),
+        'FUTU_SNAPSHOT_CACHE_TTL': '0',
+        'FUTU_QUOTE_CACHE_TTL': '0',
+        'FUTU_RATE_LIMITS': 'get_market_snapshot=0,get_option_chain=0',
+        'FUTU_KLINE_STORE_DIR': '',
+    })
+    from futu_stock_mcp_server import server
+    from futu_stock_mcp_server.fake_opend import default_opend
+
+    opend = default_opend()
+    server.init_quote_connection()
+    server.quote_pool.wait_ready(10)
+    print(f"{'tool':<20} {'coalescing':<10} {'calls':>6} {'errors':>6} {'OpenD':>6} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'total s':>8}")
+    try:
+        for tool, arguments, method in scenarios():
+            for enabled in (False, True):
+                if enabled:
+                    server.mcp.add_middleware(server.coalescing)
+                else:
+                    server.mcp.middleware.remove(server.coalescing)
+                before = opend.stats()['calls'].get(method, 0)
+                latencies, errors, elapsed = asyncio.run(
+                    burst(server, tool, arguments, args.callers, args.waves))
+                requests = opend.stats()['calls'].get(method, 0) - before
+                p50, p99 = np.percentile(latencies, [50, 99])
+                state = 'on' if enabled else 'off'
+                print(f"{tool:<20} {state:<10} {len(latencies):>6} {errors:>6} "
+                      f"{requests:>6} {p50:>8.1f} {p99:>8.1f} {elapsed:>8.2f}")
+    finally:
+        server.cleanup_all()
+
+
+if __name__ == '__main__':
+    main()
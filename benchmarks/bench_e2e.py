@@ -0,0 +1,261 @@
+"""Drive the MCP tools end-to-end over streamable-http against the fake OpenD
+
+Starts the server in a subprocess with FUTU_FAKE_OPEND=1 (or targets
+``--url``), opens ``--sessions`` concurrent MCP client sessions and, tool by
+tool, has every session issue ``--calls`` calls at once, cycling through
+``--symbols``. Latency is measured per call on the client, so it includes
+HTTP, JSON-RPC, the dispatcher and serialization. Calls/sec is the number
+of calls of a tool divided by the wall time of its phase. Results are
+printed as a table and written as JSON with ``--output``; ``--compare``
+prints the change against an earlier JSON result.
+
+Extra server settings are passed with ``--env``, e.g. ``--env
+FUTU_FAKE_LATENCY_MS=5 --env FUTU_QUOTE_POOL_SIZE=4``.
+
+Usage:
+    python benchmarks/bench_e2e.py [--sessions 8] [--calls 50] [--tools get_stock_quote get_ticker]
+        [--output result.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+from fastmcp import Client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_SCRIPT = (
+    "import sys; from futu_stock_mcp_server import server; "
+    "server.mcp.run(transport='streamable-http', host='127.0.0.1', port=int(sys.argv[1]))"
+)
+
+
+def tool_arguments(tool: str, symbol: str) -> dict[str, Any]:
+    """Arguments of one call of ``tool`` for ``symbol``"""
+    today = datetime.now().date()
+    return {
+        'get_stock_quote': {'symbols': [symbol]},
+        'get_market_snapshot': {'symbols': [symbol]},
+        'get_cur_kline': {'symbol': symbol, 'ktype': 'K_1M', 'count': 100},
+        'get_history_kline': {'symbol': symbol, 'ktype': 'K_DAY',
+                              'start': f'{today.year - 1}-01-01',
+                              'end': f'{today.year - 1}-12-31', 'count': 1000},
+        'get_rt_data': {'symbol': symbol},
+        'get_ticker': {'symbol': symbol},
+        'get_order_book': {'symbol': symbol},
+        'get_broker_queue': {'symbol': symbol},
+        'get_option_expiration_date': {'symbol': symbol},
+        'get_account_list': {},
+        'get_funds': {},
+        'get_positions': {},
+        'get_server_stats': {},
+    }[tool]
+
+
+DEFAULT_TOOLS = [
+    'get_stock_quote', 'get_market_snapshot', 'get_cur_kline', 'get_history_kline', 'get_rt_data',
+    'get_ticker', 'get_order_book', 'get_broker_queue', 'get_account_list', 'get_positions',
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, extra_env: dict[str, str], log_path: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_KLINE_STORE_DIR': os.path.join(os.path.dirname(log_path), 'kline'),
+        'PYTHONPATH': os.pathsep.join(filter(None, [os.path.join(ROOT, 'src'),
+                                                    env.get('PYTHONPATH')])),
+    })
+    env.update(extra_env)
+    with open(log_path, 'w') as log:
+        return subprocess.Popen([sys.executable, '-c', SERVER_SCRIPT, str(port)],
+                                env=env, stdout=log, stderr=subprocess.STDOUT, cwd=ROOT)
+
+
+async def wait_for_server(url: str, timeout: float, process: subprocess.Popen | None) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f'Server exited with code {process.returncode}')
+        try:
+            async with Client(url) as client:
+                await client.ping()
+                return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+def is_error(result: Any) -> bool:
+    if result.isError:
+        return True
+    text = result.content[0].text if result.content else ''
+    return text.lstrip().startswith('{') and '"error"' in text[:200]
+
+
+async def run_session(client: Client, tool: str, symbols: list[str], offset: int, calls: int,
+                      latencies: list[float]) -> int:
+    errors = 0
+    for i in range(calls):
+        arguments = tool_arguments(tool, symbols[(offset + i) % len(symbols)])
+        started = time.perf_counter()
+        result = await client.call_tool_mcp(tool, arguments)
+        latencies.append((time.perf_counter() - started) * 1000)
+        errors += is_error(result)
+    return errors
+
+
+async def run_tool(clients: list[Client], tool: str, symbols: list[str], calls: int,
+                   warmup: int) -> dict[str, Any]:
+    if warmup:
+        await asyncio.gather(*(run_session(c, tool, symbols, i, warmup, [])
+                               for i, c in enumerate(clients)))
+    latencies: list[float] = []
+    started = time.perf_counter()
+    errors = await asyncio.gather(*(run_session(c, tool, symbols, i * calls, calls, latencies)
+                                    for i, c in enumerate(clients)))
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'calls': len(latencies),
+        'errors': int(sum(errors)),
+        'calls_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'mean_ms': round(float(np.mean(latencies)), 2),
+        'max_ms': round(float(np.max(latencies)), 2),
+    }
+
+
+async def run(url: str, args: argparse.Namespace) -> dict[str, dict[str, Any]]:
+    clients = [Client(url, timeout=args.call_timeout) for _ in range(args.sessions)]
+    for client in clients:
+        await client.__aenter__()
+    try:
+        results = {}
+        for tool in args.tools:
+            results[tool] = await run_tool(clients, tool, args.symbols, args.calls, args.warmup)
+            print_row(tool, results[tool])
+        return results
+    finally:
+        for client in clients:
+            await client.__aexit__(None, None, None)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_header() -> None:
+    print(f"{'tool':<22} {'calls':>6} {'errors':>6} {'calls/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+
+def print_row(tool: str, r: dict[str, Any]) -> None:
+    print(f"{tool:<22} {r['calls']:>6} {r['errors']:>6} {r['calls_per_sec']:>8.1f} "
+          f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+def print_comparison(results: dict[str, dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nchange vs {baseline_path} ({baseline.get('revision')}):")
+    print(f"{'tool':<22} {'calls/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for tool, r in results.items():
+        old = baseline.get('tools', {}).get(tool)
+        if not old:
+            continue
+        change = {k: 100 * (r[k] - old[k]) / old[k] if old[k] else 0.0
+                  for k in ('calls_per_sec', 'p50_ms', 'p95_ms', 'p99_ms')}
+        print(f"{tool:<22} {change['calls_per_sec']:>+8.0f}% {change['p50_ms']:>+7.0f}% "
+              f"{change['p95_ms']:>+7.0f}% {change['p99_ms']:>+7.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--calls', type=int, default=50, help='Calls per session per tool')
+    parser.add_argument('--warmup', type=int, default=2,
+                        help='Untimed calls per session before each tool')
+    parser.add_argument('--tools', nargs='+', default=DEFAULT_TOOLS)
+    parser.add_argument('--symbols', nargs='+', default=[f'HK.{i:05d}' for i in range(1, 21)])
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting one')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Environment of the started server, may be repeated')
+    parser.add_argument('--startup-timeout', type=float, default=30)
+    parser.add_argument('--call-timeout', type=float, default=60)
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    parser.add_argument('--compare', help='Earlier JSON result to compare against')
+    args = parser.parse_args()
+
+    extra_env = dict(item.split('=', 1) for item in args.env)
+    process = None
+    workdir = tempfile.mkdtemp(prefix='futu-bench-')
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f'http://127.0.0.1:{port}/mcp/'
+        process = start_server(port, extra_env, os.path.join(workdir, 'server.log'))
+    try:
+        asyncio.run(wait_for_server(url, args.startup_timeout, process))
+        print_header()
+        results = asyncio.run(run(url, args))
+    except Exception:
+        if process is not None:
+            print(f"server log: {os.path.join(workdir, 'server.log')}", file=sys.stderr)
+        raise
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'sessions': args.sessions,
+            'calls': args.calls,
+            'warmup': args.warmup,
+            'symbols': len(args.symbols),
+            'url': args.url,
+            'env': extra_env,
+        },
+        'tools': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
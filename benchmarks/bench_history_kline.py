@@ -0,0 +1,101 @@
+"""Benchmark get_history_kline pagination against a local stand-in for OpenD
+
+Compares the original page merge (``DataFrame.to_dict()`` per page, then
+``extend`` into the first page's dict) with the streaming KlineAccumulator
+used by the server. Pages are generated up front so only the merge is timed.
+
+Usage:
+    python benchmarks/bench_history_kline.py [--bars 10000 50000 100000] [--page-size 1000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from futu import RET_OK  # noqa: E402
+
+from futu_stock_mcp_server.kline_store import collect_pages  # noqa: E402
+
+
+class PagedKlineStandIn:
+    """Serves pre-built request_history_kline pages like OpenD would"""
+
+    def __init__(self, bars: int, page_size: int):
+        times = pd.date_range('2015-01-05 09:31', periods=bars, freq='min')
+        rng = np.random.default_rng(0)
+        close = 300 + rng.standard_normal(bars).cumsum()
+        frame = pd.DataFrame({
+            'code': 'HK.00700',
+            'name': 'TENCENT',
+            'time_key': times.strftime('%Y-%m-%d %H:%M:%S'),
+            'open': close,
+            'close': close,
+            'high': close + 0.5,
+            'low': close - 0.5,
+            'pe_ratio': 20.0,
+            'turnover_rate': 0.001,
+            'volume': rng.integers(100, 10000, bars),
+            'turnover': close * 1000,
+            'change_rate': 0.0,
+            'last_close': close,
+        })
+        self.pages = [frame.iloc[i:i + page_size].reset_index(drop=True)
+                      for i in range(0, bars, page_size)]
+
+    def request_history_kline(self, page_req_key=None):
+        index = page_req_key or 0
+        next_key = index + 1 if index + 1 < len(self.pages) else None
+        return RET_OK, self.pages[index], next_key
+
+
+def legacy_merge(ctx):
+    """The pagination loop get_history_kline used before the accumulator"""
+    ret, data, page_req_key = ctx.request_history_kline()
+    result = data.to_dict()
+    while page_req_key is not None:
+        ret, data, page_req_key = ctx.request_history_kline(page_req_key=page_req_key)
+        new_data = data.to_dict()
+        for key in result:
+            if isinstance(result[key], list):
+                result[key].extend(new_data[key])
+    return result, len(result['time_key'])
+
+
+def accumulator_merge(ctx):
+    ret, acc = collect_pages(lambda key: ctx.request_history_kline(page_req_key=key))
+    frame = acc.to_frame('HK.00700')
+    return frame, len(frame)
+
+
+def measure(fn, ctx):
+    tracemalloc.start()
+    started = time.perf_counter()
+    _, bars = fn(ctx)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, bars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bars', type=int, nargs='+', default=[10000, 50000, 100000])
+    parser.add_argument('--page-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'bars':>8} {'method':>12} {'time (ms)':>10} {'peak (MB)':>10} {'bars out':>9}")
+    for bars in args.bars:
+        ctx = PagedKlineStandIn(bars, args.page_size)
+        for name, fn in (('legacy', legacy_merge), ('accumulator', accumulator_merge)):
+            elapsed, peak, out = measure(fn, ctx)
+            print(f"{bars:>8} {name:>12} {elapsed * 1000:>10.1f} {peak / 2**20:>10.1f} {out:>9}")
+
+
+if __name__ == '__main__':
+    main()
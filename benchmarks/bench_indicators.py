@@ -0,0 +1,120 @@
+"""Indicators on the server versus shipping raw K-lines to the client
+
+For ``--symbols`` fake OpenD symbols, compares the JSON size of the daily
+K-lines an agent would otherwise pull with get_history_kline against the
+get_technical_indicators result for all seven indicators. It then times the
+stacked NumPy computation against the same indicators computed per symbol
+with pandas over synthetic bars.
+
+Usage:
+    python benchmarks/bench_indicators.py [--symbols 50] [--bars 250]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+def pandas_indicators(frame: pd.DataFrame) -> dict:
+    close, high, low = frame['close'], frame['high'], frame['low']
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    mid, std = close.rolling(20).mean(), close.rolling(20).std(ddof=0)
+    prev = close.shift()
+    ranges = [high - low, (high - prev).abs(), (low - prev).abs()]
+    true_range = pd.concat(ranges, axis=1).max(axis=1)
+    day = frame['time_key'].dt.date
+    return {
+        'sma': mid.iloc[-1],
+        'ema': close.ewm(span=20, adjust=False).mean().iloc[-1],
+        'rsi': (100 - 100 / (1 + gain / loss)).iloc[-1],
+        'macd': macd.iloc[-1],
+        'signal': macd.ewm(span=9, adjust=False).mean().iloc[-1],
+        'upper': (mid + 2 * std).iloc[-1],
+        'atr': true_range.ewm(alpha=1 / 14, adjust=False).mean().iloc[-1],
+        'vwap': (frame['turnover'].groupby(day).cumsum()
+                 / frame['volume'].groupby(day).cumsum()).iloc[-1],
+    }
+
+
+def synthetic(symbols: int, bars: int) -> list:
+    from futu_stock_mcp_server.kline_store import KLINE_DTYPE
+    rng = np.random.default_rng(0)
+    series = []
+    for _ in range(symbols):
+        arr = np.zeros(bars, dtype=KLINE_DTYPE)
+        close = 100 + rng.standard_normal(bars).cumsum()
+        arr['time_key'] = np.datetime64('2025-01-01', 's') + np.arange(bars) * 86400
+        arr['close'], arr['high'], arr['low'] = close, close + 1, close - 1
+        arr['volume'] = 1000
+        arr['turnover'] = close * 1000
+        series.append(arr)
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--bars', type=int, default=250)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='futu-kline-')
+    os.environ.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_KLINE_STORE_DIR': root,
+        'FUTU_RATE_LIMITS': 'request_history_kline=0',
+    })
+    from futu_stock_mcp_server import server
+    from futu_stock_mcp_server.indicators import DEFAULT_PARAMS, compute, stack
+    from futu_stock_mcp_server.kline_store import array_to_frame
+
+    server.init_quote_connection()
+    server.quote_pool.wait_ready(10)
+    symbols = [f'HK.{i:05d}' for i in range(1, args.symbols + 1)]
+    try:
+        async def sizes():
+            raw = 0
+            for symbol in symbols:
+                start, end = server.history_range(symbol, 'K_DAY', args.bars)
+                klines = await server.get_history_kline.fn(symbol, 'K_DAY', start, end, count=1000)
+                raw += len(json.dumps(klines, default=str))
+            result = await server.get_technical_indicators.fn(symbols, bars=args.bars)
+            return raw, len(json.dumps(result))
+        raw, computed = asyncio.run(sizes())
+        print(f"{'raw K-lines (get_history_kline)':<34} {raw / 1024:>10.1f} KiB")
+        print(f"{'get_technical_indicators':<34} {computed / 1024:>10.1f} KiB "
+              f"({raw / computed:.0f}x smaller)")
+    finally:
+        server.cleanup_all()
+        shutil.rmtree(root, ignore_errors=True)
+
+    series = synthetic(args.symbols, args.bars)
+    started = time.perf_counter()
+    compute(stack(series, args.bars), list(DEFAULT_PARAMS))
+    numpy_ms = (time.perf_counter() - started) * 1000
+    frames = []
+    for arr in series:
+        frame = array_to_frame(arr, 'X', 'X')
+        frame['time_key'] = pd.to_datetime(frame['time_key'])
+        frames.append(frame)
+    started = time.perf_counter()
+    for frame in frames:
+        pandas_indicators(frame)
+    pandas_ms = (time.perf_counter() - started) * 1000
+    print(f"{'stacked numpy, all symbols':<34} {numpy_ms:>10.1f} ms")
+    print(f"{'pandas, one symbol at a time':<34} {pandas_ms:>10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
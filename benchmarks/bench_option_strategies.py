@@ -0,0 +1,105 @@
+"""Option strategy building: chain cache and vectorized payoffs against the fake OpenD
+
+Builds every strategy at every strike of one expiry. The first call fetches
+the option chain and its snapshots; later calls reuse the cached chain and
+only re-read snapshots when FUTU_SNAPSHOT_CACHE_TTL has expired. The engine
+itself is timed separately against a plain Python loop that prices each
+strategy leg by leg over the same strikes.
+
+Usage:
+    python benchmarks/bench_option_strategies.py [--symbol HK.00700] [--calls 20] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+STRATEGIES = ('straddle', 'vertical', 'butterfly', 'condor')
+
+
+def python_payoffs(chain, strategy, prices):
+    """Reference implementation: one strategy and one price at a time"""
+    from futu_stock_mcp_server.options import STRATEGY_LEGS
+    legs = [('CALL' if kind == 'SAME' else kind, offset, q)
+            for kind, offset, q in STRATEGY_LEGS[strategy]]
+    span = max(offset for _, offset, _ in legs)
+    results = []
+    for i in range(len(chain.strikes) - span):
+        cost = sum(q * chain.prices[kind][i + offset] for kind, offset, q in legs)
+        payoff = []
+        for s in prices:
+            value = 0.0
+            for kind, offset, q in legs:
+                k = chain.strikes[i + offset]
+                value += q * max(s - k if kind == 'CALL' else k - s, 0)
+            payoff.append(value - cost)
+        results.append((cost, max(payoff), min(payoff)))
+    return results
+
+
+async def run(server, args):
+    exp = await server.get_option_expiration_date.fn(args.symbol)
+    expiry = list(exp['strike_time'].values())[-1]
+
+    for label in ('first call (fetch chain)', 'cached chain'):
+        started = time.perf_counter()
+        for strategy in STRATEGIES:
+            result = await server.get_option_strategies.fn(args.symbol, expiry, strategy)
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{label:<28} {elapsed:>9.1f} ms for {len(STRATEGIES)} strategies")
+
+    latencies = []
+    for _ in range(args.calls):
+        started = time.perf_counter()
+        await server.get_option_strategies.fn(args.symbol, expiry, 'condor', limit=5)
+        latencies.append((time.perf_counter() - started) * 1000)
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{'get_option_strategies':<28} {p50:>9.1f} ms p50, {p99:.1f} ms p99 "
+          f"over {args.calls} calls")
+
+    from futu_stock_mcp_server.options import build_strategies
+    ret, chain = await server.load_option_chain(args.symbol, expiry)
+    prices = np.concatenate([[0.0], chain.strikes])
+    for name, build in [
+        ('numpy engine', lambda s: build_strategies(chain, s, payoff_prices=prices)),
+        ('python loop', lambda s: python_payoffs(chain, s, prices)),
+    ]:
+        started = time.perf_counter()
+        for _ in range(20):
+            for strategy in STRATEGIES:
+                build(strategy)
+        print(f"{name:<28} {(time.perf_counter() - started) * 1000 / 20:>9.2f} ms per chain "
+              f"({len(chain)} strikes, {len(STRATEGIES)} strategies)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbol', default='HK.00700')
+    parser.add_argument('--calls', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_FAKE_LATENCY_MS': str(args.latency_ms),
+        'FUTU_KLINE_STORE_DIR': '',
+    })
+    from futu_stock_mcp_server import server
+
+    server.init_quote_connection()
+    server.quote_pool.wait_ready(10)
+    try:
+        asyncio.run(run(server, args))
+    finally:
+        server.cleanup_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Burst of snapshot calls against a frequency-limited fake OpenD, with and without the rate limiter
+
+The fake OpenD rejects get_market_snapshot above ``--limit`` requests per
+``--window`` seconds, like OpenD does with its 60 per 30 seconds. A burst of
+``--calls`` concurrent get_market_snapshot tool calls for distinct symbols
+(so the response cache does not help) is sent once with rate limiting
+disabled, where everything above the limit comes back as an error, and
+once with a token bucket of the same limit, where calls queue instead.
+
+Usage:
+    python benchmarks/bench_rate_limit.py [--calls 60] [--limit 20] [--window 2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+async def burst(server, calls: int, offset: int):
+    async def one(i):
+        started = time.perf_counter()
+        try:
+            result = await server.get_market_snapshot.fn([f'HK.{offset + i:05d}'])
+            ok = 'error' not in result
+        except Exception:
+            ok = False
+        return ok, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(calls)))
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=60)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--window', type=float, default=2)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_FAKE_RATE_LIMITS': f'get_market_snapshot={args.limit}/{args.window}',
+        'FUTU_KLINE_STORE_DIR': '',
+    })
+    from futu_stock_mcp_server import server
+    from futu_stock_mcp_server.ratelimit import RateLimiter
+
+    server.init_quote_connection()
+    server.quote_pool.wait_ready(10)
+    print(f"{'rate limiter':<14} {'ok':>4} {'errors':>6} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'total s':>8}")
+    try:
+        for i, limits in enumerate([{}, {'get_market_snapshot': (args.limit, args.window)}]):
+            server.rate_limiter = RateLimiter(limits)
+            results, elapsed = asyncio.run(burst(server, args.calls, 1 + i * args.calls))
+            latencies = [latency for _, latency in results]
+            ok = sum(1 for success, _ in results if success)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            state = 'on' if limits else 'off'
+            print(f"{state:<14} {ok:>4} {args.calls - ok:>6} {p50:>8.0f} {p99:>8.0f} "
+                  f"{max(latencies):>8.0f} {elapsed:>8.1f}")
+            # Let the fake's window drain before the next run
+            time.sleep(args.window)
+    finally:
+        server.cleanup_all()
+
+
+if __name__ == '__main__':
+    main()
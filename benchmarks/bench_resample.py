@@ -0,0 +1,98 @@
+"""Intraday K-lines from OpenD per interval versus resampled from stored 1-minute bars
+
+Against the fake OpenD, every symbol's K_5M, K_15M, K_30M and K_60M history
+for ``--days`` days is requested twice into an empty K-line store: once
+fetched per interval from OpenD, and once after the symbol's K_1M history
+was requested, when the tool builds each interval from the stored minutes.
+The resampling engine is also timed alone on a year of 1-minute bars.
+
+Usage:
+    python benchmarks/bench_resample.py [--symbols 5] [--days 20] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+INTERVALS = ('K_5M', 'K_15M', 'K_30M', 'K_60M')
+
+
+async def request(server, symbols, ktypes, start, end):
+    for symbol in symbols:
+        for ktype in ktypes:
+            result = await server.get_history_kline.fn(symbol, ktype, start, end, count=1000)
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+
+
+def minute_bars(days: int) -> np.ndarray:
+    from futu_stock_mcp_server.fake_opend import bar_times
+    from futu_stock_mcp_server.kline_store import KLINE_DTYPE
+    times = bar_times('HK', 'K_1M', date.today() - timedelta(days=days), date.today())
+    bars = np.zeros(len(times), dtype=KLINE_DTYPE)
+    close = 300 + np.random.default_rng(0).standard_normal(len(times)).cumsum()
+    bars['time_key'] = times.astype('datetime64[s]')
+    bars['open'], bars['close'] = np.roll(close, 1), close
+    bars['high'], bars['low'] = close + 0.2, close - 0.2
+    bars['volume'] = 1000
+    bars['turnover'] = close * 1000
+    bars['last_close'] = np.roll(close, 1)
+    return bars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=5)
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='futu-kline-')
+    os.environ.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_FAKE_LATENCY_MS': str(args.latency_ms),
+        'FUTU_KLINE_STORE_DIR': root,
+        'FUTU_RATE_LIMITS': 'request_history_kline=0',
+    })
+    from futu_stock_mcp_server import server
+    from futu_stock_mcp_server.kline_store import KlineStore
+    from futu_stock_mcp_server.resample import resample
+
+    server.init_quote_connection()
+    server.quote_pool.wait_ready(10)
+    symbols = [f'HK.{i:05d}' for i in range(1, args.symbols + 1)]
+    end = date.today() - timedelta(days=1)
+    start = (end - timedelta(days=args.days)).isoformat()
+    end = end.isoformat()
+    try:
+        for label, seed in [('per interval from OpenD', ()), ('resampled from K_1M', ('K_1M',))]:
+            server.kline_store = KlineStore(tempfile.mkdtemp(dir=root))
+            asyncio.run(request(server, symbols, seed, start, end))
+            seeded = server.kline_store.fetches
+            started = time.perf_counter()
+            asyncio.run(request(server, symbols, INTERVALS, start, end))
+            print(f"{label:<26} {(time.perf_counter() - started) * 1000:>9.1f} ms  "
+                  f"{server.kline_store.fetches - seeded:>3} OpenD K-line fetches for "
+                  f"{len(symbols) * len(INTERVALS)} requests ({seeded} K_1M fetches beforehand)")
+    finally:
+        server.cleanup_all()
+        shutil.rmtree(root, ignore_errors=True)
+
+    bars = minute_bars(365)
+    for ktype, minutes in [('K_5M', 5), ('K_60M', 60), ('K_10M (not native)', 10)]:
+        started = time.perf_counter()
+        out = resample(bars, 'HK', minutes)
+        print(f"{'resample ' + ktype:<26} {(time.perf_counter() - started) * 1000:>9.1f} ms  "
+              f"{len(bars)} -> {len(out)} bars")
+
+
+if __name__ == '__main__':
+    main()
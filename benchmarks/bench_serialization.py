@@ -0,0 +1,127 @@
+"""Benchmark default vs compact tool responses on synthetic Futu-shaped data
+
+Each case builds a DataFrame shaped like the real SDK result, then times the
+conversion done by the tool plus the JSON encoding FastMCP applies to the
+return value, and reports the encoded size. The default format is what the
+tools returned before ``response_format`` existed. Every case is run once per
+``--indent`` value (FastMCP indents by 2, see FUTU_JSON_INDENT).
+
+Usage:
+    python benchmarks/bench_serialization.py [--securities 3000] [--bars 50000] [--snapshots 500]
+        [--indent 2 0]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from futu_stock_mcp_server.kline_store import KLINE_DTYPE, array_to_frame  # noqa: E402
+from futu_stock_mcp_server.serialize import json_serializer, shape_frame, shape_records  # noqa: E402
+
+
+def security_list(rows: int) -> pd.DataFrame:
+    """Layout of get_stock_basicinfo for a whole market"""
+    return pd.DataFrame({
+        'code': [f'HK.{i:05d}' for i in range(rows)],
+        'name': [f'Company {i}' for i in range(rows)],
+        'lot_size': 500,
+        'stock_type': 'STOCK',
+        'stock_child_type': 'N/A',
+        'stock_owner': '',
+        'option_type': 'N/A',
+        'strike_time': '',
+        'strike_price': np.nan,
+        'suspension': False,
+        'listing_time': '2004-06-16',
+        'stock_id': np.arange(rows, dtype='int64') + 54047868453564,
+        'delisting': False,
+        'index_option_type': 'N/A',
+        'main_contract': False,
+        'last_trade_time': '',
+        'exchange_type': 'HK_MAINBOARD',
+    })
+
+
+def history_kline(bars: int) -> pd.DataFrame:
+    """Layout of request_history_kline for one symbol"""
+    rng = np.random.default_rng(0)
+    arr = np.zeros(bars, dtype=KLINE_DTYPE)
+    arr['time_key'] = np.datetime64('2015-01-05T09:31') + np.arange(bars).astype('timedelta64[m]')
+    close = 300 + rng.standard_normal(bars).cumsum()
+    for field in ('open', 'close', 'high', 'low', 'last_close'):
+        arr[field] = close
+    arr['volume'] = rng.integers(100, 10000, bars)
+    arr['turnover'] = close * 1000
+    return array_to_frame(arr, 'HK.00700', 'TENCENT')
+
+
+def market_snapshot(rows: int) -> pd.DataFrame:
+    """Layout of get_market_snapshot, which has around 60 mostly numeric columns"""
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame(rng.random((rows, 56)), columns=[f'field_{i}' for i in range(56)])
+    frame.insert(0, 'code', [f'HK.{i:05d}' for i in range(rows)])
+    frame.insert(1, 'name', [f'Company {i}' for i in range(rows)])
+    frame.insert(2, 'update_time', '2024-01-02 16:08:00')
+    frame.insert(3, 'sec_status', 'NORMAL')
+    return frame
+
+
+def measure(convert, encode, repeat: int):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(encode(convert()).encode())
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--securities', type=int, default=3000)
+    parser.add_argument('--bars', type=int, default=50000)
+    parser.add_argument('--snapshots', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--indent', type=int, nargs='+', default=[2, 0])
+    args = parser.parse_args()
+
+    securities = security_list(args.securities)
+    kline = history_kline(args.bars)
+    snapshot = market_snapshot(args.snapshots)
+    snapshot_records = snapshot.to_dict('records')
+
+    cases = [
+        ('get_security_list', 'default', lambda: securities.to_dict()),
+        ('get_security_list', 'compact', lambda: shape_frame(securities, 'compact')),
+        ('get_security_list', 'compact+fields',
+         lambda: shape_frame(securities, 'compact', ['code', 'name', 'lot_size'])),
+        ('get_history_kline', 'default', lambda: kline.to_dict()),
+        ('get_history_kline', 'compact', lambda: shape_frame(kline, 'compact')),
+        ('get_history_kline', 'compact+fields',
+         lambda: shape_frame(kline, 'compact', ['time_key', 'close', 'volume'])),
+        ('get_market_snapshot', 'default', lambda: {'snapshot_list': snapshot_records}),
+        ('get_market_snapshot', 'compact',
+         lambda: {'snapshot_list': shape_records(snapshot_records, 'compact')}),
+        ('get_market_snapshot', 'compact+fields',
+         lambda: {'snapshot_list': shape_records(snapshot_records, 'compact',
+                                                  ['code', 'field_0'])}),
+    ]
+
+    print(f"{'tool':<20} {'format':<15} {'indent':>6} {'time (ms)':>10} {'size (KB)':>10} "
+          f"{'size %':>7}")
+    baseline = {}
+    for tool, fmt, convert in cases:
+        for indent in args.indent:
+            elapsed, size = measure(convert, json_serializer(indent), args.repeat)
+            baseline.setdefault(tool, size)
+            print(f"{tool:<20} {fmt:<15} {indent:>6} {elapsed * 1000:>10.1f} {size / 1024:>10.1f} "
+                  f"{100 * size / baseline[tool]:>6.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Polling account state: OpenD queries with and without the push-invalidated trade cache
+
+An agent polls get_positions, get_funds and get_max_power ``--polls``
+times against the fake OpenD. Every ``--fill-every`` polls a simulated
+fill is pushed through the trade context's deal handler, and the next
+poll must already show the new quantity. With FUTU_TRADE_CACHE_TTL=0
+every poll goes to OpenD; with the cache only the polls after a push do.
+Trade rate limits are lifted so both runs measure OpenD round-trips
+rather than frequency-limit waits.
+
+Usage:
+    python benchmarks/bench_trade_cache.py [--polls 200] [--fill-every 50] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+TRADE_QUERIES = ('accinfo_query', 'position_list_query', 'acctradinginfo_query')
+
+
+def quantity(result, code):
+    if not result['rows']:
+        return 0
+    rows = dict(zip(result['columns'], zip(*result['rows'], strict=True), strict=True))
+    return dict(zip(rows['code'], rows['qty'], strict=True)).get(code, 0)
+
+
+async def poll(server, opend, ttl: float, polls: int, fill_every: int):
+    server.trade_cache.ttl = ttl
+    ret, ctx = server.trade_pool.get('HK', server.security_firm)
+    code = opend.codes('HK')[0]
+    expected = quantity(await server.get_positions.fn(response_format='compact'), code)
+    before = sum(opend.calls[m] for m in TRADE_QUERIES)
+    stale = 0
+    started = time.perf_counter()
+    for i in range(polls):
+        if i and i % fill_every == 0:
+            ctx.fill(code, 100)
+            expected += 100
+        positions = await server.get_positions.fn(response_format='compact')
+        await server.get_funds.fn()
+        await server.get_max_power.fn(code, price=100.0)
+        stale += quantity(positions, code) != expected
+    elapsed = time.perf_counter() - started
+    queries = sum(opend.calls[m] for m in TRADE_QUERIES) - before
+    server.close_trade_connection()
+    return elapsed, queries, stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--polls', type=int, default=200)
+    parser.add_argument('--fill-every', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_RATE_LIMITS': ','.join(f'{method}=0' for method in TRADE_QUERIES),
+    })
+    from futu_stock_mcp_server import server
+    from futu_stock_mcp_server.fake_opend import FakeOpenD, FakeTradeContext
+
+    opend = FakeOpenD(latency_ms=args.latency_ms)
+    server.TradeContext = functools.partial(FakeTradeContext, opend=opend)
+    try:
+        for name, ttl in [('no cache', 0), ('push-invalidated cache', 30)]:
+            elapsed, queries, stale = asyncio.run(
+                poll(server, opend, ttl, args.polls, args.fill_every))
+            print(f"{name:<24} {elapsed * 1000:>9.1f} ms  {queries:>4} OpenD trade queries  "
+                  f"{stale} stale position reads")
+    finally:
+        server.cleanup_all()
+
+
+if __name__ == '__main__':
+    main()
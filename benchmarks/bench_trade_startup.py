@@ -0,0 +1,63 @@
+"""Measure first trade tool call latency against the fake OpenD
+
+The fake trade context connects after ``--connect-ms`` (OpenSecTradeContext
+connects synchronously in its constructor) and answers every query after
+``--query-ms``. The first ``get_account_list`` call pays for creating the
+trade context; later calls reuse it. Before the fixed one second sleep was
+removed from trade initialization, the first call took at least 1000ms
+more than connect + two queries. With several ``--markets`` the contexts
+are created concurrently, so the first call should still cost about one
+connect rather than one per market.
+
+Usage:
+    python benchmarks/bench_trade_startup.py [--connect-ms 50] [--query-ms 5] [--calls 5]
+        [--markets HK US]
+"""
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from futu_stock_mcp_server import server  # noqa: E402
+from futu_stock_mcp_server.fake_opend import FakeOpenD, FakeTradeContext  # noqa: E402
+
+
+async def run(calls: int, markets):
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        result = await server.get_account_list.fn(markets=markets)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connect-ms', type=float, default=50)
+    parser.add_argument('--query-ms', type=float, default=5)
+    parser.add_argument('--calls', type=int, default=5)
+    parser.add_argument('--markets', nargs='+', default=['HK'])
+    args = parser.parse_args()
+
+    opend = FakeOpenD(latency_ms=args.query_ms, connect_ms=args.connect_ms)
+    server.TradeContext = functools.partial(FakeTradeContext, opend=opend)
+    try:
+        latencies = asyncio.run(run(args.calls, args.markets))
+    finally:
+        server.cleanup_all()
+
+    floor = args.connect_ms + 2 * args.query_ms
+    print(f"first call for {len(args.markets)} market(s): {latencies[0]:.1f}ms "
+          f"(connect + 2 queries = {floor:.1f}ms)")
+    for i, latency in enumerate(latencies[1:], start=2):
+        print(f"call {i}: {latency:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Screening a whole market: snapshot round-trips versus the in-memory universe table
+
+Against the fake OpenD with ``--universe`` securities, a top-movers screen
+is answered twice: the way agents did it before, by listing the market and
+calling get_market_snapshot on every code and sorting the result, and by
+get_top_movers/screen_universe on the background-refreshed table. The
+first universe query includes the initial load; the rest are served from
+memory.
+
+Usage:
+    python benchmarks/bench_universe.py [--universe 3000] [--queries 200] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+async def snapshot_screen(server, market: str):
+    ret, data = await server.run_quote('get_stock_basicinfo', market, 'STOCK')
+    result = await server.get_market_snapshot.fn(list(data['code']))
+    rows = [r for r in result['snapshot_list'] if r['prev_close_price']]
+    rows.sort(key=lambda r: r['last_price'] / r['prev_close_price'], reverse=True)
+    return rows[:20]
+
+
+async def run(server, args):
+    started = time.perf_counter()
+    top = await snapshot_screen(server, 'HK')
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{'snapshot round-trips':<28} {elapsed:>10.1f} ms  top {top[0]['code']}")
+
+    started = time.perf_counter()
+    result = await server.get_top_movers.fn('HK')
+    elapsed = (time.perf_counter() - started) * 1000
+    top_code = result['rows'][0]['code']
+    print(f"{'universe first query (load)':<28} {elapsed:>10.1f} ms  top {top_code}")
+
+    for name, query in [
+        ('get_top_movers', lambda: server.get_top_movers.fn('HK', limit=20)),
+        ('get_volume_leaders', lambda: server.get_volume_leaders.fn('HK', limit=20)),
+        ('screen_universe (ranges)', lambda: server.screen_universe.fn(
+            'HK', filters={'last_price': [10, 200], 'turnover_rate': [0.5, None]},
+            sort_by='change_rate')),
+    ]:
+        latencies = []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            await query()
+            latencies.append((time.perf_counter() - started) * 1000)
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{name:<28} {p50:>10.3f} ms p50, {p99:.3f} ms p99")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--universe', type=int, default=3000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'FUTU_FAKE_OPEND': '1',
+        'FUTU_FAKE_LATENCY_MS': str(args.latency_ms),
+        'FUTU_FAKE_UNIVERSE': str(args.universe),
+        'FUTU_SNAPSHOT_CACHE_TTL': '0',
+        'FUTU_KLINE_STORE_DIR': '',
+    })
+    from futu_stock_mcp_server import server
+
+    server.init_quote_connection()
+    server.quote_pool.wait_ready(10)
+    try:
+        asyncio.run(run(server, args))
+    finally:
+        server.cleanup_all()
+
+
+if __name__ == '__main__':
+    main()
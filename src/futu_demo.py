@@ -1,5 +1,6 @@
 from futu import *
-trd_ctx = OpenSecTradeContext(filter_trdmarket=TrdMarket.HK, host='127.0.0.1', port=11111, security_firm=SecurityFirm.FUTUSECURITIES)
+trd_ctx = OpenSecTradeContext(filter_trdmarket=TrdMarket.HK, host='127.0.0.1', port=11111,
+                              security_firm=SecurityFirm.FUTUSECURITIES)
 ret, data = trd_ctx.get_acc_list()
 if ret == RET_OK:
     print(data)
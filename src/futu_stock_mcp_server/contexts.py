@@ -0,0 +1,30 @@
+import threading
+
+from futu import ContextStatus, OpenQuoteContext
+
+
+class ReadyQuoteContext(OpenQuoteContext):
+    """OpenQuoteContext that signals when its OpenD connection is ready
+
+    Meant to be created with ``is_async_connect=True`` so the constructor
+    returns immediately instead of looping until OpenD answers. The SDK
+    calls ``on_api_socket_reconnected`` after every successful (re)connect,
+    which sets ``ready`` so callers can block on an event rather than
+    polling ``status`` or sleeping. Queries issued while disconnected fail
+    after ``connect_timeout`` seconds instead of waiting forever.
+    """
+
+    def __init__(self, *args, connect_timeout: float | None = None, **kwargs):
+        # Set before the base constructor, which may connect on another thread right away
+        self.ready = threading.Event()
+        super().__init__(*args, **kwargs)
+        self.set_sync_query_connect_timeout(connect_timeout)
+
+    def on_api_socket_reconnected(self):
+        result = super().on_api_socket_reconnected()
+        self.ready.set()
+        return result
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Block until connected, returns False if still not ready after ``timeout`` seconds"""
+        return self.ready.wait(timeout) and self.status == ContextStatus.READY
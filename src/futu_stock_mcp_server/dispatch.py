@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from loguru import logger
+
+
+class DispatchError(Exception):
+    """Base error raised when a Futu call cannot be dispatched"""
+
+
+class DispatchTimeoutError(DispatchError):
+    """Raised when a Futu call does not finish within its timeout"""
+
+
+class DispatchQueueFullError(DispatchError):
+    """Raised when the executor queue is already at its configured depth"""
+
+
+class FutuDispatcher:
+    """Run blocking Futu SDK calls on a bounded thread pool
+
+    The Futu SDK is fully synchronous, so calling it directly from an
+    ``async def`` tool blocks the event loop for every connected client.
+    The dispatcher moves each call onto a worker thread, caps the number of
+    outstanding calls at ``max_workers + max_queue`` and enforces a per-call
+    timeout. A call that times out or whose caller is cancelled is dropped
+    from the queue if it has not started yet.
+    """
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 64, timeout: float = 30.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='futu-call')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._max_queue_wait = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: float | None = None,
+                  **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the executor and await its result
+
+        Args:
+            fn: Blocking callable, usually a bound Futu context method
+            timeout: Seconds to wait for the result, defaults to the dispatcher timeout
+
+        Raises:
+            DispatchQueueFullError: Too many calls are already outstanding
+            DispatchTimeoutError: The call did not finish in time
+        """
+        name = getattr(fn, '__name__', repr(fn))
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                logger.warning(f"Futu call queue full, rejecting {name} "
+                               f"({self._pending} outstanding)")
+                raise DispatchQueueFullError(f"Too many pending Futu calls, {name} rejected")
+            self._pending += 1
+
+        future = self._executor.submit(self._invoke, time.monotonic(), fn, args, kwargs)
+        future.add_done_callback(self._on_done)
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            logger.warning(f"Futu call {name} timed out after {timeout}s")
+            raise DispatchTimeoutError(f"{name} timed out after {timeout}s") from None
+
+    def _invoke(self, submitted: float, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        waited = time.monotonic() - submitted
+        with self._lock:
+            self._running += 1
+            self._max_queue_wait = max(self._max_queue_wait, waited)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _on_done(self, future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot of pool configuration and counters"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'timeout': self.timeout,
+                'pending': self._pending,
+                'running': self._running,
+                'queued': self._pending - self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'timeouts': self._timeouts,
+                'rejected': self._rejected,
+                'max_queue_wait': round(self._max_queue_wait, 6),
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting calls and drop anything still queued"""
+        logger.info(f"Shutting down Futu dispatcher: {self.stats()}")
+        self._executor.shutdown(wait=False, cancel_futures=True)
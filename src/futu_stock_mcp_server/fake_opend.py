@@ -0,0 +1,1084 @@
+import functools
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from typing import Any
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from futu import (
+    RET_ERROR,
+    RET_OK,
+    BrokerHandlerBase,
+    ContextStatus,
+    CurKlineHandlerBase,
+    OrderBookHandlerBase,
+    RTDataHandlerBase,
+    StockQuoteHandlerBase,
+    SubType,
+    TickerHandlerBase,
+    TradeDealHandlerBase,
+    TradeOrderHandlerBase,
+    TrdEnv,
+)
+from loguru import logger
+
+# Continuous trading sessions in minutes after local midnight, bars are labelled by their end time
+SESSIONS = {
+    'HK': ((570, 720), (780, 960)),
+    'US': ((570, 960),),
+    'SH': ((570, 690), (780, 900)),
+    'SZ': ((570, 690), (780, 900)),
+}
+TIMEZONES = {
+    'HK': 'Asia/Hong_Kong',
+    'US': 'America/New_York',
+    'SH': 'Asia/Shanghai',
+    'SZ': 'Asia/Shanghai',
+}
+INTRADAY_MINUTES = {
+    'K_1M': 1, 'K_3M': 3, 'K_5M': 5, 'K_10M': 10, 'K_15M': 15, 'K_30M': 30,
+    'K_60M': 60, 'K_120M': 120, 'K_180M': 180, 'K_240M': 240,
+}
+# Calendar days spanned by one bar, used to size get_cur_kline lookbacks
+CALENDAR_DAYS = {'K_DAY': 1.5, 'K_WEEK': 7, 'K_MON': 31, 'K_QUARTER': 92, 'K_YEAR': 366}
+SUB_TYPES = {v for k, v in vars(SubType).items() if k.isupper() and v != SubType.NONE}
+
+# Per-request code limits enforced by OpenD
+MAX_SNAPSHOT_CODES = 400
+MAX_QUOTE_CODES = 400
+
+_OPTION_CODE = re.compile(
+    r'^(?P<market>[A-Z]+)\.(?P<root>.+?)(?P<expiry>\d{6})(?P<type>[CP])(?P<strike>\d+)$')
+
+
+def _parse_rate_limits(spec: str) -> dict[str, tuple[int, float]]:
+    """Parse FUTU_FAKE_RATE_LIMITS, e.g. "get_market_snapshot=60/30" """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        method, _, limit = item.partition('=')
+        count, _, seconds = limit.partition('/')
+        limits[method.strip()] = (int(count), float(seconds or 30))
+    return limits
+
+
+def _parse_errors(spec: str) -> dict[str, float]:
+    """Parse FUTU_FAKE_ERRORS, e.g. "get_market_snapshot:0.1,subscribe:0.5" """
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        method, _, rate = item.partition(':')
+        rates[method.strip()] = float(rate or 1)
+    return rates
+
+
+def _profile(code: str) -> tuple[float, float, int]:
+    """Deterministic base price, phase and hash for a code"""
+    h = zlib.crc32(code.encode())
+    return 5 + (h % 50000) / 100, (h >> 16) % 628 / 100, h
+
+
+def _prices(code: str, seconds: np.ndarray) -> np.ndarray:
+    base, phase, _ = _profile(code)
+    seconds = np.asarray(seconds, dtype=np.float64)
+    wave = (0.08 * np.sin(seconds / (86400 * 30) + phase)
+            + 0.01 * np.sin(seconds / 3600 + 2 * phase)
+            + 0.002 * np.sin(seconds / 97 + phase))
+    return np.round(base * (1 + wave), 3)
+
+
+def _volumes(code: str, seconds: np.ndarray) -> np.ndarray:
+    h = _profile(code)[2]
+    minutes = np.asarray(seconds, dtype=np.int64) // 60
+    return ((h + minutes) * 2654435761 % 9973 + 100) * 100
+
+
+def _time_strings(times: np.ndarray) -> np.ndarray:
+    if len(times) == 0:
+        # np.char.replace cannot size its output for an empty array
+        return np.array([], dtype=str)
+    return np.char.replace(np.datetime_as_string(times.astype('datetime64[s]'), unit='s'), 'T', ' ')
+
+
+def _norm_cdf(x: float) -> float:
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def _black_scholes(spot: float, strike: float, years: float, call: bool,
+                   vol: float = 0.3, rate: float = 0.02) -> dict[str, float]:
+    years = max(years, 1 / 365)
+    d1 = (math.log(spot / strike) + (rate + vol * vol / 2) * years) / (vol * math.sqrt(years))
+    d2 = d1 - vol * math.sqrt(years)
+    discount = math.exp(-rate * years)
+    pdf = math.exp(-d1 * d1 / 2) / math.sqrt(2 * math.pi)
+    if call:
+        price = spot * _norm_cdf(d1) - strike * discount * _norm_cdf(d2)
+        delta, rho = _norm_cdf(d1), strike * years * discount * _norm_cdf(d2) / 100
+    else:
+        price = strike * discount * _norm_cdf(-d2) - spot * _norm_cdf(-d1)
+        delta, rho = _norm_cdf(d1) - 1, -strike * years * discount * _norm_cdf(-d2) / 100
+    theta = (-spot * pdf * vol / (2 * math.sqrt(years))
+             - (1 if call else -1) * rate * strike * discount
+             * _norm_cdf(d2 if call else -d2)) / 365
+    return {
+        'price': round(max(price, 0.001), 3),
+        'delta': round(delta, 4),
+        'gamma': round(pdf / (spot * vol * math.sqrt(years)), 6),
+        'vega': round(spot * pdf * math.sqrt(years) / 100, 4),
+        'theta': round(theta, 4),
+        'rho': round(rho, 4),
+        'implied_volatility': vol * 100,
+    }
+
+
+class FakeOpenD:
+    """Synthetic OpenD shared by the fake quote and trade contexts
+
+    Prices are a deterministic function of the code and the time, so runs
+    are repeatable and every context sees the same market. Each request
+    sleeps ``latency_ms`` plus up to ``jitter_ms`` and fails with
+    ``error_rate`` probability, or with the per-method rate in ``errors``.
+    ``rate_limits`` rejects requests above ``count`` per ``seconds`` the
+    way OpenD does. ``universe`` codes per market are listed by
+    get_stock_basicinfo and ``sub_quota`` caps subscriptions across all
+    contexts.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, connect_ms: float = 0.0,
+                 error_rate: float = 0.0, errors: dict[str, float] | None = None, seed: int = 0,
+                 universe: int = 3000, sub_quota: int = 1000, push_interval: float = 1.0,
+                 rate_limits: dict[str, tuple[int, float]] | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.connect_ms = connect_ms
+        self.error_rate = error_rate
+        self.errors = errors or {}
+        self.universe = universe
+        self.sub_quota = sub_quota
+        self.push_interval = push_interval
+        self.rate_limits = rate_limits or {}
+        self._recent: dict[str, deque[float]] = {}
+        self.calls: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.sub_used = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'FakeOpenD':
+        return cls(
+            latency_ms=float(os.getenv('FUTU_FAKE_LATENCY_MS', '0')),
+            jitter_ms=float(os.getenv('FUTU_FAKE_JITTER_MS', '0')),
+            connect_ms=float(os.getenv('FUTU_FAKE_CONNECT_MS', '0')),
+            error_rate=float(os.getenv('FUTU_FAKE_ERROR_RATE', '0')),
+            errors=_parse_errors(os.getenv('FUTU_FAKE_ERRORS', '')),
+            seed=int(os.getenv('FUTU_FAKE_SEED', '0')),
+            universe=int(os.getenv('FUTU_FAKE_UNIVERSE', '3000')),
+            sub_quota=int(os.getenv('FUTU_FAKE_SUB_QUOTA', '1000')),
+            push_interval=float(os.getenv('FUTU_FAKE_PUSH_INTERVAL', '1')),
+            rate_limits=_parse_rate_limits(os.getenv('FUTU_FAKE_RATE_LIMITS', '')),
+        )
+
+    def _over_limit(self, method: str, now: float) -> bool:
+        limit = self.rate_limits.get(method)
+        if not limit:
+            return False
+        count, seconds = limit
+        recent = self._recent.setdefault(method, deque())
+        while recent and recent[0] <= now - seconds:
+            recent.popleft()
+        if len(recent) >= count:
+            return True
+        recent.append(now)
+        return False
+
+    def request(self, method: str) -> str | None:
+        """Account for one request and apply latency, returns an error message if it should fail"""
+        with self._lock:
+            self.calls[method] += 1
+            delay = self.latency_ms + self._random.random() * self.jitter_ms
+            error = None
+            if self._over_limit(method, time.monotonic()):
+                error = 'Request frequency too high, please try again later'
+            elif self._random.random() < self.errors.get(method, self.error_rate):
+                error = 'Injected error'
+            if error:
+                self.failures[method] += 1
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return error
+
+    def connect(self) -> None:
+        if self.connect_ms > 0:
+            time.sleep(self.connect_ms / 1000)
+
+    def reserve(self, count: int) -> bool:
+        with self._lock:
+            if self.sub_used + count > self.sub_quota:
+                return False
+            self.sub_used += count
+            return True
+
+    def release(self, count: int) -> None:
+        with self._lock:
+            self.sub_used = max(self.sub_used - count, 0)
+
+    def codes(self, market: str) -> list[str]:
+        """Security codes listed in a market"""
+        if market == 'HK':
+            return [f'HK.{i:05d}' for i in range(1, self.universe + 1)]
+        if market == 'SH':
+            return [f'SH.{600000 + i:06d}' for i in range(self.universe)]
+        if market == 'SZ':
+            return [f'SZ.{i:06d}' for i in range(1, self.universe + 1)]
+        if market == 'US':
+            codes = []
+            for i in range(self.universe):
+                name = ''
+                i += 1
+                while i:
+                    i, r = divmod(i - 1, 26)
+                    name = chr(65 + r) + name
+                codes.append(f'US.{name}')
+            return codes
+        return []
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'calls': dict(self.calls),
+            'failures': dict(self.failures),
+            'sub_used': self.sub_used,
+            'sub_quota': self.sub_quota,
+        }
+
+
+_default_opend: FakeOpenD | None = None
+_default_lock = threading.Lock()
+
+
+def default_opend() -> FakeOpenD:
+    """Process-wide FakeOpenD configured from FUTU_FAKE_* variables"""
+    global _default_opend
+    with _default_lock:
+        if _default_opend is None:
+            _default_opend = FakeOpenD.from_env()
+        return _default_opend
+
+
+def _api(error: Callable[[str], tuple] = lambda msg: (RET_ERROR, msg)):
+    """Apply the fake's latency, rate limits and error injection to a context method
+
+    Args:
+        error: Builds the failure result from a message, shaped like the real method's error result
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            msg = self.opend.request(fn.__name__)
+            if msg is not None:
+                return error(msg)
+            return fn(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _code_list(codes: Any) -> list[str]:
+    # The SDK accepts a single code wherever it takes a list
+    return [codes] if isinstance(codes, str) else list(codes)
+
+
+def _market(code: str) -> str:
+    return code.split('.', 1)[0]
+
+
+def _local_now(market: str) -> datetime:
+    return datetime.now(ZoneInfo(TIMEZONES.get(market, 'Asia/Hong_Kong'))).replace(tzinfo=None)
+
+
+def _parse_date(value: str | None) -> date | None:
+    return datetime.strptime(value[:10], '%Y-%m-%d').date() if value else None
+
+
+def _bar_offsets(market: str, minutes: int) -> np.ndarray:
+    ends = []
+    for start, end in SESSIONS.get(market, SESSIONS['HK']):
+        ends.extend(range(start + minutes, end + 1, minutes))
+        if (end - start) % minutes:
+            ends.append(end)
+    return np.array(ends, dtype='timedelta64[m]')
+
+
+def bar_times(market: str, ktype: str, start: date, end: date) -> np.ndarray:
+    """Bar end times of ``ktype`` between two dates, weekdays only
+
+    Intraday bars follow the market's sessions; day and longer bars are
+    stamped at midnight of the last trading day they cover.
+    """
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    days = days[np.is_busday(days)]
+    if ktype in INTRADAY_MINUTES:
+        offsets = _bar_offsets(market, INTRADAY_MINUTES[ktype])
+        return (days.astype('datetime64[m]')[:, None] + offsets[None, :]).ravel()
+    if ktype == 'K_WEEK':
+        groups = (days.astype(np.int64) + 3) // 7
+    elif ktype == 'K_MON':
+        groups = days.astype('datetime64[M]').astype(np.int64)
+    elif ktype == 'K_QUARTER':
+        groups = days.astype('datetime64[M]').astype(np.int64) // 3
+    elif ktype == 'K_YEAR':
+        groups = days.astype('datetime64[Y]').astype(np.int64)
+    else:
+        return days.astype('datetime64[m]')
+    last = np.append(groups[1:] != groups[:-1], True) if len(groups) else groups.astype(bool)
+    return days[last].astype('datetime64[m]')
+
+
+class FakeQuoteContext:
+    """Drop-in replacement for OpenQuoteContext backed by a FakeOpenD
+
+    Implements the quote methods the server uses with the SDK's return
+    shapes and column names. Subscription-dependent calls fail unless the
+    code is subscribed on this context, and subscribed pairs are pushed to
+    the registered handlers' ``on_push`` every ``push_interval`` seconds.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 11111, is_encrypt=None,
+                 is_async_connect: bool = False, connect_timeout: float | None = None,
+                 opend: FakeOpenD | None = None, **kwargs):
+        self.opend = opend or default_opend()
+        self.ready = threading.Event()
+        self.status = ContextStatus.START
+        self._subs: dict[tuple[str, str], bool] = {}
+        self._handlers: list[Any] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._pusher: threading.Thread | None = None
+        if is_async_connect:
+            threading.Thread(target=self._connect, name='fake-opend-connect', daemon=True).start()
+        else:
+            self._connect()
+
+    def _connect(self) -> None:
+        self.opend.connect()
+        if not self._closed.is_set():
+            self.status = ContextStatus.READY
+            self.ready.set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self.ready.wait(timeout) and self.status == ContextStatus.READY
+
+    def set_sync_query_connect_timeout(self, timeout: float | None) -> None:
+        pass
+
+    def set_handler(self, handler: Any) -> int:
+        self._handlers.append(handler)
+        return RET_OK
+
+    def close(self) -> None:
+        self._closed.set()
+        self.status = ContextStatus.CLOSED
+        with self._lock:
+            count = len(self._subs)
+            self._subs.clear()
+        self.opend.release(count)
+
+    # Helpers
+    @staticmethod
+    def _known(code: str) -> bool:
+        return _market(code) in SESSIONS and '.' in code
+
+    def _subscribed(self, code: str, sub_type: str) -> bool:
+        with self._lock:
+            return (code, sub_type) in self._subs
+
+    def _option(self, code: str) -> dict[str, Any] | None:
+        match = _OPTION_CODE.match(code)
+        if not match:
+            return None
+        expiry = datetime.strptime(match.group('expiry'), '%y%m%d').date()
+        underlying = f"{match.group('market')}.{match.group('root')}"
+        strike = int(match.group('strike')) / 1000
+        spot = float(_prices(underlying, [time.time()])[0])
+        greeks = _black_scholes(spot, strike, (expiry - date.today()).days / 365,
+                                match.group('type') == 'C')
+        return {
+            'owner': underlying,
+            'option_type': 'CALL' if match.group('type') == 'C' else 'PUT',
+            'strike_time': expiry.isoformat(),
+            'strike_price': strike,
+            **greeks,
+        }
+
+    def _quote_row(self, code: str, now: float) -> dict[str, Any]:
+        option = self._option(code)
+        last = option['price'] if option else float(_prices(code, [now])[0])
+        day_open = float(_prices(code, [now - 6 * 3600])[0]) if not option else last
+        prev_close = float(_prices(code, [now - 86400])[0]) if not option else last
+        local = _local_now(_market(code))
+        return {
+            'code': code,
+            'name': f'Fake {code}',
+            'data_date': local.strftime('%Y-%m-%d'),
+            'data_time': local.strftime('%H:%M:%S'),
+            'last_price': last,
+            'open_price': day_open,
+            'high_price': round(max(last, day_open) * 1.01, 3),
+            'low_price': round(min(last, day_open) * 0.99, 3),
+            'prev_close_price': prev_close,
+            'volume': int(_volumes(code, [now])[0]) * 100,
+            'turnover': round(int(_volumes(code, [now])[0]) * 100 * last, 2),
+            'turnover_rate': 0.5,
+            'amplitude': round(abs(last - day_open) / prev_close * 100, 3),
+            'suspension': False,
+            'listing_date': '2004-06-16',
+            'price_spread': 0.001 if last < 1 else 0.01 if last < 20 else 0.1,
+            'dark_status': 'N/A',
+            'sec_status': 'NORMAL',
+        }
+
+    def _kline_frame(self, code: str, times: np.ndarray, ktype: str,
+                     columns: list[str]) -> pd.DataFrame:
+        seconds = times.astype('datetime64[s]').astype(np.int64)
+        step = INTRADAY_MINUTES.get(ktype, 1440) * 60
+        close = _prices(code, seconds)
+        open_ = _prices(code, seconds - step)
+        volume = _volumes(code, seconds) * (step // 60)
+        frame = pd.DataFrame({
+            'code': code,
+            'name': f'Fake {code}',
+            'time_key': _time_strings(times),
+            'open': open_,
+            'close': close,
+            'high': np.round(np.maximum(open_, close) * 1.002, 3),
+            'low': np.round(np.minimum(open_, close) * 0.998, 3),
+            'pe_ratio': 15.0,
+            'turnover_rate': 0.001,
+            'volume': volume,
+            'turnover': np.round(volume * close, 2),
+            'change_rate': np.round((close - open_) / open_ * 100, 4),
+            'last_close': open_,
+        })
+        return frame[columns]
+
+    def _recent_bars(self, code: str, ktype: str, num: int) -> np.ndarray:
+        market = _market(code)
+        now = _local_now(market)
+        if ktype in INTRADAY_MINUTES:
+            per_day = len(_bar_offsets(market, INTRADAY_MINUTES[ktype]))
+            span = int(num / per_day * 1.5) + 10
+            cut = np.datetime64(now, 'm') + np.timedelta64(INTRADAY_MINUTES[ktype], 'm')
+        else:
+            span = int(num * CALENDAR_DAYS.get(ktype, 1.5)) + 10
+            cut = np.datetime64(now.date(), 'm')
+        times = bar_times(market, ktype, now.date() - timedelta(days=span), now.date())
+        times = times[times <= cut]
+        return times[-num:] if num else times
+
+    def _ticker_frame(self, code: str, num: int, now: float) -> pd.DataFrame:
+        seconds = (int(now) // 2 * 2) - 2 * np.arange(num)[::-1]
+        tz = ZoneInfo(TIMEZONES.get(_market(code), 'Asia/Hong_Kong'))
+        price = _prices(code, seconds)
+        volume = _volumes(code, seconds) // 10
+        return pd.DataFrame({
+            'code': code,
+            'name': f'Fake {code}',
+            'time': [datetime.fromtimestamp(s, tz).strftime('%Y-%m-%d %H:%M:%S') for s in seconds],
+            'price': price,
+            'volume': volume,
+            'turnover': np.round(price * volume, 2),
+            'ticker_direction': np.where(seconds % 4 == 0, 'BUY', 'SELL'),
+            'sequence': seconds * 10,
+            'type': 'AUTO_MATCH',
+        })
+
+    def _rt_frame(self, code: str) -> pd.DataFrame:
+        market = _market(code)
+        now = _local_now(market)
+        times = bar_times(market, 'K_1M', now.date() - timedelta(days=7), now.date())
+        times = times[times <= np.datetime64(now, 'm')]
+        if len(times):
+            times = times[times.astype('datetime64[D]') == times[-1].astype('datetime64[D]')]
+        seconds = times.astype('datetime64[s]').astype(np.int64)
+        price = _prices(code, seconds)
+        volume = _volumes(code, seconds)
+        last_close = float(_prices(code, seconds[:1] - 86400)[0]) if len(seconds) else 0.0
+        return pd.DataFrame({
+            'code': code,
+            'name': f'Fake {code}',
+            'time': _time_strings(times),
+            'is_blank': False,
+            'opened_mins': np.arange(1, len(times) + 1),
+            'cur_price': price,
+            'last_close': last_close,
+            'avg_price': np.round(np.cumsum(price * volume) / np.maximum(np.cumsum(volume), 1), 3),
+            'volume': volume,
+            'turnover': np.round(price * volume, 2),
+        })
+
+    def _order_book(self, code: str, num: int, now: float) -> dict[str, Any]:
+        option = self._option(code)
+        mid = option['price'] if option else float(_prices(code, [now])[0])
+        tick = 0.001 if mid < 1 else 0.01 if mid < 20 else 0.1
+        size = int(_volumes(code, [now])[0])
+        local = _local_now(_market(code)).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        return {
+            'code': code,
+            'name': f'Fake {code}',
+            'svr_recv_time_bid': local,
+            'svr_recv_time_ask': local,
+            'Bid': [(round(mid - tick * (i + 1), 3), size + 100 * i, i + 1, {})
+                    for i in range(num)],
+            'Ask': [(round(mid + tick * (i + 1), 3), size + 100 * i, i + 1, {})
+                    for i in range(num)],
+        }
+
+    def _broker_frames(self, code: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+        h = _profile(code)[2]
+        frames = []
+        for side in ('bid', 'ask'):
+            frames.append(pd.DataFrame({
+                'code': code,
+                'name': f'Fake {code}',
+                f'{side}_broker_id': [(h + i * 7) % 9000 + 1000 for i in range(10)],
+                f'{side}_broker_name': [f'Broker {(h + i * 7) % 9000 + 1000}' for i in range(10)],
+                f'{side}_broker_pos': [i // 4 + 1 for i in range(10)],
+                'order_id': [0] * 10,
+                'order_volume': [0] * 10,
+            }))
+        return frames[0], frames[1]
+
+    # Market state and reference data
+    @_api()
+    def get_global_state(self):
+        now = datetime.now()
+        return RET_OK, {
+            'market_hk': 'MORNING', 'market_us': 'CLOSED',
+            'market_sh': 'MORNING', 'market_sz': 'MORNING',
+            'market_hkfuture': 'MORNING', 'market_usfuture': 'CLOSED',
+            'server_ver': 'fake', 'server_build_no': 0,
+            'time': str(int(now.timestamp())), 'local_time': now.timestamp(),
+            'qot_logined': True, 'trd_logined': True, 'program_status_type': 'READY',
+            'program_status_desc': '',
+        }
+
+    @_api()
+    def get_market_state(self, code_list):
+        rows = []
+        for code in _code_list(code_list):
+            market = _market(code)
+            now = _local_now(market)
+            minute = now.hour * 60 + now.minute
+            sessions = SESSIONS.get(market, ())
+            if now.weekday() >= 5 or not sessions:
+                state = 'CLOSED'
+            elif any(start <= minute < end for start, end in sessions):
+                state = 'MORNING' if minute < sessions[0][1] and len(sessions) > 1 else 'AFTERNOON'
+            elif len(sessions) > 1 and sessions[0][1] <= minute < sessions[1][0]:
+                state = 'REST'
+            else:
+                state = 'CLOSED'
+            rows.append({'code': code, 'stock_name': f'Fake {code}', 'market_state': state})
+        return RET_OK, pd.DataFrame(rows, columns=['code', 'stock_name', 'market_state'])
+
+    @_api()
+    def get_stock_basicinfo(self, market, stock_type='STOCK', code_list=None):
+        codes = _code_list(code_list) if code_list else self.opend.codes(market)
+        frame = pd.DataFrame({
+            'code': codes,
+            'name': [f'Fake {code}' for code in codes],
+            'lot_size': [100 * (1 + _profile(code)[2] % 10) for code in codes],
+            'stock_type': stock_type,
+            'stock_child_type': 'N/A',
+            'stock_owner': '',
+            'option_type': 'N/A',
+            'strike_time': '',
+            'strike_price': np.nan,
+            'suspension': False,
+            'listing_date': '2004-06-16',
+            'stock_id': [_profile(code)[2] for code in codes],
+            'delisting': False,
+            'index_option_type': 'N/A',
+            'main_contract': False,
+            'last_trade_time': '',
+            'exchange_type': 'N/A',
+        })
+        return RET_OK, frame
+
+    @_api()
+    def request_trading_days(self, market=None, start=None, end=None, code=None):
+        end_date = _parse_date(end) or date.today()
+        start_date = _parse_date(start) or end_date - timedelta(days=365)
+        days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        return RET_OK, [{'time': str(day), 'trade_date_type': 'WHOLE'}
+                        for day in days[np.is_busday(days)]]
+
+    # Quotes
+    @_api()
+    def get_market_snapshot(self, code_list):
+        codes = _code_list(code_list)
+        if len(codes) > MAX_SNAPSHOT_CODES:
+            return RET_ERROR, f'Too many codes, at most {MAX_SNAPSHOT_CODES} per request'
+        unknown = [code for code in codes if not self._known(code)]
+        if unknown:
+            return RET_ERROR, f'Unknown stock {unknown[0]}'
+        now = time.time()
+        rows = []
+        for code in codes:
+            quote = self._quote_row(code, now)
+            book = self._order_book(code, 1, now)
+            option = self._option(code)
+            row = {
+                'code': code,
+                'name': quote['name'],
+                'update_time': f"{quote['data_date']} {quote['data_time']}",
+                **{k: quote[k] for k in ('last_price', 'open_price', 'high_price', 'low_price',
+                                         'prev_close_price', 'volume', 'turnover', 'turnover_rate',
+                                         'suspension', 'listing_date', 'price_spread')},
+                'lot_size': 100,
+                'stock_owner': option['owner'] if option else '',
+                'ask_price': book['Ask'][0][0],
+                'bid_price': book['Bid'][0][0],
+                'ask_vol': book['Ask'][0][1],
+                'bid_vol': book['Bid'][0][1],
+                'amplitude': quote['amplitude'],
+                'avg_price': round((quote['high_price'] + quote['low_price']) / 2, 3),
+                'sec_status': 'NORMAL',
+                'option_valid': option is not None,
+            }
+            if option:
+                row.update({
+                    'option_type': option['option_type'],
+                    'strike_time': option['strike_time'],
+                    'option_strike_price': option['strike_price'],
+                    'option_contract_size': 100,
+                    'option_open_interest': int(_volumes(code, [now])[0]),
+                    'option_implied_volatility': option['implied_volatility'],
+                    'option_premium': round(option['price'] / option['strike_price'] * 100, 3),
+                    'option_delta': option['delta'],
+                    'option_gamma': option['gamma'],
+                    'option_vega': option['vega'],
+                    'option_theta': option['theta'],
+                    'option_rho': option['rho'],
+                    'option_net_open_interest': 0,
+                })
+            rows.append(row)
+        return RET_OK, pd.DataFrame(rows)
+
+    @_api()
+    def get_stock_quote(self, code_list):
+        codes = _code_list(code_list)
+        if len(codes) > MAX_QUOTE_CODES:
+            return RET_ERROR, f'Too many codes, at most {MAX_QUOTE_CODES} per request'
+        missing = [code for code in codes if not self._subscribed(code, SubType.QUOTE)]
+        if missing:
+            return RET_ERROR, f'Please subscribe to QUOTE first: {missing[0]}'
+        now = time.time()
+        return RET_OK, pd.DataFrame([self._quote_row(code, now) for code in codes])
+
+    @_api()
+    def get_rt_data(self, code):
+        if not self._subscribed(code, SubType.RT_DATA):
+            return RET_ERROR, f'Please subscribe to RT_DATA first: {code}'
+        return RET_OK, self._rt_frame(code)
+
+    @_api()
+    def get_rt_ticker(self, code, num=500):
+        if not self._subscribed(code, SubType.TICKER):
+            return RET_ERROR, f'Please subscribe to TICKER first: {code}'
+        return RET_OK, self._ticker_frame(code, num, time.time())
+
+    @_api()
+    def get_order_book(self, code, num=10, order_book_type=None):
+        if not self._subscribed(code, SubType.ORDER_BOOK):
+            return RET_ERROR, f'Please subscribe to ORDER_BOOK first: {code}'
+        return RET_OK, self._order_book(code, num, time.time())
+
+    @_api(lambda msg: (RET_ERROR, msg, msg))
+    def get_broker_queue(self, code):
+        if not self._subscribed(code, SubType.BROKER):
+            msg = f'Please subscribe to BROKER first: {code}'
+            return RET_ERROR, msg, msg
+        bid, ask = self._broker_frames(code)
+        return RET_OK, bid, ask
+
+    # K-lines
+    @_api()
+    def get_cur_kline(self, code, num, ktype=SubType.K_DAY, autype='qfq'):
+        if not self._subscribed(code, ktype):
+            return RET_ERROR, f'Please subscribe to {ktype} first: {code}'
+        columns = ['code', 'name', 'time_key', 'open', 'close', 'high', 'low', 'volume',
+                   'turnover', 'pe_ratio', 'turnover_rate', 'last_close']
+        return RET_OK, self._kline_frame(code, self._recent_bars(code, ktype, num), ktype, columns)
+
+    @_api(lambda msg: (RET_ERROR, msg, None))
+    def request_history_kline(self, code, start=None, end=None, ktype='K_DAY', autype='qfq',
+                              fields=None, max_count=1000, page_req_key=None, extended_time=False,
+                              session=None):
+        if not self._known(code):
+            return RET_ERROR, f'Unknown stock {code}', None
+        try:
+            end_date = _parse_date(end)
+            start_date = _parse_date(start)
+        except ValueError as e:
+            return RET_ERROR, str(e), None
+        if start_date is None:
+            start_date = (end_date or date.today()) - timedelta(days=365)
+        if end_date is None:
+            end_date = start_date + timedelta(days=365)
+        if start_date > end_date:
+            return RET_ERROR, 'start is later than end', None
+        times = bar_times(_market(code), ktype, start_date, end_date)
+        offset = page_req_key or 0
+        stop = len(times) if max_count is None else min(offset + max_count, len(times))
+        columns = ['code', 'name', 'time_key', 'open', 'close', 'high', 'low', 'pe_ratio',
+                   'turnover_rate', 'volume', 'turnover', 'change_rate', 'last_close']
+        frame = self._kline_frame(code, times[offset:stop], ktype, columns)
+        return RET_OK, frame, stop if stop < len(times) else None
+
+    # Options
+    def _expiries(self, code: str) -> list[date]:
+        today = date.today()
+        friday = today + timedelta(days=(4 - today.weekday()) % 7)
+        weekly = [friday + timedelta(weeks=i) for i in range(4)]
+        monthly = []
+        month = today.replace(day=1)
+        for _ in range(6):
+            month = (month + timedelta(days=32)).replace(day=1)
+            last = (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            # Last Thursday of the month
+            monthly.append(last - timedelta(days=(last.weekday() - 3) % 7))
+        return sorted(set(weekly + monthly))
+
+    @_api()
+    def get_option_expiration_date(self, code, index_option_type='NORMAL'):
+        if not self._known(code):
+            return RET_ERROR, f'Unknown stock {code}'
+        today = date.today()
+        expiries = self._expiries(code)
+        weekly = set(expiries[:4])
+        return RET_OK, pd.DataFrame({
+            'strike_time': [d.isoformat() for d in expiries],
+            'option_expiry_date_distance': [(d - today).days for d in expiries],
+            'expiration_cycle': ['WEEK' if d in weekly else 'MONTH' for d in expiries],
+        })
+
+    @_api()
+    def get_option_chain(self, code, index_option_type='NORMAL', start=None, end=None,
+                         option_type='ALL', option_cond_type='ALL', data_filter=None):
+        if not self._known(code):
+            return RET_ERROR, f'Unknown stock {code}'
+        first = _parse_date(start) or date.today()
+        last = _parse_date(end) or first + timedelta(days=30)
+        spot = float(_prices(code, [time.time()])[0])
+        magnitude = 10 ** math.floor(math.log10(spot))
+        step = magnitude / 10 * (5 if spot / magnitude > 5 else 2.5)
+        centre = round(spot / step) * step
+        strikes = [round(centre + step * i, 3) for i in range(-10, 11) if centre + step * i > 0]
+        market, root = code.split('.', 1)
+        rows = []
+        for expiry in self._expiries(code):
+            if not first <= expiry <= last:
+                continue
+            for strike in strikes:
+                for kind in ('CALL', 'PUT'):
+                    if option_type not in ('ALL', kind):
+                        continue
+                    option_code = (f"{market}.{root}{expiry:%y%m%d}{kind[0]}"
+                                   f"{int(round(strike * 1000))}")
+                    rows.append({
+                        'code': option_code,
+                        'name': f'Fake {root} {expiry:%y%m%d} {strike} {kind}',
+                        'lot_size': 100,
+                        'stock_type': 'DRVT',
+                        'option_type': kind,
+                        'stock_owner': code,
+                        'strike_time': expiry.isoformat(),
+                        'strike_price': strike,
+                        'suspension': False,
+                        'stock_id': _profile(option_code)[2],
+                        'index_option_type': 'N/A',
+                    })
+        return RET_OK, pd.DataFrame(rows, columns=[
+            'code', 'name', 'lot_size', 'stock_type', 'option_type', 'stock_owner', 'strike_time',
+            'strike_price', 'suspension', 'stock_id', 'index_option_type'])
+
+    # Subscriptions
+    @_api()
+    def subscribe(self, code_list, subtype_list, is_first_push=True, subscribe_push=True,
+                  is_detailed_orderbook=False, extended_time=False, session=None):
+        codes = _code_list(code_list)
+        sub_types = _code_list(subtype_list)
+        unknown = [code for code in codes if not self._known(code)]
+        if unknown:
+            return RET_ERROR, f'Unknown stock {unknown[0]}'
+        invalid = [s for s in sub_types if s not in SUB_TYPES]
+        if invalid:
+            return RET_ERROR, f'Invalid subscription type {invalid[0]}'
+        with self._lock:
+            new = [(code, s) for code in codes for s in sub_types if (code, s) not in self._subs]
+            if not self.opend.reserve(len(new)):
+                return RET_ERROR, 'Subscription quota exceeded'
+            for key in ((code, s) for code in codes for s in sub_types):
+                self._subs[key] = self._subs.get(key, False) or subscribe_push
+        if subscribe_push:
+            self._start_pusher()
+        return RET_OK, None
+
+    @_api()
+    def unsubscribe(self, code_list, subtype_list, unsubscribe_all=False):
+        with self._lock:
+            if unsubscribe_all:
+                removed = list(self._subs)
+            else:
+                codes = _code_list(code_list)
+                sub_types = _code_list(subtype_list)
+                removed = [(c, s) for c in codes for s in sub_types if (c, s) in self._subs]
+            for key in removed:
+                del self._subs[key]
+        self.opend.release(len(removed))
+        return RET_OK, None
+
+    @_api()
+    def query_subscription(self, is_all_conn=True):
+        with self._lock:
+            sub_list: dict[str, list[str]] = {}
+            for code, sub_type in self._subs:
+                sub_list.setdefault(sub_type, []).append(code)
+            own = len(self._subs)
+        return RET_OK, {
+            'total_used': self.opend.sub_used,
+            'own_used': own,
+            'remain': max(self.opend.sub_quota - self.opend.sub_used, 0),
+            'sub_list': sub_list,
+        }
+
+    # Pushes
+    def _start_pusher(self) -> None:
+        if self.opend.push_interval <= 0 or (self._pusher is not None and self._pusher.is_alive()):
+            return
+        self._pusher = threading.Thread(target=self._push_loop, name='fake-opend-push', daemon=True)
+        self._pusher.start()
+
+    def _handler_for(self, sub_type: str) -> Any:
+        if sub_type == SubType.QUOTE:
+            base = StockQuoteHandlerBase
+        elif sub_type == SubType.ORDER_BOOK:
+            base = OrderBookHandlerBase
+        elif sub_type == SubType.BROKER:
+            base = BrokerHandlerBase
+        elif sub_type == SubType.TICKER:
+            base = TickerHandlerBase
+        elif sub_type == SubType.RT_DATA:
+            base = RTDataHandlerBase
+        else:
+            base = CurKlineHandlerBase
+        for handler in self._handlers:
+            if isinstance(handler, base) and hasattr(handler, 'on_push'):
+                return handler
+        return None
+
+    def _push_data(self, code: str, sub_type: str, now: float) -> Any:
+        if sub_type == SubType.QUOTE:
+            return pd.DataFrame([self._quote_row(code, now)])
+        if sub_type == SubType.ORDER_BOOK:
+            return self._order_book(code, 10, now)
+        if sub_type == SubType.BROKER:
+            return code, self._broker_frames(code)
+        if sub_type == SubType.TICKER:
+            return self._ticker_frame(code, 1, now)
+        if sub_type == SubType.RT_DATA:
+            return self._rt_frame(code).tail(1)
+        columns = ['code', 'name', 'time_key', 'open', 'close', 'high', 'low', 'volume',
+                   'turnover', 'pe_ratio', 'turnover_rate', 'last_close']
+        frame = self._kline_frame(code, self._recent_bars(code, sub_type, 1), sub_type, columns)
+        return frame.assign(k_type=sub_type)
+
+    def push_once(self) -> int:
+        """Deliver one round of pushes for every subscribed pair, returns the number delivered"""
+        with self._lock:
+            pairs = [key for key, push in self._subs.items() if push]
+        now = time.time()
+        delivered = 0
+        for code, sub_type in pairs:
+            handler = self._handler_for(sub_type)
+            if handler is None:
+                continue
+            data = self._push_data(code, sub_type, now)
+            if isinstance(data, pd.DataFrame) and data.empty:
+                continue
+            handler.on_push(data)
+            delivered += 1
+        return delivered
+
+    def _push_loop(self) -> None:
+        while not self._closed.wait(self.opend.push_interval):
+            try:
+                self.push_once()
+            except Exception as e:
+                logger.error(f"Fake OpenD push failed: {str(e)}")
+
+
+class FakeTradeContext:
+    """Drop-in replacement for OpenSecTradeContext backed by a FakeOpenD
+
+    Serves one real and one simulated account holding a few securities of
+    ``filter_trdmarket``, valued at the fake quote prices. ``fill`` trades
+    against the holdings and pushes the order and deal updates to the
+    registered handlers like OpenD does.
+    """
+
+    def __init__(self, filter_trdmarket: str = 'HK', host: str = '127.0.0.1', port: int = 11111,
+                 is_encrypt=None, security_firm: str = 'N/A', opend: FakeOpenD | None = None,
+                 **kwargs):
+        self.opend = opend or default_opend()
+        self.market = filter_trdmarket
+        self.security_firm = security_firm
+        self._handlers: list[Any] = []
+        self._fills: dict[str, float] = {}
+        self._cash = 1_000_000.0
+        self._deals = 0
+        # OpenSecTradeContext connects synchronously in its constructor
+        self.opend.connect()
+        self.status = ContextStatus.READY
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self.status == ContextStatus.READY
+
+    def set_handler(self, handler: Any) -> int:
+        self._handlers.append(handler)
+        return RET_OK
+
+    def close(self) -> None:
+        self.status = ContextStatus.CLOSED
+
+    def _holdings(self) -> list[tuple[str, int]]:
+        codes = self.opend.codes(self.market)[:5]
+        held = {code: 100 * (1 + _profile(code)[2] % 20) for code in codes}
+        for code, qty in self._fills.items():
+            held[code] = held.get(code, 0) + qty
+        return [(code, qty) for code, qty in held.items() if qty]
+
+    def fill(self, code: str, qty: float, trd_env: str = TrdEnv.REAL) -> None:
+        """Execute a buy (positive ``qty``) or sell at the current price and push the updates"""
+        price = float(_prices(code, [time.time()])[0])
+        self._fills[code] = self._fills.get(code, 0) + qty
+        self._cash -= qty * price
+        self._deals += 1
+        deal_id = self._deals
+        side = 'BUY' if qty > 0 else 'SELL'
+        common = {'trd_env': trd_env, 'code': code, 'stock_name': f'Fake {code}',
+                  'order_id': str(deal_id), 'qty': abs(qty), 'price': price, 'trd_side': side,
+                  'trd_market': self.market,
+                  'create_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        order = pd.DataFrame([{**common, 'order_status': 'FILLED_ALL', 'dealt_qty': abs(qty),
+                               'dealt_avg_price': price, 'order_type': 'NORMAL'}])
+        deal = pd.DataFrame([{**common, 'deal_id': str(deal_id), 'status': 'OK'}])
+        for handler in self._handlers:
+            if isinstance(handler, TradeOrderHandlerBase):
+                handler.on_push(order)
+            elif isinstance(handler, TradeDealHandlerBase):
+                handler.on_push(deal)
+
+    @_api()
+    def unlock_trade(self, password=None, password_md5=None, is_unlock=True):
+        return RET_OK, None
+
+    @_api()
+    def get_acc_list(self):
+        return RET_OK, pd.DataFrame([
+            {'acc_id': 281756460288713754, 'trd_env': TrdEnv.REAL, 'acc_type': 'MARGIN',
+             'uni_card_num': '1001100320482767', 'card_num': '1001329805025007',
+             'security_firm': self.security_firm, 'sim_acc_type': 'N/A',
+             'trdmarket_auth': [self.market]},
+            {'acc_id': 3637840, 'trd_env': TrdEnv.SIMULATE, 'acc_type': 'CASH',
+             'uni_card_num': 'N/A', 'card_num': 'N/A',
+             'security_firm': 'N/A', 'sim_acc_type': 'STOCK', 'trdmarket_auth': [self.market]},
+        ])
+
+    @_api()
+    def accinfo_query(self, trd_env=TrdEnv.REAL, acc_id=0, acc_index=0, refresh_cache=False,
+                      currency='HKD', asset_category='N/A'):
+        now = time.time()
+        market_val = sum(qty * float(_prices(code, [now])[0]) for code, qty in self._holdings())
+        cash = round(self._cash, 2)
+        return RET_OK, pd.DataFrame([{
+            'power': cash * 2, 'max_power_short': cash, 'net_cash_power': cash,
+            'total_assets': round(cash + market_val, 2), 'securities_assets': round(market_val, 2),
+            'fund_assets': 0.0, 'bond_assets': 0.0, 'cash': cash,
+            'market_val': round(market_val, 2), 'long_mv': round(market_val, 2), 'short_mv': 0.0,
+            'pending_asset': 0.0,
+            'frozen_cash': 0.0, 'avl_withdrawal_cash': cash, 'max_withdrawal': cash,
+            'currency': currency, 'available_funds': cash, 'unrealized_pl': 0.0, 'realized_pl': 0.0,
+            'risk_level': 'SAFE', 'risk_status': 'LEVEL3', 'initial_margin': 0.0,
+            'margin_call_margin': 0.0, 'maintenance_margin': 0.0,
+        }])
+
+    @_api()
+    def position_list_query(self, code='', pl_ratio_min=None, pl_ratio_max=None,
+                            trd_env=TrdEnv.REAL, acc_id=0, acc_index=0, refresh_cache=False,
+                            position_market='N/A', asset_category='N/A', currency='USD',
+                            show_option_strategy_view=False):
+        now = time.time()
+        rows = []
+        for holding, qty in self._holdings():
+            if code and code != holding:
+                continue
+            price = float(_prices(holding, [now])[0])
+            cost = float(_prices(holding, [now - 86400 * 90])[0])
+            rows.append({
+                'code': holding, 'stock_name': f'Fake {holding}', 'position_market': self.market,
+                'qty': float(qty), 'can_sell_qty': float(qty),
+                'cost_price': cost, 'cost_price_valid': True,
+                'average_cost': cost, 'diluted_cost': cost, 'market_val': round(price * qty, 2),
+                'nominal_price': price, 'pl_ratio': round((price - cost) / cost * 100, 3),
+                'pl_ratio_valid': True, 'pl_val': round((price - cost) * qty, 2),
+                'pl_val_valid': True, 'today_buy_qty': 0.0, 'today_buy_val': 0.0,
+                'today_pl_val': 0.0, 'today_trd_val': 0.0,
+                'today_sell_qty': 0.0, 'today_sell_val': 0.0, 'position_side': 'LONG',
+                'unrealized_pl': round((price - cost) * qty, 2), 'realized_pl': 0.0,
+                'currency': 'HKD' if self.market == 'HK' else 'USD',
+            })
+        return RET_OK, pd.DataFrame(rows)
+
+    @_api()
+    def acctradinginfo_query(self, order_type, code, price, order_id=None, adjust_limit=0,
+                             trd_env=TrdEnv.REAL, acc_id=0, acc_index=0, **kwargs):
+        price = price or float(_prices(code, [time.time()])[0])
+        held = dict(self._holdings()).get(code, 0)
+        return RET_OK, pd.DataFrame([{
+            'max_cash_buy': float(int(max(self._cash, 0) / price)),
+            'max_cash_and_margin_buy': float(int(max(self._cash + 1_000_000, 0) / price)),
+            'max_position_sell': float(held),
+            'max_sell_short': float(int(1_000_000 / price)),
+            'max_buy_back': 0.0,
+            'long_required_im': price * 0.25,
+            'short_required_im': price * 0.35,
+        }])
+
+    @_api()
+    def get_margin_ratio(self, code_list):
+        codes = _code_list(code_list)
+        return RET_OK, pd.DataFrame([{
+            'code': code, 'is_long_permit': True, 'is_short_permit': True, 'short_pool_remain': 1e6,
+            'short_fee_rate': 3.5, 'alert_long_ratio': 30.0, 'alert_short_ratio': 40.0,
+            'im_long_ratio': 25.0, 'im_short_ratio': 35.0, 'mcm_long_ratio': 20.0,
+            'mcm_short_ratio': 30.0, 'mm_long_ratio': 15.0, 'mm_short_ratio': 25.0,
+        } for code in codes])
+
+    @_api()
+    def order_list_query(self, *args, **kwargs):
+        return RET_OK, pd.DataFrame(columns=['code', 'stock_name', 'trd_side', 'order_type',
+                                             'order_status', 'order_id', 'qty', 'price',
+                                             'create_time', 'updated_time'])
+
+    @_api()
+    def deal_list_query(self, *args, **kwargs):
+        return RET_OK, pd.DataFrame(columns=['code', 'stock_name', 'deal_id', 'order_id', 'qty',
+                                             'price', 'trd_side', 'create_time'])
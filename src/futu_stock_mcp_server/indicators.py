@@ -0,0 +1,203 @@
+import re
+from collections.abc import Sequence
+
+import numpy as np
+
+from futu_stock_mcp_server.kline_store import KLINE_DTYPE
+
+# Indicator name -> default parameters; "rsi:7" or "macd:5,35,5" override them per request
+DEFAULT_PARAMS: dict[str, tuple[float, ...]] = {
+    'sma': (20,),
+    'ema': (20,),
+    'rsi': (14,),
+    'macd': (12, 26, 9),
+    'bollinger': (20, 2),
+    'atr': (14,),
+    'vwap': (),
+}
+
+# Parameters that may be fractional, by position; every other parameter is a window length in bars
+FRACTIONAL_PARAMS: dict[str, tuple[int, ...]] = {'bollinger': (1,)}
+
+_SPEC = re.compile(r'^(?P<name>[a-z]+)(?::(?P<params>[\d.,\s]+))?$')
+
+
+def parse_spec(spec: str) -> tuple[str, tuple[float, ...]]:
+    """Split "macd:12,26,9" into ("macd", (12, 26, 9)), filling in defaults
+
+    Window lengths come back as ints; only the Bollinger width ``k`` may be fractional.
+
+    Raises:
+        ValueError: Unknown indicator, malformed parameters or a window that is not a whole
+            number of at least 1 bar
+    """
+    match = _SPEC.match(spec.strip().lower())
+    if not match or match.group('name') not in DEFAULT_PARAMS:
+        raise ValueError(f"Unknown indicator {spec}, expected one of {', '.join(DEFAULT_PARAMS)} "
+                         f"optionally with parameters, e.g. \"sma:50\"")
+    name = match.group('name')
+    defaults = DEFAULT_PARAMS[name]
+    try:
+        given = [float(p) for p in (match.group('params') or '').split(',') if p.strip()]
+    except ValueError:
+        raise ValueError(f"Malformed parameters in {spec}") from None
+    if len(given) > len(defaults):
+        raise ValueError(f"{name} takes at most {len(defaults)} parameter(s)")
+    params = []
+    for i, p in enumerate(tuple(given) + defaults[len(given):]):
+        if i in FRACTIONAL_PARAMS.get(name, ()):
+            if p <= 0:
+                raise ValueError(f"{name} parameter {p:g} must be positive")
+            params.append(float(p))
+        elif p != int(p) or p < 1:
+            raise ValueError(f"{name} window {p:g} must be a whole number of bars, at least 1")
+        else:
+            params.append(int(p))
+    return name, tuple(params)
+
+
+def stack(series: Sequence[np.ndarray], bars: int) -> np.ndarray:
+    """Right-align KLINE_DTYPE arrays into a (symbols, bars) array, NaN-padded on the left
+
+    Missing time_key values are NaT.
+    """
+    out = np.zeros((len(series), bars), dtype=KLINE_DTYPE)
+    for field in KLINE_DTYPE.names:
+        if field == 'time_key':
+            out[field] = np.datetime64('NaT')
+        elif field != 'volume':
+            out[field] = np.nan
+    for i, arr in enumerate(series):
+        tail = arr[-bars:] if bars else arr[:0]
+        if len(tail):
+            out[i, bars - len(tail):] = tail
+    return out
+
+
+def _smooth(x: np.ndarray, alpha: float, seed: int) -> np.ndarray:
+    """Exponential smoothing along axis 1, seeded with the mean of each row's first ``seed`` values
+
+    Rows may start late (leading NaN); values before the seed are NaN. This
+    matches the EMA and Wilder (RMA) averages of common charting packages.
+    """
+    out = np.full(x.shape, np.nan)
+    state = np.full(x.shape[0], np.nan)
+    count = np.zeros(x.shape[0], dtype=np.int64)
+    total = np.zeros(x.shape[0])
+    for j in range(x.shape[1]):
+        v = x[:, j]
+        valid = ~np.isnan(v)
+        running = ~np.isnan(state) & valid
+        state[running] = alpha * v[running] + (1 - alpha) * state[running]
+        count += valid
+        total += np.where(valid, v, 0.0)
+        ready = np.isnan(state) & (count == seed)
+        state[ready] = total[ready] / seed
+        out[:, j] = state
+    return out
+
+
+def _rolling_sum(x: np.ndarray, n: int) -> np.ndarray:
+    """Sum over the last ``n`` values along axis 1, NaN where the window is not full"""
+    filled = np.nan_to_num(x)
+    csum = np.cumsum(filled, axis=1)
+    ccount = np.cumsum(~np.isnan(x), axis=1)
+    windowed = csum.copy()
+    windowed[:, n:] -= csum[:, :-n]
+    counts = ccount.copy()
+    counts[:, n:] -= ccount[:, :-n]
+    return np.where(counts == n, windowed, np.nan)
+
+
+def sma(x: np.ndarray, n: int) -> np.ndarray:
+    return _rolling_sum(x, n) / n
+
+
+def ema(x: np.ndarray, n: int) -> np.ndarray:
+    return _smooth(x, 2 / (n + 1), n)
+
+
+def rsi(close: np.ndarray, n: int) -> np.ndarray:
+    change = np.diff(close, axis=1, prepend=np.nan)
+    gain = _smooth(np.where(np.isnan(change), np.nan, np.maximum(change, 0)), 1 / n, n)
+    loss = _smooth(np.where(np.isnan(change), np.nan, np.maximum(-change, 0)), 1 / n, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), 100 - 100 / (1 + gain / loss))
+
+
+def macd(close: np.ndarray, fast: int, slow: int, signal: int) -> dict[str, np.ndarray]:
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = _smooth(line, 2 / (signal + 1), signal)
+    return {'macd': line, 'signal': signal_line, 'hist': line - signal_line}
+
+
+def bollinger(close: np.ndarray, n: int, k: float) -> dict[str, np.ndarray]:
+    mid = sma(close, n)
+    variance = np.maximum(_rolling_sum(close * close, n) / n - mid * mid, 0)
+    width = k * np.sqrt(variance)
+    return {'mid': mid, 'upper': mid + width, 'lower': mid - width}
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, n: int) -> np.ndarray:
+    prev = np.concatenate([np.full((close.shape[0], 1), np.nan), close[:, :-1]], axis=1)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    return _smooth(true_range, 1 / n, n)
+
+
+def vwap(bars: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """Volume-weighted average price since the first bar of each trading day
+
+    Daily and longer bars each form their own day, so their VWAP is the bar's
+    own turnover / volume. Without turnover, the typical price is used.
+    """
+    volume = bars['volume'].astype(np.float64)
+    typical = (bars['high'] + bars['low'] + bars['close']) / 3
+    traded = np.where(np.isnan(bars['turnover']), typical * volume, bars['turnover'])
+    traded = np.nan_to_num(traded)
+    cum_traded, cum_volume = np.cumsum(traded, axis=1), np.cumsum(volume, axis=1)
+    # Cumulative totals at the bar before each day starts, carried forward over the day
+    starts = np.ones(days.shape, dtype=bool)
+    starts[:, 1:] = days[:, 1:] != days[:, :-1]
+    cols = np.where(starts, np.arange(days.shape[1]), 0)
+    first = np.maximum.accumulate(cols, axis=1)
+    rows = np.arange(days.shape[0])[:, None]
+    base_traded = np.where(first > 0, cum_traded[rows, first - 1], 0.0)
+    base_volume = np.where(first > 0, cum_volume[rows, first - 1], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = (cum_traded - base_traded) / (cum_volume - base_volume)
+    return np.where(np.isnan(bars['close']), np.nan, out)
+
+
+def compute(bars: np.ndarray, specs: list[str]) -> dict[str, np.ndarray]:
+    """Evaluate indicators over a (symbols, bars) KLINE_DTYPE array
+
+    Returns:
+        (symbols, bars) float arrays keyed by output name, e.g. "sma_20",
+        "macd_12_26_9.signal", "bollinger_20_2.upper"
+
+    Raises:
+        ValueError: An indicator spec is invalid
+    """
+    close, high, low = bars['close'], bars['high'], bars['low']
+    results: dict[str, np.ndarray] = {}
+    for spec in specs:
+        name, params = parse_spec(spec)
+        label = '_'.join([name] + [f'{p:g}' for p in params])
+        if name == 'sma':
+            results[label] = sma(close, params[0])
+        elif name == 'ema':
+            results[label] = ema(close, params[0])
+        elif name == 'rsi':
+            results[label] = rsi(close, params[0])
+        elif name == 'macd':
+            for part, values in macd(close, *params).items():
+                results[f'{label}.{part}'] = values
+        elif name == 'bollinger':
+            for part, values in bollinger(close, params[0], params[1]).items():
+                results[f'{label}.{part}'] = values
+        elif name == 'atr':
+            results[label] = atr(high, low, close, params[0])
+        elif name == 'vwap':
+            days = bars['time_key'].astype('datetime64[D]').astype(np.int64)
+            results[label] = vwap(bars, days)
+    return results
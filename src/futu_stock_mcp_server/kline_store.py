@@ -0,0 +1,325 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from typing import Any
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from futu import RET_OK
+from loguru import logger
+
+# Trading-day timezone of each market prefix, used to decide which bars are closed
+MARKET_TIMEZONES = {
+    'HK': 'Asia/Hong_Kong',
+    'US': 'America/New_York',
+    'SH': 'Asia/Shanghai',
+    'SZ': 'Asia/Shanghai',
+}
+
+# K-line types whose bars are final once their trading day is over.
+# Weekly and longer bars keep changing until the period ends, so they bypass the store.
+STORABLE_KTYPES = {
+    'K_1M', 'K_3M', 'K_5M', 'K_10M', 'K_15M', 'K_30M', 'K_60M',
+    'K_120M', 'K_180M', 'K_240M', 'K_DAY',
+}
+
+KLINE_DTYPE = np.dtype([
+    ('time_key', 'datetime64[s]'),
+    ('open', 'f8'),
+    ('close', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('pe_ratio', 'f8'),
+    ('turnover_rate', 'f8'),
+    ('volume', 'i8'),
+    ('turnover', 'f8'),
+    ('change_rate', 'f8'),
+    ('last_close', 'f8'),
+])
+
+KLINE_COLUMNS = ['code', 'name'] + list(KLINE_DTYPE.names)
+
+Fetcher = Callable[[str, str], tuple[int, Any]]
+
+
+def frame_to_array(frame: pd.DataFrame) -> np.ndarray:
+    """Convert a request_history_kline DataFrame into a KLINE_DTYPE array"""
+    arr = np.zeros(len(frame), dtype=KLINE_DTYPE)
+    if len(frame) == 0:
+        return arr
+    times = pd.to_datetime(frame['time_key'], format='%Y-%m-%d %H:%M:%S')
+    arr['time_key'] = times.values.astype('datetime64[s]')
+    for field in KLINE_DTYPE.names[1:]:
+        if field in frame:
+            values = pd.to_numeric(frame[field], errors='coerce')
+            if field == 'volume':
+                values = values.fillna(0)
+            arr[field] = values.to_numpy()
+        elif field != 'volume':
+            arr[field] = np.nan
+    return arr
+
+
+def array_to_frame(arr: np.ndarray, code: str, name: str) -> pd.DataFrame:
+    """Convert a KLINE_DTYPE array back into the request_history_kline layout"""
+    frame = pd.DataFrame({field: arr[field] for field in KLINE_DTYPE.names[1:]})
+    frame.insert(0, 'time_key', np.datetime_as_string(arr['time_key'], unit='s'))
+    frame['time_key'] = frame['time_key'].str.replace('T', ' ', regex=False)
+    frame.insert(0, 'name', name)
+    frame.insert(0, 'code', code)
+    return frame
+
+
+class KlineAccumulator:
+    """Collect request_history_kline pages into a single growing bar buffer
+
+    Each page is converted to ``KLINE_DTYPE`` as it arrives and copied into a
+    buffer that doubles when full, so memory stays proportional to the number
+    of bars and the page DataFrames can be released immediately.
+    """
+
+    def __init__(self, capacity: int = 1024, name: str = ''):
+        self._buffer = np.empty(capacity, dtype=KLINE_DTYPE)
+        self._size = 0
+        self.name = name
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add_array(self, arr: np.ndarray) -> None:
+        needed = self._size + len(arr)
+        if needed > len(self._buffer):
+            grown = np.empty(max(needed, 2 * len(self._buffer)), dtype=KLINE_DTYPE)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size:needed] = arr
+        self._size = needed
+
+    def add(self, frame: pd.DataFrame) -> None:
+        """Append one request_history_kline page"""
+        if len(frame) == 0:
+            return
+        if not self.name and 'name' in frame:
+            self.name = str(frame['name'].iloc[0])
+        self.add_array(frame_to_array(frame))
+
+    def extend(self, other: "KlineAccumulator") -> None:
+        self.name = self.name or other.name
+        self.add_array(other.array)
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._buffer[:self._size]
+
+    def to_frame(self, code: str) -> pd.DataFrame:
+        return array_to_frame(self.array, code, self.name)
+
+
+def collect_pages(request_page: Callable[[Any], tuple[int, Any, Any]]) -> tuple[int, Any]:
+    """Drive request_history_kline pagination into a KlineAccumulator
+
+    Args:
+        request_page: ``request_page(page_req_key)`` returning ``(ret, DataFrame, next_key)``
+
+    Returns:
+        (RET_OK, KlineAccumulator) or (ret, error message)
+    """
+    acc = KlineAccumulator()
+    page_req_key = None
+    while True:
+        ret, frame, page_req_key = request_page(page_req_key)
+        if ret != RET_OK:
+            return ret, frame
+        acc.add(frame)
+        if page_req_key is None:
+            return RET_OK, acc
+
+
+def merge_arrays(old: np.ndarray | None, new: np.ndarray) -> np.ndarray:
+    """Merge two bar arrays sorted by time_key, newer rows win on duplicates"""
+    combined = new if old is None or len(old) == 0 else np.concatenate([old, new])
+    if len(combined) == 0:
+        return combined
+    combined = combined[np.argsort(combined['time_key'], kind='stable')]
+    keep = np.append(combined['time_key'][1:] != combined['time_key'][:-1], True)
+    return combined[keep]
+
+
+def subtract_ranges(start: date, end: date, covered: list[list[date]]) -> list[tuple[date, date]]:
+    """Return the parts of [start, end] that are not in ``covered``"""
+    gaps = []
+    cursor = start
+    for lo, hi in sorted(covered):
+        if hi < cursor:
+            continue
+        if lo > end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo - timedelta(days=1)))
+        cursor = max(cursor, hi + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def add_range(covered: list[list[date]], start: date, end: date) -> list[list[date]]:
+    """Insert [start, end] into ``covered`` and merge adjacent ranges"""
+    merged = []
+    for lo, hi in sorted(covered + [[start, end]]):
+        if merged and lo <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+class KlineStore:
+    """On-disk store of closed historical K-line bars
+
+    Each (autype, ktype, symbol) partition is a NumPy structured array saved
+    as ``.npy`` and read back memory-mapped, plus a JSON sidecar listing the
+    date ranges already fetched from OpenD. Requests only go to OpenD for the
+    uncovered gaps and for bars of the current trading day, which may still
+    change. Adjusted series (``qfq``/``hfq``) are rewritten by OpenD after
+    corporate actions, so those partitions expire after ``adjusted_max_age``
+    seconds.
+    """
+
+    def __init__(self, root: str, adjusted_max_age: float = 86400):
+        self.root = root
+        self.adjusted_max_age = adjusted_max_age
+        self._locks: dict[tuple[str, str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def supports(ktype: str) -> bool:
+        return ktype in STORABLE_KTYPES
+
+    @staticmethod
+    def closed_until(symbol: str) -> date:
+        """Last trading date whose bars can no longer change for this symbol"""
+        tz = ZoneInfo(MARKET_TIMEZONES.get(symbol.split('.')[0], 'Asia/Shanghai'))
+        return datetime.now(tz).date() - timedelta(days=1)
+
+    def _lock(self, key: tuple[str, str, str]) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _paths(self, symbol: str, ktype: str, autype: str) -> tuple[str, str]:
+        directory = os.path.join(self.root, str(autype or 'none'), ktype)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, symbol)
+        return base + '.npy', base + '.json'
+
+    def _load(self, symbol: str, ktype: str,
+              autype: str) -> tuple[np.ndarray | None, dict[str, Any]]:
+        data_path, meta_path = self._paths(symbol, ktype, autype)
+        fresh = {'code': symbol, 'name': '', 'coverage': [], 'created': time.time()}
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, fresh
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            meta['coverage'] = [[date.fromisoformat(lo), date.fromisoformat(hi)]
+                                for lo, hi in meta['coverage']]
+            if autype and time.time() - meta.get('created', 0) > self.adjusted_max_age:
+                logger.debug(f"Adjusted K-line partition expired: {symbol} {ktype} {autype}")
+                return None, fresh
+            return np.load(data_path, mmap_mode='r'), meta
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable K-line partition {data_path}: {str(e)}")
+            return None, fresh
+
+    def _save(self, symbol: str, ktype: str, autype: str, arr: np.ndarray,
+              meta: dict[str, Any]) -> None:
+        data_path, meta_path = self._paths(symbol, ktype, autype)
+        tmp_data = data_path + '.tmp'
+        with open(tmp_data, 'wb') as f:
+            np.save(f, arr)
+        serialized = dict(meta, coverage=[[lo.isoformat(), hi.isoformat()]
+                                          for lo, hi in meta['coverage']])
+        tmp_meta = meta_path + '.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump(serialized, f)
+        os.replace(tmp_data, data_path)
+        os.replace(tmp_meta, meta_path)
+
+    def covers(self, symbol: str, ktype: str, autype: str, start: str, end: str) -> bool:
+        """Whether every closed day of [start, end] is on disk, so ``get`` only fetches today
+
+        Raises:
+            ValueError: start or end is not a YYYY-MM-DD date
+        """
+        start_day = date.fromisoformat(start)
+        stored_end = min(date.fromisoformat(end), self.closed_until(symbol))
+        if start_day > stored_end:
+            return True
+        with self._lock((symbol, ktype, str(autype))):
+            arr, meta = self._load(symbol, ktype, autype)
+        return arr is not None and not subtract_ranges(start_day, stored_end, meta['coverage'])
+
+    def get(self, symbol: str, ktype: str, autype: str, start: str, end: str,
+            fetch: Fetcher) -> tuple[int, Any]:
+        """Return bars for [start, end], fetching only what is not on disk
+
+        Args:
+            fetch: ``fetch(start, end)`` returning ``(ret, KlineAccumulator)`` from OpenD
+
+        Returns:
+            (RET_OK, DataFrame) in request_history_kline layout, or (ret, error)
+        """
+        start_day = date.fromisoformat(start)
+        end_day = date.fromisoformat(end)
+        closed_until = self.closed_until(symbol)
+        stored_end = min(end_day, closed_until)
+
+        with self._lock((symbol, ktype, str(autype))):
+            arr, meta = self._load(symbol, ktype, autype)
+            gaps = []
+            if start_day <= stored_end:
+                gaps = subtract_ranges(start_day, stored_end, meta['coverage'])
+            if gaps:
+                fetched = KlineAccumulator()
+                for gap_start, gap_end in gaps:
+                    ret, acc = fetch(gap_start.isoformat(), gap_end.isoformat())
+                    self.fetches += 1
+                    if ret != RET_OK:
+                        return ret, acc
+                    fetched.extend(acc)
+                meta['name'] = fetched.name or meta['name']
+                arr = merge_arrays(None if arr is None else np.asarray(arr), fetched.array)
+                for gap_start, gap_end in gaps:
+                    meta['coverage'] = add_range(meta['coverage'], gap_start, gap_end)
+                self._save(symbol, ktype, autype, arr, meta)
+            elif start_day <= stored_end:
+                self.hits += 1
+
+        result = KlineAccumulator(name=meta['name'])
+        if arr is not None and start_day <= stored_end:
+            times = arr['time_key']
+            lo = np.searchsorted(times, np.datetime64(start_day, 's'), side='left')
+            after = np.datetime64(stored_end + timedelta(days=1), 's')
+            hi = np.searchsorted(times, after, side='left')
+            result.add_array(arr[lo:hi])
+
+        if end_day > closed_until:
+            live_start = max(start_day, closed_until + timedelta(days=1))
+            ret, live = fetch(live_start.isoformat(), end_day.isoformat())
+            self.fetches += 1
+            if ret != RET_OK:
+                return ret, live
+            result.extend(live)
+
+        return RET_OK, result.to_frame(symbol)
+
+    def stats(self) -> dict[str, Any]:
+        return {'root': self.root, 'hits': self.hits, 'fetches': self.fetches}
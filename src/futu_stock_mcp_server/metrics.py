@@ -0,0 +1,210 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+from fastmcp.server.middleware import Middleware
+from loguru import logger
+
+# Latency buckets in seconds, from cached reads to slow history downloads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0)
+
+# State of the tool call running in the current task, set by ToolMetricsMiddleware
+current_call: contextvars.ContextVar[dict[str, Any] | None] = contextvars.ContextVar(
+    'futu_current_call', default=None)
+
+Sample = tuple[dict[str, str], float]
+
+
+def current_tool() -> str:
+    call = current_call.get()
+    return call['tool'] if call else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+
+class Counter(_Metric):
+    """Monotonic counter per label combination"""
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = self.header()
+        for key, value in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key, strict=True))
+            lines.append(f'{self.name}{_labels(labels)} {_number(value)}')
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative bucket histogram per label combination"""
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 3)
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def time(self, **labels) -> '_Timer':
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        lines = self.header()
+        for key, state in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key, strict=True))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-2], strict=True):
+                cumulative += count
+                bucket = _labels({**labels, "le": _number(bound)})
+                lines.append(f'{self.name}_bucket{bucket} {_number(cumulative)}')
+            lines.append(f'{self.name}_sum{_labels(labels)} {_number(state[-2])}')
+            lines.append(f'{self.name}_count{_labels(labels)} {_number(state[-1])}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> '_Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class MetricsRegistry:
+    """Metrics rendered in the Prometheus text exposition format
+
+    Counters and histograms are updated as events happen. Values that
+    already live in component ``stats()`` (cache hits, quota usage, queue
+    depth) are read at scrape time by collectors registered with
+    ``collector(name, type, help, fn)``, where ``fn`` returns samples as
+    ``[(labels, value), ...]``.
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, name: str, metric_type: str, documentation: str,
+                  fn: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append((name, metric_type, documentation, fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, metric_type, documentation, fn in self._collectors:
+            try:
+                samples = list(fn())
+            except Exception as e:
+                logger.warning(f"Metrics collector {name} failed: {str(e)}")
+                continue
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in samples:
+                if value is not None:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class ToolMetricsMiddleware(Middleware):
+    """Time every MCP tool call and count outcomes
+
+    ``status`` is ``exception`` when the tool raised, ``futu_error`` when
+    any Futu call made by the tool returned an error code (reported by the
+    server through ``current_call``) and ``ok`` otherwise. The tool name is
+    available to code running inside the call through ``current_tool()``.
+    """
+
+    def __init__(self, duration: Histogram, calls: Counter):
+        self.duration = duration
+        self.calls = calls
+
+    async def on_call_tool(self, context, call_next):
+        tool = context.message.name
+        state = {'tool': tool, 'futu_errors': 0}
+        token = current_call.set(state)
+        started = time.perf_counter()
+        status = 'exception'
+        try:
+            result = await call_next(context)
+            status = 'futu_error' if state['futu_errors'] else 'ok'
+            return result
+        finally:
+            current_call.reset(token)
+            self.duration.observe(time.perf_counter() - started, tool=tool)
+            self.calls.inc(tool=tool, status=status)
@@ -0,0 +1,200 @@
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Legs of the long version of each strategy as (option type, strike offset in widths, quantity).
+# "SAME" takes the requested option type; the short version negates every quantity.
+STRATEGY_LEGS: dict[str, tuple[tuple[str, int, int], ...]] = {
+    'straddle': (('CALL', 0, 1), ('PUT', 0, 1)),
+    'vertical': (('SAME', 0, 1), ('SAME', 1, -1)),
+    'butterfly': (('SAME', 0, 1), ('SAME', 1, -2), ('SAME', 2, 1)),
+    'condor': (('SAME', 0, 1), ('SAME', 1, -1), ('SAME', 2, -1), ('SAME', 3, 1)),
+}
+
+SORT_FIELDS = ('strike', 'net_premium', 'max_profit', 'max_loss', 'reward_risk', 'pnl_at_spot')
+
+
+def _option_price(row: dict[str, Any]) -> float:
+    """Mid of a two-sided quote, else the last price"""
+    bid, ask = row.get('bid_price') or 0, row.get('ask_price') or 0
+    if bid > 0 and ask > 0:
+        return (bid + ask) / 2
+    last = row.get('last_price')
+    return float(last) if last else np.nan
+
+
+class OptionChain:
+    """Strikes of one underlying and expiry with call and put prices as aligned NumPy arrays
+
+    Prices are per share, NaN where an option is missing or has no price.
+    """
+
+    def __init__(self, underlying: str, expiry: str, spot: float, strikes: np.ndarray,
+                 prices: dict[str, np.ndarray], codes: dict[str, np.ndarray], contract_size: float):
+        self.underlying = underlying
+        self.expiry = expiry
+        self.spot = spot
+        self.strikes = strikes
+        self.prices = prices
+        self.codes = codes
+        self.contract_size = contract_size
+
+    @classmethod
+    def from_chain(cls, underlying: str, expiry: str, chain: pd.DataFrame,
+                   snapshots: dict[str, dict[str, Any]], spot: float) -> 'OptionChain':
+        """Build from get_option_chain rows and snapshot rows keyed by option code"""
+        chain = chain[chain['strike_time'].astype(str).str[:10] == expiry]
+        strikes = np.unique(chain['strike_price'].to_numpy(dtype=np.float64))
+        prices = {kind: np.full(len(strikes), np.nan) for kind in ('CALL', 'PUT')}
+        codes = {kind: np.full(len(strikes), None, dtype=object) for kind in ('CALL', 'PUT')}
+        positions = np.searchsorted(strikes, chain['strike_price'].to_numpy(dtype=np.float64))
+        contract_size = 0.0
+        for code, kind, i in zip(chain['code'], chain['option_type'], positions, strict=True):
+            if kind not in prices:
+                continue
+            codes[kind][i] = code
+            row = snapshots.get(code)
+            if row is not None:
+                prices[kind][i] = _option_price(row)
+                size = row.get('option_contract_size') or row.get('lot_size') or 0
+                contract_size = contract_size or float(size)
+        if not contract_size and 'lot_size' in chain and len(chain):
+            contract_size = float(chain['lot_size'].iloc[0])
+        return cls(underlying, expiry, spot, strikes, prices, codes, contract_size)
+
+    def __len__(self) -> int:
+        return len(self.strikes)
+
+
+def _payoff(leg_strikes: np.ndarray, is_call: np.ndarray, qty: np.ndarray, net: np.ndarray,
+            prices: np.ndarray) -> np.ndarray:
+    """Expiry P&L per share of every strategy (rows) at every underlying price (columns)"""
+    diff = prices[None, None, :] - leg_strikes[:, :, None]
+    intrinsic = np.maximum(np.where(is_call[None, :, None], diff, -diff), 0)
+    return np.einsum('nlp,l->np', intrinsic, qty) - net[:, None]
+
+
+def build_strategies(chain: OptionChain, strategy: str, width: int = 1, option_type: str = 'CALL',
+                     side: str = 'long',
+                     payoff_prices: Sequence[float] | None = None) -> list[dict[str, Any]]:
+    """Price one strategy at every usable strike of a chain at once
+
+    Each row anchors the strategy's lowest strike on one strike of the chain,
+    with the other legs ``width`` strikes apart. Rows with a leg that is not
+    listed or has no price are left out. P&L is at expiry and per share;
+    ``net_premium`` is positive for a debit. Expiry payoff is piecewise
+    linear between strikes, so maximum profit and loss are taken over the
+    strikes plus the slope beyond the last one, and breakevens are exact
+    zero crossings. Unlimited profit or loss is reported as None.
+
+    Args:
+        strategy: "straddle", "vertical", "butterfly" or "condor"
+        width: Strikes between adjacent legs
+        option_type: "CALL" or "PUT" legs for vertical, butterfly and condor
+        side: "long" buys the lowest-strike leg as listed in STRATEGY_LEGS, "short" reverses
+            every leg
+        payoff_prices: Underlying prices the ``payoff`` list of every row is evaluated at
+
+    Raises:
+        ValueError: Unknown strategy, option type or side, or a width below 1
+    """
+    if strategy not in STRATEGY_LEGS:
+        raise ValueError(f"Unknown strategy {strategy}, expected one of {', '.join(STRATEGY_LEGS)}")
+    if option_type not in ('CALL', 'PUT'):
+        raise ValueError(f"Unknown option type {option_type}, expected CALL or PUT")
+    if side not in ('long', 'short'):
+        raise ValueError(f"Unknown side {side}, expected long or short")
+    if width < 1:
+        raise ValueError("width must be at least 1")
+
+    legs = [(option_type if kind == 'SAME' else kind, offset, q)
+            for kind, offset, q in STRATEGY_LEGS[strategy]]
+    kinds = [kind for kind, _, _ in legs]
+    offsets = np.array([offset for _, offset, _ in legs]) * width
+    qty = np.array([q for _, _, q in legs], dtype=np.float64) * (1 if side == 'long' else -1)
+    is_call = np.array([kind == 'CALL' for kind in kinds])
+
+    anchors = np.arange(max(len(chain) - offsets.max(), 0))
+    index = anchors[:, None] + offsets[None, :]
+    leg_prices = np.column_stack([chain.prices[kind][index[:, j]]
+                                  for j, kind in enumerate(kinds)]) \
+        if len(anchors) else np.empty((0, len(legs)))
+    usable = ~np.isnan(leg_prices).any(axis=1)
+    index, leg_prices = index[usable], leg_prices[usable]
+    leg_strikes = chain.strikes[index]
+    net = leg_prices @ qty
+
+    points = np.concatenate([[0.0], chain.strikes])
+    # Rounded so that float noise does not turn a zero loss into a tiny one with a huge reward/risk
+    pnl = np.round(_payoff(leg_strikes, is_call, qty, net, points), 8)
+    slope = qty[is_call].sum()
+    max_profit = np.full(len(net), np.inf) if slope > 0 else pnl.max(axis=1, initial=-np.inf)
+    max_loss = np.full(len(net), np.inf) if slope < 0 else \
+        np.maximum(-pnl.min(axis=1, initial=np.inf), 0)
+
+    breakevens: list[list[float]] = [[] for _ in range(len(net))]
+    left, right = pnl[:, :-1], pnl[:, 1:]
+    rows, cols = np.nonzero((left * right < 0) | ((right == 0) & (left != 0)))
+    # Linear interpolation between the two strikes around each sign change
+    lo, hi = left[rows, cols], right[rows, cols]
+    crossings = points[cols] + (points[cols + 1] - points[cols]) * lo / (lo - hi)
+    for row, price in zip(rows.tolist(), crossings.tolist(), strict=True):
+        breakevens[row].append(round(price, 4))
+    if slope:
+        tail = points[-1] - pnl[:, -1] / slope
+        for row in np.flatnonzero(pnl[:, -1] * slope < 0).tolist():
+            breakevens[row].append(round(float(tail[row]), 4))
+
+    at_spot = _payoff(leg_strikes, is_call, qty, net, np.array([chain.spot]))[:, 0]
+    grid = np.asarray(payoff_prices if payoff_prices is not None else [], dtype=np.float64)
+    payoff = _payoff(leg_strikes, is_call, qty, net, grid) if len(grid) else np.empty((len(net), 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        reward_risk = np.where((max_loss > 0) & np.isfinite(max_loss) & np.isfinite(max_profit),
+                               max_profit / max_loss, np.nan)
+
+    codes = np.column_stack([chain.codes[kind][index[:, j]] for j, kind in enumerate(kinds)]) \
+        if len(index) else np.empty((0, len(legs)), dtype=object)
+    return [{
+        'strike': round(float(strikes.mean()), 4),
+        'strikes': strikes.tolist(),
+        'legs': [{'code': code, 'option_type': kind, 'strike_price': strike, 'quantity': int(q),
+                  'price': round(p, 4)}
+                 for code, kind, strike, q, p in zip(codes[i], kinds, strikes.tolist(),
+                                                     qty.tolist(), leg_prices[i].tolist(),
+                                                     strict=True)],
+        'net_premium': round(float(net[i]), 4),
+        'max_profit': _finite(max_profit[i]),
+        'max_loss': _finite(max_loss[i]),
+        'breakevens': breakevens[i],
+        'reward_risk': _finite(reward_risk[i]),
+        'pnl_at_spot': round(float(at_spot[i]), 4),
+        'payoff': np.round(payoff[i], 4).tolist(),
+    } for i, strikes in enumerate(leg_strikes)]
+
+
+def _finite(value: float) -> float | None:
+    # Unlimited (inf) or undefined (NaN) values are not valid JSON
+    return round(float(value), 4) if np.isfinite(value) else None
+
+
+def rank_strategies(rows: list[dict[str, Any]], strike_price: float | None = None,
+                    sort_by: str = 'strike', descending: bool = False,
+                    limit: int | None = None) -> list[dict[str, Any]]:
+    """Keep the strategies centred nearest ``strike_price`` (all when None), sort, cut to ``limit``
+
+    Rows without a value in ``sort_by`` (e.g. unlimited max_profit) sort last.
+
+    Raises:
+        ValueError: ``sort_by`` is not one of SORT_FIELDS
+    """
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"Unknown sort field {sort_by}, expected one of {', '.join(SORT_FIELDS)}")
+    if strike_price is not None and rows:
+        nearest = min(abs(row['strike'] - strike_price) for row in rows)
+        rows = [row for row in rows if abs(row['strike'] - strike_price) == nearest]
+    present = [row for row in rows if row[sort_by] is not None]
+    present.sort(key=lambda row: row[sort_by], reverse=descending)
+    rows = present + [row for row in rows if row[sort_by] is None]
+    return rows if limit is None else rows[:max(limit, 0)]
@@ -0,0 +1,188 @@
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+from futu import ContextStatus
+from loguru import logger
+
+
+class _Slot:
+    """One pooled context plus its routing bookkeeping"""
+
+    def __init__(self, index: int, ctx: Any):
+        self.index = index
+        self.ctx = ctx
+        self.in_flight = 0
+        self.calls = 0
+        self.unhealthy_checks = 0
+        self.replacements = 0
+
+    @property
+    def healthy(self) -> bool:
+        try:
+            return self.ctx.status == ContextStatus.READY
+        except Exception:
+            return False
+
+
+class QuoteContextPool:
+    """Fixed-size pool of OpenQuoteContext connections
+
+    Calls are routed to the healthy context with the fewest in-flight
+    requests. Subscriptions live on the OpenD connection that made them,
+    so anything that depends on subscription state is pinned to slot 0
+    via ``lease(pinned=True)``. A background thread replaces contexts that
+    stay disconnected for ``max_unhealthy_checks`` health checks in a row.
+    Contexts may still be connecting when the pool starts; ``wait_ready``
+    blocks until the primary one is usable.
+    """
+
+    def __init__(self, factory: Callable[..., Any], size: int = 2,
+                 check_interval: float = 10.0, max_unhealthy_checks: int = 3):
+        if size < 1:
+            raise ValueError("Quote context pool size must be at least 1")
+        self.size = size
+        self.check_interval = check_interval
+        self.max_unhealthy_checks = max_unhealthy_checks
+        self._factory = factory
+        self._slots: list[_Slot] = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._monitor = None
+
+    def start(self) -> None:
+        """Create all contexts concurrently and start the health monitor"""
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='futu-pool-init') as ex:
+            contexts = list(ex.map(lambda _: self._factory(), range(self.size)))
+        with self._lock:
+            self._slots = [_Slot(i, ctx) for i, ctx in enumerate(contexts)]
+        self._stop.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop,
+                                         name='futu-pool-monitor', daemon=True)
+        self._monitor.start()
+        logger.info(f"Quote context pool started with {self.size} connection(s)")
+
+    @property
+    def primary(self) -> Any:
+        """Context that owns subscriptions and push handlers"""
+        with self._lock:
+            return self._slots[0].ctx if self._slots else None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the primary context is connected"""
+        with self._lock:
+            return bool(self._slots) and self._slots[0].healthy
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Block until the primary context is connected or ``timeout`` expires"""
+        ctx = self.primary
+        if ctx is None:
+            return False
+        wait = getattr(ctx, 'wait_ready', None)
+        if wait is None:
+            return ctx.status == ContextStatus.READY
+        return wait(timeout)
+
+    def _pick(self, pinned: bool) -> _Slot:
+        if not self._slots:
+            raise RuntimeError("Quote context pool is not started")
+        if pinned:
+            return self._slots[0]
+        healthy = [s for s in self._slots if s.healthy]
+        # Fall back to every slot so callers get Futu's own error rather than a pool error
+        candidates = healthy or self._slots
+        return min(candidates, key=lambda s: (s.in_flight, s.calls))
+
+    @contextmanager
+    def lease(self, pinned: bool = False) -> Iterator[Any]:
+        """Borrow the least-loaded healthy context for the duration of one call"""
+        with self._lock:
+            slot = self._pick(pinned)
+            slot.in_flight += 1
+            slot.calls += 1
+        try:
+            yield slot.ctx
+        finally:
+            with self._lock:
+                slot.in_flight -= 1
+                self._available.notify_all()
+
+    def call(self, method: str, *args, pinned: bool = False, **kwargs) -> Any:
+        """Invoke ``method`` on a leased context"""
+        with self.lease(pinned=pinned) as ctx:
+            return getattr(ctx, method)(*args, **kwargs)
+
+    def _monitor_loop(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.error(f"Quote context pool health check failed: {str(e)}")
+
+    def check_health(self) -> None:
+        """Replace contexts that have been unhealthy for too long"""
+        to_replace = []
+        with self._lock:
+            for slot in self._slots:
+                if slot.healthy:
+                    slot.unhealthy_checks = 0
+                    continue
+                slot.unhealthy_checks += 1
+                if slot.unhealthy_checks >= self.max_unhealthy_checks and slot.in_flight == 0:
+                    to_replace.append(slot)
+
+        for slot in to_replace:
+            logger.warning(f"Replacing quote context #{slot.index} (status: {slot.ctx.status})")
+            if slot.index == 0:
+                logger.warning("Primary quote context replaced, existing subscriptions are lost")
+            try:
+                new_ctx = self._factory()
+            except Exception as e:
+                logger.error(f"Failed to create replacement quote context: {str(e)}")
+                continue
+            with self._lock:
+                old_ctx, slot.ctx = slot.ctx, new_ctx
+                slot.unhealthy_checks = 0
+                slot.replacements += 1
+            try:
+                old_ctx.close()
+            except Exception as e:
+                logger.error(f"Error closing replaced quote context: {str(e)}")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'size': self.size,
+                'ready': bool(self._slots) and self._slots[0].healthy,
+                'healthy': sum(1 for s in self._slots if s.healthy),
+                'contexts': [
+                    {
+                        'index': s.index,
+                        'healthy': s.healthy,
+                        'in_flight': s.in_flight,
+                        'calls': s.calls,
+                        'replacements': s.replacements,
+                    }
+                    for s in self._slots
+                ],
+            }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the monitor, wait briefly for in-flight calls and close every context"""
+        self._stop.set()
+        if self._monitor is not None and self._monitor is not threading.current_thread():
+            self._monitor.join(timeout=1)
+        with self._lock:
+            self._available.wait_for(lambda: all(s.in_flight == 0 for s in self._slots),
+                                     timeout=timeout)
+            slots, self._slots = self._slots, []
+        for slot in slots:
+            try:
+                slot.ctx.close()
+            except Exception as e:
+                logger.error(f"Error closing quote context #{slot.index}: {str(e)}")
+        logger.info(f"Closed quote context pool ({len(slots)} connection(s))")
@@ -0,0 +1,264 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from loguru import logger
+
+from futu_stock_mcp_server.dispatch import DispatchError
+
+# Lower value is served first
+PRIORITIES = {'interactive': 0, 'bulk': 1}
+
+# OpenD request frequency limits as (requests, seconds), from the Futu OpenAPI documentation
+DEFAULT_RATE_LIMITS: dict[str, tuple[int, float]] = {
+    'get_market_snapshot': (60, 30),
+    'request_history_kline': (60, 30),
+    'get_option_chain': (10, 30),
+    'get_option_expiration_date': (60, 30),
+    'get_stock_filter': (10, 30),
+    'get_market_state': (10, 30),
+    'get_plate_list': (10, 30),
+    'get_plate_stock': (10, 30),
+    'get_owner_plate': (10, 30),
+    'get_referencestock_list': (10, 30),
+    'get_capital_flow': (30, 30),
+    'get_capital_distribution': (30, 30),
+    'get_rehab': (60, 30),
+    'get_warrant': (60, 30),
+    'accinfo_query': (10, 30),
+    'position_list_query': (10, 30),
+    'acctradinginfo_query': (10, 30),
+    'order_list_query': (10, 30),
+    'deal_list_query': (10, 30),
+    'get_margin_ratio': (10, 30),
+    'unlock_trade': (10, 30),
+}
+
+WaitObserver = Callable[[str, str, float], None]
+
+
+class RateLimitTimeoutError(DispatchError):
+    """Raised when a call waits longer than ``max_wait`` for its rate limit"""
+
+
+def parse_rate_limits(spec: str) -> dict[str, tuple[int, float]]:
+    """Parse FUTU_RATE_LIMITS, e.g. "get_market_snapshot=60/30,get_stock_filter=10/30"
+
+    A count of 0 removes the limit for that method.
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        method, _, limit = item.partition('=')
+        count, _, seconds = limit.partition('/')
+        limits[method.strip()] = (int(count), float(seconds or 30))
+    return limits
+
+
+class _Waiter:
+    __slots__ = ('grant', 'cancelled', 'enqueued')
+
+    def __init__(self, grant: Callable[[], None]):
+        self.grant = grant
+        self.cancelled = False
+        self.enqueued = time.monotonic()
+
+
+class TokenBucket:
+    """Token bucket that never exceeds ``count`` requests in any ``seconds`` window
+
+    OpenD counts requests over a sliding window, so a full bucket of
+    ``burst`` tokens plus the refill over one window must stay within
+    ``count``: the refill rate is ``(count - burst) / seconds``.
+    """
+
+    def __init__(self, method: str, count: int, seconds: float, burst: int | None = None):
+        self.method = method
+        self.count = count
+        self.seconds = seconds
+        self.burst = burst or max(1, count // 4)
+        self.rate = max(count - self.burst, 1) / seconds
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.waiters: list[tuple[int, int, _Waiter]] = []
+        self.granted = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def record(self, waited: float) -> None:
+        self.granted += 1
+        if waited > 0:
+            self.delayed += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'limit': f'{self.count}/{self.seconds:g}s',
+            'burst': self.burst,
+            'tokens': round(self.tokens, 2),
+            'queued': sum(1 for _, _, w in self.waiters if not w.cancelled),
+            'granted': self.granted,
+            'delayed': self.delayed,
+            'avg_wait': round(self.total_wait / self.delayed, 4) if self.delayed else 0.0,
+            'max_wait': round(self.max_wait, 4),
+        }
+
+
+class RateLimiter:
+    """Per-method token buckets in front of OpenD
+
+    Calls to a limited method take a token, or queue until one is
+    available instead of letting OpenD reject them. Queued calls are served
+    by priority (``interactive`` before ``bulk``) and then in arrival order
+    by a single scheduler thread. Both blocking (``acquire``, for code
+    already on a worker thread such as K-line pagination) and async
+    (``acquire_async``, used before dispatching) callers share the same
+    buckets. Methods without a limit pass straight through.
+    """
+
+    def __init__(self, limits: dict[str, tuple[int, float]], max_wait: float = 30.0,
+                 on_wait: WaitObserver | None = None):
+        self.max_wait = max_wait
+        self._on_wait = on_wait
+        self._buckets = {method: TokenBucket(method, count, seconds)
+                         for method, (count, seconds) in limits.items() if count > 0}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._scheduler: threading.Thread | None = None
+
+    def limited(self, method: str) -> bool:
+        return method in self._buckets
+
+    def budget(self, method: str, calls: int) -> float:
+        """Seconds ``calls`` back-to-back calls of ``method`` wait for tokens from an empty bucket
+
+        0 for methods without a limit.
+        """
+        bucket = self._buckets.get(method)
+        return calls / bucket.rate if bucket is not None else 0.0
+
+    def _try_take(self, bucket: TokenBucket) -> bool:
+        bucket.refill(time.monotonic())
+        if not bucket.waiters and bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.record(0.0)
+            return True
+        return False
+
+    def _enqueue(self, bucket: TokenBucket, priority: str, waiter: _Waiter) -> None:
+        heapq.heappush(bucket.waiters, (PRIORITIES.get(priority, 0), next(self._seq), waiter))
+        if self._scheduler is None or not self._scheduler.is_alive():
+            self._scheduler = threading.Thread(target=self._schedule, name='futu-rate-limiter',
+                                               daemon=True)
+            self._scheduler.start()
+        self._cond.notify_all()
+
+    def _observe(self, method: str, priority: str, waited: float) -> None:
+        if self._on_wait is not None:
+            self._on_wait(method, priority, waited)
+        if waited > 1:
+            logger.debug(f"Rate limited {method} ({priority}) waited {waited:.2f}s")
+
+    def acquire(self, method: str, priority: str = 'interactive') -> float:
+        """Block until ``method`` may be called, returns seconds waited
+
+        Raises:
+            RateLimitTimeoutError: No token became available within ``max_wait``
+        """
+        bucket = self._buckets.get(method)
+        if bucket is None:
+            return 0.0
+        granted = threading.Event()
+        with self._cond:
+            if self._try_take(bucket):
+                self._observe(method, priority, 0.0)
+                return 0.0
+            waiter = _Waiter(granted.set)
+            self._enqueue(bucket, priority, waiter)
+        if not granted.wait(self.max_wait):
+            with self._cond:
+                waiter.cancelled = True
+            if not granted.is_set():
+                raise RateLimitTimeoutError(
+                    f"{method} waited more than {self.max_wait}s for its rate limit")
+        waited = time.monotonic() - waiter.enqueued
+        self._observe(method, priority, waited)
+        return waited
+
+    async def acquire_async(self, method: str, priority: str = 'interactive') -> float:
+        """Wait without blocking the event loop until ``method`` may be called
+
+        Raises:
+            RateLimitTimeoutError: No token became available within ``max_wait``
+        """
+        bucket = self._buckets.get(method)
+        if bucket is None:
+            return 0.0
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        with self._cond:
+            if self._try_take(bucket):
+                self._observe(method, priority, 0.0)
+                return 0.0
+            waiter = _Waiter(grant)
+            self._enqueue(bucket, priority, waiter)
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            raise RateLimitTimeoutError(
+                f"{method} waited more than {self.max_wait}s for its rate limit") from None
+        finally:
+            with self._cond:
+                waiter.cancelled = not future.done() or future.cancelled()
+        waited = time.monotonic() - waiter.enqueued
+        self._observe(method, priority, waited)
+        return waited
+
+    def _schedule(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wake = None
+                for bucket in self._buckets.values():
+                    if not bucket.waiters:
+                        continue
+                    bucket.refill(now)
+                    while bucket.waiters and bucket.tokens >= 1:
+                        _, _, waiter = heapq.heappop(bucket.waiters)
+                        if waiter.cancelled:
+                            continue
+                        try:
+                            waiter.grant()
+                        except RuntimeError:
+                            # The waiting event loop has closed
+                            continue
+                        bucket.tokens -= 1
+                        bucket.record(now - waiter.enqueued)
+                    # Drop cancelled waiters at the head so they do not hold the next wake-up
+                    while bucket.waiters and bucket.waiters[0][2].cancelled:
+                        heapq.heappop(bucket.waiters)
+                    if bucket.waiters:
+                        delay = (1 - bucket.tokens) / bucket.rate
+                        wake = delay if wake is None else min(wake, delay)
+                self._cond.wait(wake)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            for bucket in self._buckets.values():
+                bucket.refill(now)
+            return {method: bucket.stats() for method, bucket in self._buckets.items()
+                    if bucket.granted or bucket.waiters}
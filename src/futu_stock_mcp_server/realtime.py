@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from futu import (
+    RET_OK,
+    BrokerHandlerBase,
+    CurKlineHandlerBase,
+    OrderBookHandlerBase,
+    RTDataHandlerBase,
+    StockQuoteHandlerBase,
+    SubType,
+    TickerHandlerBase,
+)
+from loguru import logger
+
+# Column identifying a row within each pushed series, later pushes for the same key replace it
+SERIES_KEYS = {
+    SubType.TICKER: 'sequence',
+    SubType.RT_DATA: 'time',
+}
+KLINE_SERIES_KEY = 'time_key'
+
+
+def series_key(sub_type: str) -> str:
+    return SERIES_KEYS.get(sub_type, KLINE_SERIES_KEY)
+
+
+class _Series:
+    def __init__(self, rows: list[dict[str, Any]], key: str, maxlen: int):
+        self.key = key
+        self.maxlen = maxlen
+        self.rows: OrderedDict[Any, dict[str, Any]] = OrderedDict((row[key], row) for row in rows)
+        self.received_at = time.time()
+        self._trim()
+
+    def update(self, rows: list[dict[str, Any]]) -> None:
+        for row in rows:
+            k = row[self.key]
+            self.rows[k] = row
+            self.rows.move_to_end(k)
+        self.received_at = time.time()
+        self._trim()
+
+    def _trim(self) -> None:
+        while len(self.rows) > self.maxlen:
+            self.rows.popitem(last=False)
+
+
+class RealtimeStore:
+    """Latest pushed market state per subscribed symbol
+
+    Snapshot-style data (quotes, order books, broker queues) keeps only the
+    latest value. Series data (tickers, time-share, K-lines) is seeded once
+    from a pull and then kept current by pushes, bounded to ``max_rows``
+    rows per symbol. Every entry carries the wall-clock time it was last
+    updated so tools can report staleness.
+    """
+
+    def __init__(self, max_rows: int = 1000):
+        self.max_rows = max_rows
+        self._latest: dict[tuple[str, str], tuple[float, Any]] = {}
+        self._series: dict[tuple[str, str], _Series] = {}
+        self._versions: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.pushes: dict[str, int] = {}
+        self.served = 0
+        self.missed = 0
+
+    def _count_push(self, sub_type: str) -> None:
+        self.pushes[sub_type] = self.pushes.get(sub_type, 0) + 1
+
+    def _bump(self, key: tuple[str, str]) -> None:
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def version(self, sub_type: str, symbol: str) -> int:
+        """Number of updates applied to a symbol, used to detect changes without copying data"""
+        with self._lock:
+            return self._versions.get((sub_type, symbol), 0)
+
+    def put(self, sub_type: str, symbol: str, value: Any, pushed: bool = True) -> None:
+        with self._lock:
+            self._latest[(sub_type, symbol)] = (time.time(), value)
+            self._bump((sub_type, symbol))
+            if pushed:
+                self._count_push(sub_type)
+
+    def get(self, sub_type: str, symbol: str) -> tuple[Any, float] | None:
+        """Return (value, received_at) or None when nothing has been pushed"""
+        with self._lock:
+            entry = self._latest.get((sub_type, symbol))
+            if entry is None:
+                self.missed += 1
+                return None
+            self.served += 1
+            return entry[1], entry[0]
+
+    def seed(self, sub_type: str, symbol: str, rows: list[dict[str, Any]]) -> None:
+        """Replace a series with a freshly pulled one"""
+        with self._lock:
+            self._series[(sub_type, symbol)] = _Series(rows, series_key(sub_type), self.max_rows)
+
+    def extend(self, sub_type: str, symbol: str, rows: list[dict[str, Any]]) -> None:
+        """Apply pushed rows to a series, ignored until the series has been seeded"""
+        with self._lock:
+            self._count_push(sub_type)
+            self._bump((sub_type, symbol))
+            series = self._series.get((sub_type, symbol))
+            if series is not None:
+                series.update(rows)
+
+    def holds(self, sub_type: str, symbol: str) -> bool:
+        """Whether a series is held, without counting a read"""
+        return (sub_type, symbol) in self._series
+
+    def tail(self, sub_type: str, symbol: str,
+             count: int | None = None) -> tuple[list[dict[str, Any]], float] | None:
+        """Return the last ``count`` rows and their received_at, or None if not held"""
+        with self._lock:
+            series = self._series.get((sub_type, symbol))
+            if series is None or (count is not None and count > len(series.rows)):
+                self.missed += 1
+                return None
+            self.served += 1
+            rows = list(series.rows.values())
+            return (rows[-count:] if count else rows), series.received_at
+
+    def drop(self, symbol: str, sub_type: str) -> None:
+        """Forget a symbol once it is no longer subscribed"""
+        with self._lock:
+            self._latest.pop((sub_type, symbol), None)
+            self._series.pop((sub_type, symbol), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._latest.clear()
+            self._series.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'latest': len(self._latest),
+                'series': len(self._series),
+                'pushes': dict(self.pushes),
+                'served': self.served,
+                'missed': self.missed,
+            }
+
+
+class _QuoteHandler(StockQuoteHandlerBase):
+    def __init__(self, store: RealtimeStore):
+        super().__init__()
+        self.store = store
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, data = super().on_recv_rsp(rsp_pb)
+        if ret == RET_OK:
+            self.on_push(data)
+        return ret, data
+
+    def on_push(self, data):
+        for row in data.to_dict('records'):
+            self.store.put(SubType.QUOTE, row['code'], row)
+
+
+class _OrderBookHandler(OrderBookHandlerBase):
+    def __init__(self, store: RealtimeStore):
+        super().__init__()
+        self.store = store
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, data = super().on_recv_rsp(rsp_pb)
+        if ret == RET_OK:
+            self.on_push(data)
+        return ret, data
+
+    def on_push(self, data):
+        self.store.put(SubType.ORDER_BOOK, data['code'], data)
+
+
+class _BrokerHandler(BrokerHandlerBase):
+    def __init__(self, store: RealtimeStore):
+        super().__init__()
+        self.store = store
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, code, frames = super().on_recv_rsp(rsp_pb)
+        if ret == RET_OK:
+            self.on_push((code, frames))
+        return ret, code, frames
+
+    def on_push(self, data):
+        code, (bid, ask) = data
+        self.store.put(SubType.BROKER, code, {
+            'code': code,
+            'bid_broker': bid.to_dict('records'),
+            'ask_broker': ask.to_dict('records'),
+        })
+
+
+class _TickerHandler(TickerHandlerBase):
+    def __init__(self, store: RealtimeStore):
+        super().__init__()
+        self.store = store
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, data = super().on_recv_rsp(rsp_pb)
+        if ret == RET_OK:
+            self.on_push(data)
+        return ret, data
+
+    def on_push(self, data):
+        for code, rows in data.groupby('code'):
+            self.store.extend(SubType.TICKER, code, rows.to_dict('records'))
+
+
+class _RTDataHandler(RTDataHandlerBase):
+    def __init__(self, store: RealtimeStore):
+        super().__init__()
+        self.store = store
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, data = super().on_recv_rsp(rsp_pb)
+        if ret == RET_OK:
+            self.on_push(data)
+        return ret, data
+
+    def on_push(self, data):
+        for code, rows in data.groupby('code'):
+            self.store.extend(SubType.RT_DATA, code, rows.to_dict('records'))
+
+
+class _CurKlineHandler(CurKlineHandlerBase):
+    def __init__(self, store: RealtimeStore):
+        super().__init__()
+        self.store = store
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, data = super().on_recv_rsp(rsp_pb)
+        if ret == RET_OK:
+            self.on_push(data)
+        return ret, data
+
+    def on_push(self, data):
+        for (code, ktype), rows in data.groupby(['code', 'k_type']):
+            self.store.extend(ktype, code, rows.drop(columns=['k_type']).to_dict('records'))
+
+
+def register_handlers(ctx: Any, store: RealtimeStore) -> Any:
+    """Attach push handlers that feed ``store`` to a quote context
+
+    Each handler parses pushes in ``on_recv_rsp`` and hands the parsed SDK
+    value to ``on_push``, which is also how the fake OpenD delivers pushes.
+    """
+    for handler in (_QuoteHandler, _OrderBookHandler, _BrokerHandler,
+                    _TickerHandler, _RTDataHandler, _CurKlineHandler):
+        ctx.set_handler(handler(store))
+    logger.debug(f"Registered real-time push handlers on quote context {id(ctx)}")
+    return ctx
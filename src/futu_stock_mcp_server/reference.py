@@ -0,0 +1,201 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from datetime import date, datetime
+from typing import Any
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from futu import RET_OK
+from loguru import logger
+
+from futu_stock_mcp_server.kline_store import MARKET_TIMEZONES
+from futu_stock_mcp_server.serialize import compact_frame
+
+Fetcher = Callable[[str, str], tuple[int, Any]]
+
+
+def market_date(market: str) -> date:
+    """Current calendar date in the market's timezone"""
+    return datetime.now(ZoneInfo(MARKET_TIMEZONES.get(market, 'Asia/Shanghai'))).date()
+
+
+class ReferenceTable:
+    """get_stock_basicinfo rows of one market and security type, with lookup indexes
+
+    - code: dict from code to row, O(1)
+    - name prefix: case-insensitive sorted names searched with bisect
+    - lot size: row positions per lot size
+    """
+
+    def __init__(self, market: str, stock_type: str, frame: pd.DataFrame, trading_date: date,
+                 fetched_at: float):
+        self.market = market
+        self.stock_type = stock_type
+        self.frame = frame.reset_index(drop=True)
+        self.trading_date = trading_date
+        self.fetched_at = fetched_at
+        self._records = compact_frame(self.frame)['rows']
+        self._columns = list(self.frame.columns)
+        codes = self.frame['code'].tolist() if 'code' in self.frame else []
+        self._by_code = {code: i for i, code in enumerate(codes)}
+        names = self.frame['name'].astype(str).str.lower().tolist() if 'name' in self.frame else []
+        self._names = sorted((name, i) for i, name in enumerate(names))
+        self._by_lot: dict[int, np.ndarray] = {}
+        if 'lot_size' in self.frame and len(self.frame):
+            lots = pd.to_numeric(self.frame['lot_size'], errors='coerce').fillna(0)
+            lots = lots.astype(np.int64).to_numpy()
+            order = np.argsort(lots, kind='stable')
+            values, starts = np.unique(lots[order], return_index=True)
+            for lot, part in zip(values.tolist(), np.split(order, starts[1:]), strict=True):
+                self._by_lot[lot] = part
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def row(self, i: int) -> dict[str, Any]:
+        return dict(zip(self._columns, self._records[i], strict=True))
+
+    def get(self, code: str) -> dict[str, Any] | None:
+        i = self._by_code.get(code)
+        return None if i is None else self.row(i)
+
+    def positions(self, name_prefix: str | None = None,
+                  lot_size: int | None = None) -> list[int]:
+        """Row positions matching every given criterion, in listing order"""
+        selected = None
+        if name_prefix:
+            prefix = name_prefix.lower()
+            lo = bisect.bisect_left(self._names, (prefix,))
+            hi = bisect.bisect_left(self._names, (prefix + '\U0010ffff',))
+            selected = {i for _, i in self._names[lo:hi]}
+        if lot_size is not None:
+            lots = set(self._by_lot.get(int(lot_size), np.array([], dtype=np.intp)).tolist())
+            selected = lots if selected is None else selected & lots
+        return list(range(len(self))) if selected is None else sorted(selected)
+
+    def records(self, positions: list[int]) -> list[dict[str, Any]]:
+        return [self.row(i) for i in positions]
+
+
+class ReferenceStore:
+    """Security reference data cached in memory and on disk for one trading day
+
+    Tables are keyed on (market, security type) and valid for the calendar
+    date in the market's timezone they were fetched on. A table from an
+    earlier date is re-downloaded on first use, then written to
+    ``{root}/{market}/{stock_type}.json``, so a restart on the same day
+    loads it from disk instead of OpenD. An empty ``root`` keeps tables in
+    memory only.
+
+    Args:
+        fetch: ``fetch(market, stock_type)`` returning (ret, DataFrame) from get_stock_basicinfo
+    """
+
+    def __init__(self, root: str, fetch: Fetcher):
+        self.root = root
+        self._fetch = fetch
+        self._tables: dict[tuple[str, str], ReferenceTable] = {}
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.hits = 0
+        self.disk_loads = 0
+        self.fetches = 0
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _lock(self, key: tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, market: str, stock_type: str) -> str:
+        return os.path.join(self.root, market, f'{stock_type}.json')
+
+    def peek(self, market: str, stock_type: str = 'STOCK') -> ReferenceTable | None:
+        """Today's table if it is already in memory, without blocking"""
+        key = (market.upper(), str(stock_type))
+        table = self._tables.get(key)
+        if table is None or table.trading_date != market_date(key[0]):
+            return None
+        self.hits += 1
+        return table
+
+    def get(self, market: str, stock_type: str = 'STOCK') -> tuple[int, Any]:
+        """Return today's table for a market and security type (blocking on a miss)
+
+        Returns:
+            (RET_OK, ReferenceTable) or (ret, error message)
+        """
+        key = (market.upper(), str(stock_type))
+        today = market_date(key[0])
+        table = self._tables.get(key)
+        if table is not None and table.trading_date == today:
+            self.hits += 1
+            return RET_OK, table
+        with self._lock(key):
+            table = self._tables.get(key)
+            if table is not None and table.trading_date == today:
+                self.hits += 1
+                return RET_OK, table
+            table = self._load(*key, today)
+            if table is None:
+                ret, frame = self._fetch(*key)
+                self.fetches += 1
+                if ret != RET_OK:
+                    return ret, frame
+                table = ReferenceTable(*key, frame, today, time.time())
+                self._save(table)
+            else:
+                self.disk_loads += 1
+            self._tables[key] = table
+            return RET_OK, table
+
+    def _load(self, market: str, stock_type: str, today: date) -> ReferenceTable | None:
+        if not self.root:
+            return None
+        path = self._path(market, stock_type)
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+            if saved['trading_date'] != today.isoformat():
+                return None
+            frame = pd.DataFrame(saved['rows'], columns=saved['columns'])
+            return ReferenceTable(market, stock_type, frame, today, saved['fetched_at'])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable reference data {path}: {str(e)}")
+            return None
+
+    def _save(self, table: ReferenceTable) -> None:
+        if not self.root:
+            return
+        path = self._path(table.market, table.stock_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({
+                    'market': table.market,
+                    'stock_type': table.stock_type,
+                    'trading_date': table.trading_date.isoformat(),
+                    'fetched_at': table.fetched_at,
+                    **compact_frame(table.frame),
+                }, f, default=str)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not persist reference data {path}: {str(e)}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'tables': {f'{market}/{stock_type}': {'rows': len(table),
+                                                  'trading_date': table.trading_date.isoformat()}
+                       for (market, stock_type), table in self._tables.items()},
+            'hits': self.hits,
+            'disk_loads': self.disk_loads,
+            'fetches': self.fetches,
+        }
@@ -0,0 +1,103 @@
+import re
+
+import numpy as np
+
+from futu_stock_mcp_server.kline_store import KLINE_DTYPE
+
+# Regular trading sessions per market prefix, as (open, close) minutes after local midnight
+SESSIONS: dict[str, tuple[tuple[int, int], ...]] = {
+    'HK': ((570, 720), (780, 960)),
+    'US': ((570, 960),),
+    'SH': ((570, 690), (780, 900)),
+    'SZ': ((570, 690), (780, 900)),
+}
+
+# Minute K-line types OpenD serves itself; other K_<n>M types only exist through resampling
+NATIVE_MINUTE_KTYPES = {'K_1M', 'K_3M', 'K_5M', 'K_15M', 'K_30M', 'K_60M'}
+
+_MINUTE_KTYPE = re.compile(r'^K_(\d+)M$')
+
+
+def ktype_minutes(ktype: str) -> int | None:
+    """Bar length of an intraday K-line type, e.g. "K_10M" -> 10, None for day and longer types"""
+    match = _MINUTE_KTYPE.match(ktype)
+    return int(match.group(1)) if match and int(match.group(1)) > 0 else None
+
+
+def bucket_ends(market: str, minutes: int) -> np.ndarray:
+    """End minute of every ``minutes`` bar of a trading day, as OpenD stamps them
+
+    Bars restart at each session open, so a bar never spans the lunch break,
+    and the last bar of a session ends at the close even when it is shorter.
+    """
+    ends = []
+    for start, end in SESSIONS.get(market, SESSIONS['HK']):
+        ends.extend(range(start + minutes, end + 1, minutes))
+        if (end - start) % minutes:
+            ends.append(end)
+    return np.array(ends, dtype=np.int64)
+
+
+def bucket_starts(market: str, minutes: int) -> np.ndarray:
+    """Start minute of every bar of ``bucket_ends``, the session open or the previous bar's end"""
+    starts = []
+    for start, end in SESSIONS.get(market, SESSIONS['HK']):
+        starts.extend(range(start, end, minutes))
+    return np.array(starts, dtype=np.int64)
+
+
+def resample(bars: np.ndarray, market: str, minutes: int, drop_partial: bool = False) -> np.ndarray:
+    """Aggregate 1-minute KLINE_DTYPE bars into ``minutes`` bars
+
+    Every 1-minute bar goes to the first bar of its day that ends at or
+    after it, so opening auction bars stamped at the open join the first
+    bar. Bars after the last close (extended hours) are dropped. Aggregation
+    is vectorized with ``reduceat`` over the runs of equal buckets: open and
+    last_close of the first bar, close and pe_ratio of the last, high/low
+    extremes and volume, turnover and turnover_rate sums. change_rate is
+    recomputed against last_close.
+
+    Args:
+        bars: 1-minute bars sorted by time_key
+        drop_partial: Leave out the first bar when ``bars`` start after its first minute, as
+            when they are the tail of a longer series
+    """
+    if minutes == 1 or len(bars) == 0:
+        return bars
+    ends = bucket_ends(market, minutes)
+    times = bars['time_key'].astype(np.int64)
+    days = times // 86400
+    minute = (times % 86400) // 60
+    slot = np.searchsorted(ends, minute, side='left')
+    keep = slot < len(ends)
+    if drop_partial and keep.any():
+        first = np.argmax(keep)
+        # The first minute of a bar is stamped one minute after its start, or at the open
+        if minute[first] > bucket_starts(market, minutes)[slot[first]] + 1:
+            keep &= (days != days[first]) | (slot != slot[first])
+    if not keep.all():
+        bars, days, slot = bars[keep], days[keep], slot[keep]
+        if len(bars) == 0:
+            return np.zeros(0, dtype=KLINE_DTYPE)
+    keys = days * len(ends) + slot
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    last = np.append(starts[1:], len(bars)) - 1
+
+    out = np.zeros(len(starts), dtype=KLINE_DTYPE)
+    out['time_key'] = ((days[starts] * 86400) + ends[slot[starts]] * 60).astype('datetime64[s]')
+    out['open'] = bars['open'][starts]
+    out['close'] = bars['close'][last]
+    out['high'] = np.fmax.reduceat(bars['high'], starts)
+    out['low'] = np.fmin.reduceat(bars['low'], starts)
+    out['pe_ratio'] = bars['pe_ratio'][last]
+    out['volume'] = np.add.reduceat(bars['volume'], starts)
+    for field in ('turnover', 'turnover_rate'):
+        values = bars[field]
+        out[field] = np.add.reduceat(np.nan_to_num(values), starts)
+        # A field OpenD did not send stays missing rather than becoming 0
+        out[field][np.isnan(np.fmax.reduceat(values, starts))] = np.nan
+    out['last_close'] = bars['last_close'][starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (out['close'] / out['last_close'] - 1) * 100
+        out['change_rate'] = np.where(out['last_close'] > 0, change, np.nan)
+    return out
@@ -0,0 +1,149 @@
+import asyncio
+import re
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from futu import SubType
+from loguru import logger
+from pydantic import AnyUrl
+
+from futu_stock_mcp_server.realtime import RealtimeStore
+
+# Path suffix of each market resource and the subscription that feeds it
+RESOURCE_SUB_TYPES = {
+    'quote': SubType.QUOTE,
+    'ticker': SubType.TICKER,
+    'orderbook': SubType.ORDER_BOOK,
+}
+
+# market://{symbol} is kept as an alias of market://{symbol}/quote
+_MARKET_URI = re.compile(r'^market://(?P<symbol>[^/]+?)(?:/(?P<kind>[a-z]+))?/?$')
+
+SubscriptionHook = Callable[[str, str, str], Awaitable[None]]
+
+
+def parse_market_uri(uri: str) -> tuple[str, str] | None:
+    """Return (symbol, sub_type) for a market resource URI, or None if it is not one"""
+    match = _MARKET_URI.match(str(uri))
+    if not match:
+        return None
+    sub_type = RESOURCE_SUB_TYPES.get(match.group('kind') or 'quote')
+    if sub_type is None:
+        return None
+    return match.group('symbol'), sub_type
+
+
+class ResourceNotifier:
+    """Turn pushed market data into MCP resource-updated notifications
+
+    Sessions subscribe to ``market://`` URIs. Every ``interval`` seconds the
+    notifier compares the RealtimeStore version of each subscribed symbol
+    with the last one it announced and sends a single
+    ``notifications/resources/updated`` per changed URI, so a burst of
+    pushes becomes one notification and clients re-read the resource at
+    their own pace. ``on_subscribe(client, symbol, sub_type)`` and
+    ``on_unsubscribe`` keep the OpenD subscription alive while any session
+    is watching; sessions whose notifications fail are dropped.
+    """
+
+    def __init__(self, store: RealtimeStore, interval: float = 0.5,
+                 on_subscribe: SubscriptionHook | None = None,
+                 on_unsubscribe: SubscriptionHook | None = None):
+        self.store = store
+        self.interval = interval
+        self._on_subscribe = on_subscribe
+        self._on_unsubscribe = on_unsubscribe
+        self._watchers: dict[str, set[Any]] = {}
+        self._announced: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+        self.notifications = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def client_key(session: Any) -> str:
+        return f'resource:{id(session)}'
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def subscribe(self, uri: str, session: Any) -> None:
+        """Start notifying ``session`` about ``uri``
+
+        Raises:
+            ValueError: If the URI is not a market resource
+        """
+        uri = str(uri)
+        parsed = parse_market_uri(uri)
+        if parsed is None:
+            raise ValueError(f'Unsupported resource URI: {uri}')
+        watchers = self._watchers.get(uri, set())
+        if session in watchers:
+            return
+        if self._on_subscribe is not None:
+            await self._on_subscribe(self.client_key(session), *parsed)
+        watchers.add(session)
+        self._watchers[uri] = watchers
+        self._announced.setdefault(uri, self.store.version(parsed[1], parsed[0]))
+        self._ensure_running()
+        logger.debug(f"Resource subscribed: {uri} ({len(watchers)} session(s))")
+
+    async def unsubscribe(self, uri: str, session: Any) -> None:
+        uri = str(uri)
+        watchers = self._watchers.get(uri)
+        if not watchers or session not in watchers:
+            return
+        watchers.discard(session)
+        if not watchers:
+            del self._watchers[uri]
+            self._announced.pop(uri, None)
+        parsed = parse_market_uri(uri)
+        if self._on_unsubscribe is not None and parsed is not None:
+            try:
+                await self._on_unsubscribe(self.client_key(session), *parsed)
+            except Exception as e:
+                logger.warning(f"Failed to release subscription for {uri}: {str(e)}")
+        logger.debug(f"Resource unsubscribed: {uri}")
+
+    async def flush(self) -> int:
+        """Notify every session whose resources changed since the last flush
+
+        Returns:
+            Number of notifications sent
+        """
+        sent = 0
+        for uri, watchers in list(self._watchers.items()):
+            symbol, sub_type = parse_market_uri(uri)
+            version = self.store.version(sub_type, symbol)
+            announced = self._announced.get(uri, 0)
+            if version == announced:
+                continue
+            self._announced[uri] = version
+            self.coalesced += max(version - announced - 1, 0)
+            for session in list(watchers):
+                try:
+                    await session.send_resource_updated(AnyUrl(uri))
+                    sent += 1
+                except Exception as e:
+                    logger.info(f"Dropping resource subscriber for {uri}: {str(e)}")
+                    await self.unsubscribe(uri, session)
+        self.notifications += sent
+        return sent
+
+    async def _run(self) -> None:
+        while self._watchers:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Resource notification flush failed: {str(e)}")
+        self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'interval': self.interval,
+            'uris': len(self._watchers),
+            'sessions': len({id(s) for watchers in self._watchers.values() for s in watchers}),
+            'notifications': self.notifications,
+            'coalesced': self.coalesced,
+        }
@@ -0,0 +1,100 @@
+from collections.abc import Callable
+from typing import Any, Literal
+
+import pandas as pd
+import pydantic_core
+
+# "default" keeps each tool's historical layout, "compact" lists column names once plus row arrays
+ResponseFormat = Literal['default', 'compact']
+
+
+def project_frame(frame: pd.DataFrame, fields: list[str] | None = None) -> pd.DataFrame:
+    """Keep only the requested columns, in the requested order, ignoring unknown names"""
+    if not fields:
+        return frame
+    return frame[[f for f in dict.fromkeys(fields) if f in frame.columns]]
+
+
+def compact_frame(frame: pd.DataFrame, fields: list[str] | None = None) -> dict[str, Any]:
+    """Encode a DataFrame as ``{'columns': [...], 'rows': [[...], ...]}``
+
+    The index is dropped and missing values become None, so the result is
+    plain JSON without the per-cell keys and index labels of ``to_dict()``.
+    """
+    frame = project_frame(frame, fields)
+    values = frame.astype(object).where(frame.notna(), None)
+    return {'columns': list(frame.columns), 'rows': values.to_numpy().tolist()}
+
+
+def _json_value(value: Any) -> Any:
+    # NaN is not valid JSON, compact output uses null like compact_frame
+    return None if isinstance(value, float) and value != value else value
+
+
+def compact_records(records: list[dict[str, Any]],
+                    fields: list[str] | None = None) -> dict[str, Any]:
+    """Encode a list of row dicts the same way as ``compact_frame``
+
+    Columns are the union of the records' keys; with ``fields``, only the
+    requested names that appear in at least one record, in the requested order.
+    """
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    if fields:
+        present = set(columns)
+        columns = [f for f in dict.fromkeys(fields) if f in present]
+    rows = [[_json_value(record.get(c)) for c in columns] for record in records]
+    return {'columns': columns, 'rows': rows}
+
+
+def shape_records(records: list[dict[str, Any]], response_format: ResponseFormat = 'default',
+                  fields: list[str] | None = None) -> Any:
+    """Return row dicts in the requested format, optionally projected to ``fields``"""
+    if response_format == 'compact':
+        return compact_records(records, fields)
+    if not fields:
+        return records
+    keep = list(dict.fromkeys(fields))
+    return [{f: record[f] for f in keep if f in record} for record in records]
+
+
+# Order book levels arrive as (price, volume, order_num, details) tuples
+BOOK_LEVEL_COLUMNS = ('price', 'volume', 'order_num', 'details')
+
+
+def shape_levels(levels: list[Any], response_format: ResponseFormat = 'default',
+                 fields: list[str] | None = None) -> Any:
+    """Return order book levels in the requested format
+
+    The default format without ``fields`` keeps the level tuples as they are;
+    otherwise each level is named by BOOK_LEVEL_COLUMNS and shaped like ``shape_records``.
+    """
+    if response_format == 'default' and not fields:
+        return levels
+    # Levels without order details have three fields, not four
+    records = [dict(zip(BOOK_LEVEL_COLUMNS, level, strict=False)) for level in levels]
+    return shape_records(records, response_format, fields)
+
+
+def shape_frame(frame: pd.DataFrame, response_format: ResponseFormat = 'default',
+                fields: list[str] | None = None, orient: str = 'dict') -> Any:
+    """Return a DataFrame in the requested format
+
+    Args:
+        orient: ``DataFrame.to_dict`` orientation used by the default format
+    """
+    if response_format == 'compact':
+        return compact_frame(frame, fields)
+    return project_frame(frame, fields).to_dict(orient)
+
+
+def json_serializer(indent: int | None = 2) -> Callable[[Any], str]:
+    """Tool result serializer matching FastMCP's default, with configurable indentation
+
+    ``indent`` of 0 or None emits JSON without whitespace, which matters most
+    for compact responses since every row value would otherwise get its own line.
+    """
+    indent = indent or None
+
+    def serialize(data: Any) -> str:
+        return pydantic_core.to_json(data, fallback=str, indent=indent).decode()
+    return serialize
@@ -1,21 +1,54 @@
 from contextlib import asynccontextmanager
+from collections import Counter
 from collections.abc import AsyncIterator
-from typing import Dict, Any, List, Optional
-from futu import OpenQuoteContext, OpenSecTradeContext, TrdMarket, SecurityFirm, RET_OK
+from typing import Dict, Any, List, Literal, Optional, Tuple
+from futu import OpenSecTradeContext, SecurityFirm, SecurityType, AuType, SubType, RET_OK, RET_ERROR
 import json
 import asyncio
+import numpy as np
+import pandas as pd
+import functools
 from loguru import logger
 import os
 import sys
 from dotenv import load_dotenv
-from fastmcp import FastMCP
+from fastmcp import FastMCP, Context
+from futu_stock_mcp_server.dispatch import DispatchError, DispatchTimeoutError, FutuDispatcher
+from futu_stock_mcp_server.pool import QuoteContextPool
+from futu_stock_mcp_server.contexts import ReadyQuoteContext
+from futu_stock_mcp_server.cache import TTLCache
+from futu_stock_mcp_server.kline_store import (KlineStore, array_to_frame, collect_pages,
+                                               frame_to_array)
+from futu_stock_mcp_server.resample import (NATIVE_MINUTE_KTYPES, bucket_ends, ktype_minutes,
+                                            resample)
+from futu_stock_mcp_server.indicators import (DEFAULT_PARAMS, compute as compute_indicators,
+                                              parse_spec, stack)
+from futu_stock_mcp_server.subscription import validate_subscription, SubscriptionManager
+from futu_stock_mcp_server.realtime import RealtimeStore, register_handlers
+from futu_stock_mcp_server.resources import ResourceNotifier
+from futu_stock_mcp_server.serialize import (ResponseFormat, compact_frame, json_serializer,
+                                             shape_frame, shape_levels, shape_records)
+from futu_stock_mcp_server.metrics import (MetricsRegistry, ToolMetricsMiddleware, current_call,
+                                           current_tool)
+from futu_stock_mcp_server.ratelimit import DEFAULT_RATE_LIMITS, RateLimiter, parse_rate_limits
+from futu_stock_mcp_server.singleflight import CoalescingMiddleware
+from futu_stock_mcp_server.universe import UniverseSnapshot
+from futu_stock_mcp_server.reference import ReferenceStore, market_date
+from futu_stock_mcp_server.trade_pool import TradeContextPool
+from futu_stock_mcp_server.options import (SORT_FIELDS, OptionChain, build_strategies,
+                                          rank_strategies)
+from futu_stock_mcp_server.trade_cache import (DEAL_SENSITIVE, TradeStateCache,
+                                              register_trade_handlers)
+from fastmcp.exceptions import ResourceError
+from starlette.responses import PlainTextResponse
 
 import atexit
 import signal
 import fcntl
 import psutil
+import threading
 import time
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 # Get the project root directory and add it to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -55,11 +88,428 @@ PID_FILE = os.path.join(project_root, '.futu_mcp.pid')
 LOCK_FILE = os.path.join(project_root, '.futu_mcp.lock')
 
 # Global variables
-quote_ctx = None
-trade_ctx = None
+quote_pool = None
+sub_manager = None
 lock_fd = None
 _is_shutting_down = False
-_is_trade_initialized = False
+
+# Seconds to wait for OpenD while a connection is still being established
+connect_timeout = float(os.getenv('FUTU_CONNECT_TIMEOUT', '10'))
+
+# FUTU_FAKE_OPEND=1 replaces OpenD with synthetic data for load tests on machines without a gateway
+if os.getenv('FUTU_FAKE_OPEND', '0') == '1':
+    try:
+        from futu_stock_mcp_server.fake_opend import FakeQuoteContext as QuoteContext
+        from futu_stock_mcp_server.fake_opend import FakeTradeContext as TradeContext
+    except ImportError:
+        logger.error("FUTU_FAKE_OPEND=1 needs a source checkout, "
+                     "the fake OpenD is not part of the wheel")
+        sys.exit(1)
+    logger.warning("FUTU_FAKE_OPEND=1: serving synthetic market data, no OpenD connection is made")
+else:
+    QuoteContext, TradeContext = ReadyQuoteContext, OpenSecTradeContext
+
+# Blocking Futu SDK calls run on this executor so tools never stall the event loop
+dispatcher = FutuDispatcher(
+    max_workers=int(os.getenv('FUTU_EXECUTOR_WORKERS', '8')),
+    max_queue=int(os.getenv('FUTU_EXECUTOR_QUEUE', '64')),
+    timeout=float(os.getenv('FUTU_CALL_TIMEOUT', '30'))
+)
+logger.info(f"Futu dispatcher: workers={dispatcher.max_workers}, queue={dispatcher.max_queue}, "
+            f"timeout={dispatcher.timeout}s")
+
+# Prometheus metrics served at FUTU_METRICS_PATH next to the MCP endpoint
+metrics = MetricsRegistry()
+tool_seconds = metrics.histogram(
+    'futu_mcp_tool_duration_seconds', 'MCP tool call latency including serialization', ['tool'])
+tool_calls = metrics.counter(
+    'futu_mcp_tool_calls_total', 'MCP tool calls by outcome (ok, futu_error, exception)',
+    ['tool', 'status'])
+futu_call_seconds = metrics.histogram(
+    'futu_call_duration_seconds',
+    'Time spent inside blocking Futu calls on the executor, excluding queueing',
+    ['method'])
+futu_errors = metrics.counter(
+    'futu_call_errors_total', 'Futu calls that returned an error code or raised',
+    ['method', 'code'])
+serialization_seconds = metrics.histogram(
+    'futu_mcp_serialization_duration_seconds',
+    'Time spent shaping results (DataFrame to dict) and encoding them as JSON', ['tool', 'stage'])
+
+coalesced_calls = metrics.counter(
+    'futu_mcp_coalesced_calls_total', 'Tool calls that shared an identical in-flight call',
+    ['tool'])
+ratelimit_wait_seconds = metrics.histogram(
+    'futu_ratelimit_wait_seconds', 'Time Futu calls waited for their OpenD frequency limit',
+    ['method', 'priority'])
+
+# Token buckets matching OpenD's per-API frequency limits, overridable with FUTU_RATE_LIMITS
+rate_limiter = RateLimiter(
+    {**DEFAULT_RATE_LIMITS, **parse_rate_limits(os.getenv('FUTU_RATE_LIMITS', ''))},
+    max_wait=float(os.getenv('FUTU_RATE_LIMIT_MAX_WAIT', '30')),
+    on_wait=lambda method, priority, waited: ratelimit_wait_seconds.observe(
+        waited, method=method, priority=priority)
+)
+
+def record_futu_error(method: str, code: Any):
+    futu_errors.inc(method=method, code=code)
+    call = current_call.get()
+    if call is not None:
+        call['futu_errors'] += 1
+
+async def run_futu(fn, *args, label: Optional[str] = None, priority: str = 'interactive',
+                   timeout: Optional[float] = None, **kwargs):
+    """Run a blocking Futu SDK call on the dispatcher and await its result
+
+    Rate-limited methods first wait for a token, without holding a worker.
+
+    Args:
+        label: Method name used for metrics and rate limits, defaults to the callable's name
+        priority: "interactive" or "bulk"; queued interactive calls go first
+        timeout: Seconds the call may take, defaults to FUTU_CALL_TIMEOUT
+    """
+    label = label or getattr(fn, '__name__', 'call')
+
+    @functools.wraps(fn)
+    def timed(*call_args, **call_kwargs):
+        with futu_call_seconds.time(method=label):
+            return fn(*call_args, **call_kwargs)
+
+    try:
+        await rate_limiter.acquire_async(label, priority)
+        result = await dispatcher.run(timed, *args, timeout=timeout, **kwargs)
+    except Exception as e:
+        record_futu_error(label, type(e).__name__)
+        raise
+    if isinstance(result, tuple) and result and result[0] != RET_OK:
+        record_futu_error(label, result[0])
+    return result
+
+async def run_quote(method: str, *args, pinned: bool = False, priority: str = 'interactive',
+                    **kwargs):
+    """Run a quote context method on a pooled connection
+
+    Args:
+        method: OpenQuoteContext method name, e.g. "get_market_snapshot"
+        pinned: Route to the primary connection, required for anything that
+            depends on subscriptions made through this server
+        priority: "interactive" or "bulk", see run_futu
+    """
+    if quote_pool is None:
+        raise RuntimeError("Quote connection is not initialized")
+    return await run_futu(quote_pool.call, method, *args, pinned=pinned, label=method,
+                          priority=priority, **kwargs)
+
+# Short-lived per-symbol caches for the quote tools agents poll the hardest
+cache_max_entries = int(os.getenv('FUTU_CACHE_MAX_ENTRIES', '5000'))
+quote_cache = TTLCache(float(os.getenv('FUTU_QUOTE_CACHE_TTL', '1')), cache_max_entries)
+snapshot_cache = TTLCache(float(os.getenv('FUTU_SNAPSHOT_CACHE_TTL', '1')), cache_max_entries)
+# Option chains list contracts, not prices, so they are kept much longer
+option_chain_cache = TTLCache(float(os.getenv('FUTU_OPTION_CHAIN_CACHE_TTL', '600')),
+                              cache_max_entries)
+
+def client_key(ctx: Optional[Context]) -> str:
+    """Identify the calling MCP client for subscription reference counting"""
+    try:
+        return ctx.session_id or ctx.client_id or 'default'
+    except (AttributeError, LookupError, RuntimeError, ValueError):
+        return 'default'
+
+async def ensure_subscribed(symbols: List[str], sub_types: List[str]):
+    """Subscribe on demand before a real-time read, returns (ret, error message)"""
+    if sub_manager is None:
+        raise RuntimeError("Quote connection is not initialized")
+    return await run_futu(sub_manager.ensure, symbols, sub_types, label='subscribe')
+
+async def read_latest(sub_type: str, symbol: str, pull):
+    """Serve snapshot-style data from pushes, pulling and seeding on a miss
+
+    Args:
+        pull: Coroutine function returning (ret, value) from OpenD
+
+    Returns:
+        (RET_OK, value, freshness fields) or (ret, error, None)
+    """
+    held = realtime_store.get(sub_type, symbol)
+    if held is not None:
+        sub_manager.touch([symbol], [sub_type])
+        return RET_OK, held[0], freshness(held[1], 'push')
+    ret, msg = await ensure_subscribed([symbol], [sub_type])
+    if ret != RET_OK:
+        return ret, msg, None
+    ret, value = await pull()
+    if ret != RET_OK:
+        return ret, value, None
+    realtime_store.put(sub_type, symbol, value, pushed=False)
+    return RET_OK, value, freshness(time.time(), 'pull')
+
+async def read_series(sub_type: str, symbol: str, pull, count: Optional[int] = None):
+    """Serve series data (ticks, time-share, K-lines) from pushes, seeding on a miss
+
+    Args:
+        pull: Coroutine function returning (ret, DataFrame) from OpenD
+        count: Number of most recent rows required
+
+    Returns:
+        (RET_OK, rows, freshness fields) or (ret, error, None)
+    """
+    held = realtime_store.tail(sub_type, symbol, count)
+    if held is not None:
+        sub_manager.touch([symbol], [sub_type])
+        return RET_OK, held[0], freshness(held[1], 'push')
+    ret, msg = await ensure_subscribed([symbol], [sub_type])
+    if ret != RET_OK:
+        return ret, msg, None
+    ret, data = await pull()
+    if ret != RET_OK:
+        return ret, data, None
+    rows = data.to_dict('records')
+    realtime_store.seed(sub_type, symbol, rows)
+    return RET_OK, rows, freshness(time.time(), 'pull')
+
+# Most codes OpenD accepts in one request; longer lists are split into chunks fetched concurrently
+chunk_sizes = {
+    'get_market_snapshot': int(os.getenv('FUTU_SNAPSHOT_CHUNK_SIZE', '400')),
+    'get_stock_quote': int(os.getenv('FUTU_QUOTE_CHUNK_SIZE', '400')),
+}
+
+async def fetch_chunked(method: str, symbols: List[str], pinned: bool = False):
+    """Call a per-symbol quote method in chunks of at most ``chunk_sizes[method]`` codes
+
+    Chunks are requested concurrently; each one takes its own rate limit token,
+    so a list far above the per-request limit queues instead of being rejected.
+
+    Returns:
+        (ret, error, records): RET_OK and None when every chunk succeeded, else the
+        first failure; records of the successful chunks are returned either way
+    """
+    size = chunk_sizes.get(method) or len(symbols)
+    chunks = [symbols[i:i + size] for i in range(0, len(symbols), size)]
+    results = await asyncio.gather(*(run_quote(method, chunk, pinned=pinned) for chunk in chunks))
+    records, error = [], None
+    for ret, data in results:
+        if ret != RET_OK:
+            error = error or (ret, data)
+            continue
+        records.extend(data.to_dict('records') if hasattr(data, 'to_dict') else data)
+    if error:
+        return error[0], error[1], records
+    return RET_OK, None, records
+
+async def fetch_per_symbol(cache: TTLCache, method: str, symbols: List[str], pinned: bool = False,
+                           sub_type: Optional[str] = None):
+    """Serve cached rows and fetch only the missing symbols from OpenD
+
+    Args:
+        sub_type: Subscription the OpenD call depends on, subscribed on demand for the misses
+
+    Returns:
+        (RET_OK, rows, received_at) where rows follow the order of ``symbols`` and
+        received_at maps each symbol to when its row was fetched, or (ret, error, None)
+
+    Note:
+        Missing symbols are fetched in chunks (see fetch_chunked). When a chunk
+        fails the call returns its error, but rows of the other chunks are
+        still cached, so a retry only asks OpenD for the failed chunk.
+    """
+    cached, missing = cache.get_many(symbols)
+    if missing:
+        if sub_type:
+            ret, msg = await ensure_subscribed(missing, [sub_type])
+            if ret != RET_OK:
+                return ret, msg, None
+        ret, error, records = await fetch_chunked(method, missing, pinned=pinned)
+        now = time.time()
+        fetched = {record['code']: (now, record) for record in records}
+        cache.put_many(fetched)
+        if ret != RET_OK:
+            return ret, error, None
+        cached.update(fetched)
+    rows = [cached[symbol][1] for symbol in symbols if symbol in cached]
+    received_at = {symbol: entry[0] for symbol, entry in cached.items()}
+    return RET_OK, rows, received_at
+
+def call_bulk(method: str, *args, **kwargs):
+    """Blocking quote call for background work, queued behind interactive calls for rate limits"""
+    if quote_pool is None:
+        raise RuntimeError("Quote connection is not initialized")
+    rate_limiter.acquire(method, 'bulk')
+    with futu_call_seconds.time(method=method):
+        result = quote_pool.call(method, *args, **kwargs)
+    if isinstance(result, tuple) and result and result[0] != RET_OK:
+        record_futu_error(method, result[0])
+    return result
+
+# Security lists per market and type, persisted for the trading day;
+# FUTU_REFERENCE_DIR= keeps them in memory only
+reference_store = ReferenceStore(
+    os.getenv('FUTU_REFERENCE_DIR', os.path.join(project_root, 'data', 'reference')),
+    lambda market, stock_type: call_bulk('get_stock_basicinfo', market, stock_type)
+)
+
+async def get_reference(market: str, stock_type: str = SecurityType.STOCK):
+    """Today's reference table from memory, or from disk or OpenD on a worker thread
+
+    Returns:
+        (RET_OK, ReferenceTable) or (ret, error message)
+    """
+    table = reference_store.peek(market, stock_type)
+    if table is not None:
+        return RET_OK, table
+    return await run_futu(reference_store.get, market, stock_type, label='reference_data')
+
+def list_stock_codes(market: str):
+    ret, table = reference_store.get(market, SecurityType.STOCK)
+    return (ret, table.frame) if ret == RET_OK else (ret, table)
+
+# Whole-market snapshot tables for screening, refreshed in the background
+universe = UniverseSnapshot(
+    list_stock_codes,
+    functools.partial(call_bulk, 'get_market_snapshot'),
+    markets=filter(None, (m.strip() for m in os.getenv('FUTU_UNIVERSE_MARKETS', '').split(','))),
+    interval=float(os.getenv('FUTU_UNIVERSE_REFRESH_INTERVAL', '60')),
+    chunk_size=chunk_sizes['get_market_snapshot']
+)
+
+# Latest pushed state per subscribed symbol, fed by handlers on the quote contexts
+realtime_store = RealtimeStore(max_rows=int(os.getenv('FUTU_REALTIME_MAX_ROWS', '1000')))
+
+def freshness(received_at: float, source: str) -> Dict[str, Any]:
+    """Staleness fields attached to real-time tool responses"""
+    return {
+        'source': source,
+        'received_at': received_at,
+        'age': round(max(time.time() - received_at, 0.0), 3)
+    }
+
+# Closed historical K-line bars are kept on disk; set FUTU_KLINE_STORE_DIR= to disable
+kline_store_dir = os.getenv('FUTU_KLINE_STORE_DIR', os.path.join(project_root, 'data', 'kline'))
+kline_store = KlineStore(
+    kline_store_dir,
+    adjusted_max_age=float(os.getenv('FUTU_KLINE_STORE_ADJUSTED_MAX_AGE', '86400'))
+) if kline_store_dir else None
+
+# Bars per request_history_kline page. Every page costs a rate limit token, so pages are always
+# full; the count of get_history_kline only ever set the page size, never the bars returned.
+HISTORY_PAGE_SIZE = 1000
+
+def history_pages(symbol: str, ktype: str, start: str, end: str) -> int:
+    """Most request_history_kline pages [start, end] can take, counting every calendar day
+
+    Raises:
+        ValueError: start or end is not a YYYY-MM-DD date
+    """
+    days = max((date.fromisoformat(end) - date.fromisoformat(start)).days + 1, 0)
+    minutes = ktype_minutes(ktype)
+    per_day = len(bucket_ends(symbol.split('.')[0].upper(), minutes)) if minutes else 1
+    return max(-(-days * per_day // HISTORY_PAGE_SIZE), 1)
+
+def fetch_history_kline(symbol: str, ktype: str, start: str, end: str,
+                        autype: str = AuType.QFQ, priority: str = 'interactive',
+                        deadline: Optional[float] = None):
+    """Fetch every page of request_history_kline for a range (blocking)
+
+    Each page is a separate OpenD request and waits for its own rate limit token.
+
+    Args:
+        deadline: time.monotonic() after which no further page is requested, so a fetch
+            whose caller has timed out stops taking tokens
+
+    Returns:
+        (RET_OK, KlineAccumulator) or (ret, error message)
+
+    Raises:
+        DispatchTimeoutError: The deadline passed before the last page
+    """
+    def request_page(page_req_key):
+        if deadline is not None and time.monotonic() > deadline:
+            raise DispatchTimeoutError(f"request_history_kline of {symbol} {ktype} "
+                                       f"stopped paging at its deadline")
+        rate_limiter.acquire('request_history_kline', priority)
+        return quote_pool.call(
+            'request_history_kline',
+            code=symbol,
+            start=start,
+            end=end,
+            ktype=ktype,
+            autype=autype,
+            max_count=HISTORY_PAGE_SIZE,
+            page_req_key=page_req_key
+        )
+    return collect_pages(request_page)
+
+# Intraday K-lines are built from 1-minute bars when those are already at hand; K_<n>M types
+# OpenD does not serve (e.g. K_2M, K_10M) always are. FUTU_KLINE_RESAMPLE=0 only disables
+# the former.
+kline_resample = os.getenv('FUTU_KLINE_RESAMPLE', '1') == '1'
+resampled = Counter()
+
+def resample_history(symbol: str, ktype: str, start: str, end: str) -> bool:
+    """Whether a history request is answered from 1-minute bars
+
+    Blocking, as it reads the store's coverage.
+
+    Raises:
+        ValueError: start or end is not a YYYY-MM-DD date
+    """
+    minutes = ktype_minutes(ktype)
+    if not minutes or minutes == 1:
+        return False
+    if ktype not in NATIVE_MINUTE_KTYPES:
+        return True
+    return (kline_resample and kline_store is not None
+            and kline_store.covers(symbol, 'K_1M', AuType.QFQ, start, end))
+
+def resample_frame(frame: pd.DataFrame, symbol: str, ktype: str,
+                   drop_partial: bool = False) -> pd.DataFrame:
+    """Aggregate a 1-minute K-line DataFrame to ``ktype`` along the symbol's market sessions
+
+    Args:
+        drop_partial: Leave out a first bar the 1-minute bars only cover part of
+    """
+    name = str(frame['name'].iloc[0]) if len(frame) and 'name' in frame else ''
+    bars = resample(frame_to_array(frame), symbol.split('.')[0].upper(), ktype_minutes(ktype),
+                    drop_partial)
+    return array_to_frame(bars, symbol, name)
+
+async def load_history_kline(symbol: str, ktype: str, start: str, end: str):
+    """History K-lines through the store when enabled, resampled from 1-minute bars when possible
+
+    The fetch runs as one dispatcher call whose timeout grows with the pages the range can take,
+    since every page waits for its own request_history_kline token.
+
+    Returns:
+        (RET_OK, DataFrame) in request_history_kline layout, or (ret, error message)
+
+    Raises:
+        ValueError: start or end is not a YYYY-MM-DD date
+        DispatchError: The dispatcher queue is full or the fetch timed out
+    """
+    from_minutes = await run_futu(resample_history, symbol, ktype, start, end,
+                                  label='kline_resample')
+    source = 'K_1M' if from_minutes else ktype
+    pages = history_pages(symbol, source, start, end)
+    timeout = dispatcher.timeout + rate_limiter.budget('request_history_kline', pages)
+    deadline = time.monotonic() + timeout
+    if kline_store is not None and kline_store.supports(source):
+        ret, data = await run_futu(
+            kline_store.get,
+            symbol, source, AuType.QFQ, start, end,
+            functools.partial(fetch_history_kline, symbol, source, deadline=deadline),
+            label='kline_store', timeout=timeout
+        )
+        if ret != RET_OK:
+            return ret, data
+    else:
+        ret, data = await run_futu(fetch_history_kline, symbol, source, start, end,
+                                   deadline=deadline, timeout=timeout)
+        if ret != RET_OK:
+            return ret, data
+        data = data.to_frame(symbol)
+    if from_minutes:
+        resampled['history'] += 1
+        data = resample_frame(data, symbol, ktype)
+    return RET_OK, data
 
 def is_process_running(pid):
     """Check if a process with given PID is running"""
@@ -111,28 +561,31 @@ def cleanup_stale_processes():
     except Exception as e:
         logger.error(f"Error cleaning up stale processes: {str(e)}")
 
+def close_trade_connection():
+    """Close the trade contexts without touching the quote connections"""
+    trade_pool.close()
+    trade_cache.clear()
+
 def cleanup_connections():
-    """Clean up Futu connections"""
-    global quote_ctx, trade_ctx
+    """Clean up Futu connections
+    
+    Closing is immediate on the SDK side; the pool only waits, on a condition
+    variable, for calls still in flight.
+    """
+    global quote_pool, sub_manager
     try:
-        if quote_ctx:
+        sub_manager = None
+        universe.close()
+        realtime_store.clear()
+        if quote_pool:
             try:
-                quote_ctx.close()
-                logger.info("Successfully closed quote context")
+                quote_pool.close()
+                logger.info("Successfully closed quote context pool")
             except Exception as e:
-                logger.error(f"Error closing quote context: {str(e)}")
-            quote_ctx = None
+                logger.error(f"Error closing quote context pool: {str(e)}")
+            quote_pool = None
         
-        if trade_ctx:
-            try:
-                trade_ctx.close()
-                logger.info("Successfully closed trade context")
-            except Exception as e:
-                logger.error(f"Error closing trade context: {str(e)}")
-            trade_ctx = None
-            
-        # 等待连接完全关闭
-        time.sleep(1)
+        close_trade_connection()
     except Exception as e:
         logger.error(f"Error during connection cleanup: {str(e)}")
 
@@ -159,6 +612,7 @@ def cleanup_all():
     _is_shutting_down = True
     
     cleanup_connections()
+    dispatcher.shutdown()
     release_lock()
     cleanup_stale_processes()
 
@@ -193,7 +647,8 @@ def acquire_lock():
                         try:
                             old_proc = psutil.Process(old_pid)
                             if any('futu_stock_mcp_server' in cmd for cmd in old_proc.cmdline()):
-                                logger.error(f"Another instance is already running (PID: {old_pid})")
+                                logger.error(
+                                    f"Another instance is already running (PID: {old_pid})")
                                 return None
                         except (psutil.NoSuchProcess, psutil.AccessDenied):
                             pass
@@ -222,32 +677,69 @@ def acquire_lock():
                 pass
         return None
 
+def check_quote_ready(timeout: Optional[float] = None):
+    """Wait for the primary quote connection and confirm OpenD is logged in
+    
+    Uses get_global_state on the pooled context, which costs no quota.
+    
+    Returns:
+        (True, global state) or (False, reason)
+    """
+    if quote_pool is None or not quote_pool.wait_ready(timeout):
+        return False, 'OpenD is not connected'
+    ret, state = quote_pool.call('get_global_state', pinned=True)
+    if ret != RET_OK:
+        return False, str(state)
+    # Documented as '1'/'0', returned as a bool by recent SDKs
+    if str(state.get('qot_logined')).lower() not in ('1', 'true'):
+        return False, 'OpenD is connected but not logged in to quotes'
+    return True, state
+
+def _report_quote_ready(started: float, timeout: float):
+    ready, state = check_quote_ready(timeout)
+    if ready:
+        logger.info(f"Futu Quote API ready in {time.monotonic() - started:.2f}s "
+                    f"(server version {state.get('server_ver')})")
+    else:
+        logger.warning(f"Futu Quote API not ready after {timeout:.0f}s: {state}. "
+                       "Still retrying in the background, quote calls fail after "
+                       "FUTU_CONNECT_TIMEOUT until connected")
+
 def init_quote_connection():
-    """Initialize quote connection only"""
-    global quote_ctx
+    """Initialize quote connection only
     
+    Contexts connect asynchronously, so this returns as soon as the pool is
+    created and the MCP listener can start while OpenD is still connecting.
+    Readiness is logged from a background thread.
+    """
+    global quote_pool, sub_manager
+    
+    if quote_pool is not None:
+        return True
+        
     try:
-        # Check if OpenD is running by attempting to get global state
-        try:
-            temp_ctx = OpenQuoteContext(
+        started = time.monotonic()
+        quote_pool = QuoteContextPool(
+            lambda: register_handlers(QuoteContext(
                 host=os.getenv('FUTU_HOST', '127.0.0.1'),
-                port=int(os.getenv('FUTU_PORT', '11111'))
-            )
-            ret, data, page_req_key = temp_ctx.request_history_kline('HK.00700', start='2019-09-11', end='2019-09-18', max_count=5)
-            temp_ctx.close()
-            if ret != RET_OK:
-                logger.error("OpenD is not running or not accessible")
-                return False
-        except Exception as e:
-            logger.error(f"Failed to connect to OpenD: {str(e)}")
-            return False
-
-        # Initialize Futu connection
-        quote_ctx = OpenQuoteContext(
-            host=os.getenv('FUTU_HOST', '127.0.0.1'),
-            port=int(os.getenv('FUTU_PORT', '11111'))
+                port=int(os.getenv('FUTU_PORT', '11111')),
+                is_async_connect=True,
+                connect_timeout=connect_timeout
+            ), realtime_store),
+            size=int(os.getenv('FUTU_QUOTE_POOL_SIZE', '2')),
+            check_interval=float(os.getenv('FUTU_QUOTE_POOL_CHECK_INTERVAL', '10'))
+        )
+        quote_pool.start()
+        sub_manager = SubscriptionManager(
+            functools.partial(quote_pool.call, pinned=True),
+            quota=int(os.getenv('FUTU_SUB_QUOTA', '0')),
+            high_watermark=float(os.getenv('FUTU_SUB_HIGH_WATERMARK', '0.9')),
+            on_removed=realtime_store.drop
         )
-        logger.info("Successfully connected to Futu Quote API")
+        universe.start()
+        threading.Thread(target=_report_quote_ready, args=(started, connect_timeout),
+                         name='futu-ready-check', daemon=True).start()
+        logger.info("Futu Quote API connecting in the background")
         return True
         
     except Exception as e:
@@ -255,71 +747,106 @@ def init_quote_connection():
         cleanup_connections()
         return False
 
-def init_trade_connection():
-    """Initialize trade connection only"""
-    global trade_ctx, _is_trade_initialized
-    
-    if _is_trade_initialized and trade_ctx:
-        return True
-        
-    try:
-        # Initialize trade context with proper market access REAL SIMULATE
-        trade_env = os.getenv('FUTU_TRADE_ENV', 'REAL')
-        security_firm = getattr(SecurityFirm, os.getenv('FUTU_SECURITY_FIRM', 'FUTUSECURITIES'))
-        
-        # 只支持港股
-        market_map = {
-            'HK': 1  # TrdMarket.HK
-            #'US': 2   # TrdMarket.US
-        }
-        trd_market = market_map.get(os.getenv('FUTU_TRD_MARKET', 'HK'), "TrdMarket.HK")
-        logger.info(f"trd_market: {trd_market}")
-        
-        # 创建交易上下文
-        trade_ctx = OpenSecTradeContext(filter_trdmarket=TrdMarket.HK, 
-                                        host='127.0.0.1', port=11111, 
-                                        security_firm=SecurityFirm.FUTUSECURITIES)
-        # 等待连接就绪
-        time.sleep(1)
-            
-        # 验证连接状态
-        if not trade_ctx:
-            raise Exception("Failed to create trade context")
-            
-        # Set trade environment
-        # if hasattr(trade_ctx, 'set_trade_env'):
-        #     ret, data = trade_ctx.set_trade_env(trade_env)
-        #     if ret != RET_OK:
-        #         logger.warning(f"Failed to set trade environment: {data}")
-                
-        # Verify account access and permissions
-        ret, data = trade_ctx.get_acc_list()
+# Trade markets queried by default, e.g. "HK,US"; tools can ask for others per call
+trade_markets = [m.strip().upper()
+                 for m in os.getenv('FUTU_TRD_MARKETS',
+                                    os.getenv('FUTU_TRD_MARKET', 'HK')).split(',')
+                 if m.strip()]
+security_firm = os.getenv('FUTU_SECURITY_FIRM', 'FUTUSECURITIES')
+trade_env = os.getenv('FUTU_TRADE_ENV', 'REAL')
+# Funds, positions and max power, kept until an order or deal push changes them
+trade_cache = TradeStateCache(float(os.getenv('FUTU_TRADE_CACHE_TTL', '30')))
+
+def create_trade_context(market: str, firm: str):
+    """Create a trade context for one market, once the quote connection shows OpenD is reachable
+
+    The trade context connects synchronously and would retry forever against
+    an OpenD that is not there. Its order and deal pushes invalidate trade_cache.
+    """
+    if quote_pool is not None and not quote_pool.wait_ready(connect_timeout):
+        raise RuntimeError(f"OpenD not reachable after {connect_timeout:.0f}s")
+    ctx = TradeContext(filter_trdmarket=market,
+                       host=os.getenv('FUTU_HOST', '127.0.0.1'),
+                       port=int(os.getenv('FUTU_PORT', '11111')),
+                       security_firm=getattr(SecurityFirm, firm, firm))
+    return register_trade_handlers(ctx, trade_cache, market)
+
+trade_pool = TradeContextPool(create_trade_context)
+
+def init_trade_connection(market: Optional[str] = None) -> bool:
+    """Connect the trade context of a market (the first of FUTU_TRD_MARKETS by default)"""
+    ret, _ = trade_pool.get(market or trade_markets[0], security_firm)
+    return ret == RET_OK
+
+async def run_trade(market: str, method: str, *args, **kwargs):
+    """Run a trade context method for one market, connecting the context on first use
+
+    Returns:
+        The method's (ret, data), or (RET_ERROR, message) when the context cannot connect
+    """
+    ret, ctx = await run_futu(trade_pool.get, market, security_firm, label='trade_connect')
+    if ret != RET_OK:
+        return ret, ctx
+    return await run_futu(getattr(ctx, method), *args, label=method, **kwargs)
+
+async def run_trade_cached(market: str, method: str, *args,
+                           key_kwargs: Optional[Dict[str, Any]] = None, **kwargs):
+    """run_trade for account state queries, served from trade_cache until a push invalidates it
+
+    Args:
+        key_kwargs: Keyword arguments the cache entry is keyed on instead of ``kwargs``, to leave
+            out values that differ on every call without changing the answer much
+
+    Returns:
+        The method's (ret, data); only successful results are cached
+    """
+    trd_env = kwargs.get('trd_env', trade_env)
+    key = trade_cache.key(market, trd_env, method, args,
+                          kwargs if key_kwargs is None else key_kwargs)
+    cached = trade_cache.get(key) if trade_cache.enabled else None
+    if cached is not None:
+        return RET_OK, cached
+    generation = trade_cache.generation(market, trd_env)
+    ret, data = await run_trade(market, method, *args, **kwargs)
+    if ret == RET_OK:
+        trade_cache.put(key, data, generation)
+    return ret, data
+
+async def fan_out_trade(method: str, markets: Optional[List[str]], **kwargs):
+    """Run a trade query for several markets concurrently and stack the results
+
+    Returns:
+        (DataFrame with a trd_market column, {market: error}) where failed
+        markets are left out of the frame
+    """
+    markets = list(dict.fromkeys(m.upper() for m in (markets or trade_markets)))
+    run = run_trade_cached if method in DEAL_SENSITIVE else run_trade
+    results = await asyncio.gather(*(run(market, method, **kwargs) for market in markets))
+    frames, errors = [], {}
+    for market, (ret, data) in zip(markets, results, strict=True):
         if ret != RET_OK:
-            logger.warning(f"Failed to get account list: {data}")
-            cleanup_connections()
-            return False
-            
-        if data is None or len(data) == 0:
-            logger.warning("No trading accounts available")
-            cleanup_connections()
-            return False
-            
-        # Convert DataFrame to records if necessary
-        if hasattr(data, 'to_dict'):
-            accounts = data.to_dict('records')
-        else:
-            accounts = data
-            
-        logger.info(f"Found {len(accounts)} trading account(s)")
-        _is_trade_initialized = True
-        logger.info(f"Successfully initialized trade connection (Trade Environment: {trade_env}, Security Firm: {security_firm}, Market: {trd_market})")
-        return True
-            
-    except Exception as e:
-        logger.error(f"Failed to initialize trade connection: {str(e)}")
-        cleanup_connections()
-        _is_trade_initialized = False
-        return False
+            errors[market] = str(data)
+        elif data is not None and len(data):
+            frames.append(data.assign(trd_market=market))
+    return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), errors
+
+def merged_trade_result(frame: pd.DataFrame, errors: Dict[str, str],
+                        response_format: ResponseFormat = 'default',
+                        fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Shape a fanned-out trade query; failed markets are reported under failed_markets"""
+    if errors and frame.empty:
+        return {'error': '; '.join(f'{market}: {error}' for market, error in errors.items())}
+    result = handle_return_data(RET_OK, frame, response_format, fields)
+    if errors:
+        result['failed_markets'] = errors
+    return result
+
+def trade_market_of(symbol: str) -> str:
+    """Trade market whose context handles a quote symbol, e.g. "US.AAPL" -> "US" """
+    prefix = symbol.split('.')[0].upper()
+    if prefix in ('SH', 'SZ'):
+        return next((m for m in trade_markets if m in ('CN', 'HKCC')), 'CN')
+    return prefix
 
 def init_futu_connection():
     """Initialize both quote and trade connections"""
@@ -327,25 +854,47 @@ def init_futu_connection():
 
 @asynccontextmanager
 async def lifespan(server):
-    # Startup - only initialize quote connection
+    # The MCP SDK enters the lifespan once per session, so this only makes sure
+    # the process-wide connections exist; cleanup_all runs at process exit
     if not init_quote_connection():
         logger.error("Failed to initialize quote connection")
         raise Exception("Quote connection failed")
-    try:
-        yield
-    finally:
-        # Shutdown - ensure connections are closed
-        cleanup_all()
+    yield
+
+def timed_serializer(serialize):
+    """Record JSON encoding time of tool results per tool"""
+    @functools.wraps(serialize)
+    def wrapper(data):
+        with serialization_seconds.time(tool=current_tool(), stage='encode'):
+            return serialize(data)
+    return wrapper
 
 # Create MCP server instance
-mcp = FastMCP("futu-stock-server", lifespan=lifespan)
+mcp = FastMCP(
+    "futu-stock-server",
+    lifespan=lifespan,
+    tool_serializer=timed_serializer(json_serializer(int(os.getenv('FUTU_JSON_INDENT', '2'))))
+)
+mcp.add_middleware(ToolMetricsMiddleware(tool_seconds, tool_calls))
+
+# Concurrent identical tool calls share one execution; tools acting per client always run on
+# their own
+coalescing = None
+if os.getenv('FUTU_COALESCE_CALLS', '1') == '1':
+    coalescing = CoalescingMiddleware(exclude={'subscribe', 'unsubscribe', 'get_server_stats'},
+                                      coalesced=coalesced_calls)
+    mcp.add_middleware(coalescing)
 
-def handle_return_data(ret: int, data: Any) -> Dict[str, Any]:
+def handle_return_data(ret: int, data: Any, response_format: ResponseFormat = 'default',
+                       fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Helper function to handle return data from Futu API
     
     Args:
         ret: Return code from Futu API
         data: Data returned from Futu API
+        response_format: "default" keeps ``DataFrame.to_dict()``, "compact" returns columns and
+            row arrays
+        fields: Optional columns to keep
     
     Returns:
         Dict containing either the data or error message
@@ -357,6 +906,11 @@ def handle_return_data(ret: int, data: Any) -> Dict[str, Any]:
     if isinstance(data, dict):
         return data
     
+    # DataFrames are shaped in the requested format
+    if isinstance(data, pd.DataFrame):
+        with serialization_seconds.time(tool=current_tool(), stage='shape'):
+            return shape_frame(data, response_format, fields)
+    
     # If data has to_dict method, call it
     if hasattr(data, 'to_dict'):
         return data.to_dict()
@@ -373,7 +927,8 @@ def handle_return_data(ret: int, data: Any) -> Dict[str, Any]:
 
 # Market Data Tools
 @mcp.tool()
-async def get_stock_quote(symbols: List[str]) -> Dict[str, Any]:
+async def get_stock_quote(symbols: List[str], response_format: ResponseFormat = 'default',
+                          fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get stock quote data for given symbols
     
     Args:
@@ -383,6 +938,10 @@ async def get_stock_quote(symbols: List[str]) -> Dict[str, Any]:
             - US: US stocks
             - SH: Shanghai stocks
             - SZ: Shenzhen stocks
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["code", "last_price"];
+            unknown names are ignored
     
     Returns:
         Dict containing quote data including:
@@ -416,25 +975,38 @@ async def get_stock_quote(symbols: List[str]) -> Dict[str, Any]:
         - Does not include historical data
         - Consider actual needs when selecting stocks
         - Handle exceptions properly
+        - Results are cached per symbol for FUTU_QUOTE_CACHE_TTL seconds
+        - Lists longer than OpenD's per-request limit are fetched in concurrent chunks
+          (FUTU_QUOTE_CHUNK_SIZE); the subscription quota still bounds the list length
+        - Subscribed symbols are served from pushed quotes; received_at maps each symbol to its
+          receive time
     """
-    ret, data = quote_ctx.get_stock_quote(symbols)
-    if ret != RET_OK:
-        return {'error': str(data)}
-    
-    # Convert DataFrame to dict if necessary
-    if hasattr(data, 'to_dict'):
-        result = {
-            'quote_list': data.to_dict('records')
-        }
-    else:
-        result = {
-            'quote_list': data
-        }
+    rows, received_at, pending = {}, {}, []
+    for symbol in dict.fromkeys(symbols):
+        held = realtime_store.get(SubType.QUOTE, symbol)
+        if held is None:
+            pending.append(symbol)
+        else:
+            rows[symbol], received_at[symbol] = held
+    if rows:
+        sub_manager.touch(list(rows), [SubType.QUOTE])
+    if pending:
+        ret, data, stamps = await fetch_per_symbol(quote_cache, 'get_stock_quote', pending,
+                                                   pinned=True, sub_type=SubType.QUOTE)
+        if ret != RET_OK:
+            return {'error': str(data)}
+        rows.update((row['code'], row) for row in data)
+        received_at.update(stamps)
     
-    return result
+    return {
+        'quote_list': shape_records([rows[symbol] for symbol in symbols if symbol in rows],
+                                    response_format, fields),
+        'received_at': received_at
+    }
 
 @mcp.tool()
-async def get_market_snapshot(symbols: List[str]) -> Dict[str, Any]:
+async def get_market_snapshot(symbols: List[str], response_format: ResponseFormat = 'default',
+                              fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get market snapshot for given symbols
     
     Args:
@@ -444,6 +1016,10 @@ async def get_market_snapshot(symbols: List[str]) -> Dict[str, Any]:
             - US: US stocks
             - SH: Shanghai stocks
             - SZ: Shenzhen stocks
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["code", "last_price"];
+            unknown names are ignored
     
     Returns:
         Dict containing snapshot data including:
@@ -481,25 +1057,23 @@ async def get_market_snapshot(symbols: List[str]) -> Dict[str, Any]:
         - Does not include historical data
         - Consider actual needs when selecting stocks
         - Handle exceptions properly
+        - Results are cached per symbol for FUTU_SNAPSHOT_CACHE_TTL seconds
+        - Any number of symbols can be given; lists longer than OpenD's limit of 400
+          codes per request are fetched in concurrent chunks (FUTU_SNAPSHOT_CHUNK_SIZE)
     """
-    ret, data = quote_ctx.get_market_snapshot(symbols)
+    ret, data, received_at = await fetch_per_symbol(snapshot_cache, 'get_market_snapshot', symbols)
     if ret != RET_OK:
         return {'error': str(data)}
     
-    # Convert DataFrame to dict if necessary
-    if hasattr(data, 'to_dict'):
-        result = {
-            'snapshot_list': data.to_dict('records')
-        }
-    else:
-        result = {
-            'snapshot_list': data
-        }
-    
-    return result
+    return {
+        'snapshot_list': shape_records(data, response_format, fields),
+        'received_at': received_at
+    }
 
 @mcp.tool()
-async def get_cur_kline(symbol: str, ktype: str, count: int = 100) -> Dict[str, Any]:
+async def get_cur_kline(symbol: str, ktype: str, count: int = 100,
+                        response_format: ResponseFormat = 'default',
+                        fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get current K-line data
     
     Args:
@@ -515,6 +1089,7 @@ async def get_cur_kline(symbol: str, ktype: str, count: int = 100) -> Dict[str,
             - "K_15M": 15 minutes
             - "K_30M": 30 minutes
             - "K_60M": 60 minutes
+            - "K_<n>M": Any other minute interval, e.g. "K_2M", "K_10M", built from 1-minute bars
             - "K_DAY": Daily
             - "K_WEEK": Weekly
             - "K_MON": Monthly
@@ -522,6 +1097,10 @@ async def get_cur_kline(symbol: str, ktype: str, count: int = 100) -> Dict[str,
             - "K_YEAR": Yearly
         count: Number of K-lines to return (default: 100)
             Range: 1-1000
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["time_key", "close", "volume"];
+            unknown names are ignored
     
     Returns:
         Dict containing K-line data including:
@@ -547,35 +1126,56 @@ async def get_cur_kline(symbol: str, ktype: str, count: int = 100) -> Dict[str,
         - GET_CUR_KLINE_FAILED: Failed to get K-line data
         
     Note:
-        - IMPORTANT: Must subscribe to the K-line data first using subscribe() with the corresponding K-line type
+        - Subscribes to the K-line type automatically on first use
+        - Served from pushed data once subscribed; source, received_at and age report staleness
+        - Minute intervals are aggregated from the K_1M series when it is already held and the
+          requested bars fit in the 1-minute rows OpenD returns (at most 1000), so they do not
+          take a subscription of their own; other K_<n>M types return at most that many minutes
+        - A bar the 1-minute window only partly covers is left out
         - K-line data contains latest market data
         - Can request multiple stocks at once
         - Different periods have different update frequencies
         - Consider actual needs when selecting stocks and K-line types
         - Handle exceptions properly
     """
-    ret, data = quote_ctx.get_cur_kline(
-        code=symbol,
-        ktype=ktype,
-        num=count
-    )
-    if ret != RET_OK:
-        return {'error': str(data)}
-    
-    # Convert DataFrame to dict if necessary
-    if hasattr(data, 'to_dict'):
-        result = {
-            'kline_list': data.to_dict('records')
-        }
+    minutes = ktype_minutes(ktype)
+    # One bar more than asked for, since the oldest bar of the 1-minute window may be partial
+    need = count * minutes + minutes if minutes else 0
+    available = min(realtime_store.max_rows, 1000)
+    if minutes and minutes > 1 and (ktype not in NATIVE_MINUTE_KTYPES or
+                                    (kline_resample and need <= available and
+                                     realtime_store.holds(SubType.K_1M, symbol))):
+        # Built from the 1-minute series instead of taking another subscription
+        need = min(need, available)
+        ret, data, stamp = await read_series(
+            SubType.K_1M, symbol,
+            lambda: run_quote('get_cur_kline', code=symbol, ktype=SubType.K_1M, num=need,
+                              pinned=True),
+            count=need
+        )
+        if ret != RET_OK:
+            return {'error': str(data)}
+        resampled['cur'] += 1
+        frame = resample_frame(pd.DataFrame(data), symbol, ktype, drop_partial=True)
+        data = frame.tail(count).to_dict('records')
     else:
-        result = {
-            'kline_list': data
-        }
+        ret, data, stamp = await read_series(
+            ktype, symbol,
+            lambda: run_quote('get_cur_kline', code=symbol, ktype=ktype, num=count, pinned=True),
+            count=count
+        )
+        if ret != RET_OK:
+            return {'error': str(data)}
     
-    return result
+    return {
+        'kline_list': shape_records(data, response_format, fields),
+        **stamp
+    }
 
 @mcp.tool()
-async def get_history_kline(symbol: str, ktype: str, start: str, end: str, count: int = 100) -> Dict[str, Any]:
+async def get_history_kline(symbol: str, ktype: str, start: str, end: str, count: int = 100,
+                            response_format: ResponseFormat = 'default',
+                            fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get historical K-line data
     
     Args:
@@ -592,19 +1192,28 @@ async def get_history_kline(symbol: str, ktype: str, start: str, end: str, count
             - "K_15M": 15 minutes
             - "K_30M": 30 minutes
             - "K_60M": 60 minutes
+            - "K_<n>M": Any other minute interval, e.g. "K_2M", "K_10M", built from 1-minute bars
             - "K_DAY": Daily
             - "K_WEEK": Weekly
             - "K_MON": Monthly
         start: Start date in format "YYYY-MM-DD"
         end: End date in format "YYYY-MM-DD"
-        count: Number of K-lines to return (default: 100)
-            Range: 1-1000
+        count: Kept for compatibility, every K-line from start to end is returned; OpenD is
+            always asked for pages of 1000
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["time_key", "open", "close"];
+            unknown names are ignored
     
     Note:
         - Limited to 30 stocks per 30 days
         - Used quota will be automatically released after 30 days
         - Different K-line types have different update frequencies
         - Historical data availability varies by market and stock
+        - Closed intraday/daily bars are stored on disk, so repeated or overlapping
+          ranges only request the missing dates from OpenD
+        - Minute intervals are aggregated from stored 1-minute bars when the store already
+          covers the range, with bars restarting at each session open
     
     Returns:
         Dict containing K-line data including:
@@ -628,41 +1237,120 @@ async def get_history_kline(symbol: str, ktype: str, start: str, end: str, count
         - INVALID_SUBTYPE: Invalid K-line type
         - GET_HISTORY_KLINE_FAILED: Failed to get historical K-line data
     """
-    ret, data, page_req_key = quote_ctx.request_history_kline(
-        code=symbol,
-        start=start,
-        end=end,
-        ktype=ktype,
-        max_count=count
-    )
-    
+    try:
+        ret, data = await load_history_kline(symbol, ktype, start, end)
+    except ValueError as e:
+        return {'error': f'Invalid date range: {str(e)}'}
+    except DispatchError as e:
+        return {'error': str(e)}
     if ret != RET_OK:
-        return {'error': data}
-    
-    result = data.to_dict()
-    
-    # If there are more pages, continue fetching
-    while page_req_key is not None:
-        ret, data, page_req_key = quote_ctx.request_history_kline(
-            code=symbol,
-            start=start,
-            end=end,
-            ktype=ktype,
-            max_count=count,
-            page_req_key=page_req_key
-        )
+        return {'error': str(data)}
+    return shape_frame(data, response_format, fields)
+
+def history_range(symbol: str, ktype: str, bars: int) -> Tuple[str, str]:
+    """Date range expected to hold at least ``bars`` bars of ``ktype`` up to today
+
+    Leaves room for holidays.
+    """
+    market = symbol.split('.')[0].upper()
+    minutes = ktype_minutes(ktype)
+    if minutes:
+        trading_days = -(-bars // len(bucket_ends(market, minutes)))
+    else:
+        per_bar = {'K_WEEK': 5, 'K_MON': 22, 'K_QUARTER': 66, 'K_YEAR': 250}.get(ktype, 1)
+        trading_days = bars * per_bar
+    today = market_date(market)
+    start = today - timedelta(days=int(trading_days * 7 / 5 * 1.1) + 10)
+    return start.isoformat(), today.isoformat()
+
+@mcp.tool()
+async def get_technical_indicators(symbols: List[str], ktype: str = 'K_DAY',
+                                   indicators: Optional[List[str]] = None, bars: int = 250,
+                                   points: int = 1) -> Dict[str, Any]:
+    """Compute technical indicators for many symbols on the server and return only the latest values
+
+    Args:
+        symbols: Stock codes, e.g. ["HK.00700", "US.AAPL"]
+        ktype: K-line type the indicators run on, e.g. "K_DAY", "K_60M", "K_5M"
+        indicators: Indicators with optional parameters after a colon, defaults to all with
+            default parameters:
+            - "sma:20": Simple moving average of close
+            - "ema:20": Exponential moving average of close
+            - "rsi:14": Relative strength index (Wilder)
+            - "macd:12,26,9": MACD line, signal and histogram
+            - "bollinger:20,2": Bollinger bands (mid, upper, lower) with a population standard
+              deviation
+            - "atr:14": Average true range (Wilder)
+            - "vwap": Volume-weighted average price since the start of each trading day
+        bars: Bars of history each indicator is computed over; longer gives EMA-based values more
+            warm-up, at most 1000
+        points: Number of most recent values returned per indicator
+
+    Returns:
+        Dict containing:
+        - ktype: K-line type used
+        - indicators: Per symbol, time_key, close and one entry per indicator output, e.g.
+          "sma_20", "macd_12_26_9.signal", "bollinger_20_2.upper". Values are single numbers when
+          points is 1, else lists of the last points values oldest first; null where there is not
+          enough history yet
+        - failed_symbols: Symbols whose K-lines could not be loaded, with the error
+
+    Note:
+        - K-lines come from the same source as get_history_kline (K-line store, resampled
+          1-minute bars), fetched concurrently per symbol
+        - All symbols are stacked into one symbols x bars array and every indicator is computed
+          with NumPy across the whole array at once
+    """
+    specs = indicators or list(DEFAULT_PARAMS)
+    try:
+        for spec in specs:
+            parse_spec(spec)
+    except ValueError as e:
+        return {'error': str(e)}
+    bars = min(max(bars, 1), 1000)
+    points = min(max(points, 1), bars)
+    symbols = list(dict.fromkeys(symbols))
+
+    async def load(symbol: str):
+        start, end = history_range(symbol, ktype, bars)
+        try:
+            return await load_history_kline(symbol, ktype, start, end)
+        except (ValueError, DispatchError) as e:
+            return RET_ERROR, str(e)
+
+    results = await asyncio.gather(*(load(symbol) for symbol in symbols))
+    loaded, series, failed = [], [], {}
+    for symbol, (ret, data) in zip(symbols, results, strict=True):
         if ret != RET_OK:
-            return {'error': data}
-        # Append new data to result
-        new_data = data.to_dict()
-        for key in result:
-            if isinstance(result[key], list):
-                result[key].extend(new_data[key])
-    
+            failed[symbol] = str(data)
+        elif data is None or data.empty:
+            failed[symbol] = f'No {ktype} K-lines'
+        else:
+            loaded.append(symbol)
+            series.append(frame_to_array(data))
+    if not loaded:
+        return {'error': '; '.join(f'{symbol}: {error}' for symbol, error in failed.items())}
+
+    matrix = stack(series, bars)
+    try:
+        values = {'close': matrix['close'], **compute_indicators(matrix, specs)}
+    except ValueError as e:
+        return {'error': str(e)}
+    times = np.datetime_as_string(matrix['time_key'][:, -points:], unit='s')
+    output = {}
+    for i, symbol in enumerate(loaded):
+        row = {'time_key': [t.replace('T', ' ') if t != 'NaT' else None for t in times[i]]}
+        for name, array in values.items():
+            row[name] = [None if np.isnan(v) else round(float(v), 4) for v in array[i, -points:]]
+        output[symbol] = {k: v[0] for k, v in row.items()} if points == 1 else row
+    result = {'ktype': ktype, 'indicators': output}
+    if failed:
+        result['failed_symbols'] = failed
     return result
 
 @mcp.tool()
-async def get_rt_data(symbol: str) -> Dict[str, Any]:
+async def get_rt_data(symbol: str, response_format: ResponseFormat = 'default',
+                      fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get real-time data
     
     Args:
@@ -672,6 +1360,10 @@ async def get_rt_data(symbol: str) -> Dict[str, Any]:
             - US: US stocks
             - SH: Shanghai stocks
             - SZ: Shenzhen stocks
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["time", "cur_price", "volume"];
+            unknown names are ignored
     
     Returns:
         Dict containing real-time data including:
@@ -691,30 +1383,28 @@ async def get_rt_data(symbol: str) -> Dict[str, Any]:
         - GET_RT_DATA_FAILED: Failed to get real-time data
         
     Note:
-        - IMPORTANT: Must subscribe to RT_DATA first using subscribe()
+        - Subscribes to RT_DATA automatically on first use
+        - Served from pushed data once subscribed; source, received_at and age report staleness
         - Real-time data is updated frequently
         - Contains latest data only, not historical data
         - Update frequency varies by market and stock
         - Consider using callbacks for real-time processing
     """
-    ret, data = quote_ctx.get_rt_data(symbol)
+    ret, data, stamp = await read_series(
+        SubType.RT_DATA, symbol,
+        lambda: run_quote('get_rt_data', symbol, pinned=True)
+    )
     if ret != RET_OK:
         return {'error': str(data)}
     
-    # Convert DataFrame to dict if necessary
-    if hasattr(data, 'to_dict'):
-        result = {
-            'rt_data_list': data.to_dict('records')
-        }
-    else:
-        result = {
-            'rt_data_list': data
-        }
-    
-    return result
+    return {
+        'rt_data_list': shape_records(data, response_format, fields),
+        **stamp
+    }
 
 @mcp.tool()
-async def get_ticker(symbol: str) -> Dict[str, Any]:
+async def get_ticker(symbol: str, response_format: ResponseFormat = 'default',
+                     fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get ticker data
     
     Args:
@@ -724,9 +1414,14 @@ async def get_ticker(symbol: str) -> Dict[str, Any]:
             - US: US stocks
             - SH: Shanghai stocks
             - SZ: Shenzhen stocks
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g.
+            ["time", "price", "volume", "ticker_direction"]; unknown names are ignored
     
     Returns:
         Dict containing ticker data including:
+        - ticker_list: List of ticker entries, each containing:
         - code: Stock code
         - sequence: Sequence number
         - price: Deal price
@@ -751,17 +1446,28 @@ async def get_ticker(symbol: str) -> Dict[str, Any]:
         - GET_RT_TICKER_FAILED: Failed to get ticker data
         
     Note:
-        - IMPORTANT: Must subscribe to TICKER first using subscribe()
+        - Subscribes to TICKER automatically on first use
+        - Served from pushed data once subscribed; source, received_at and age report staleness
         - Ticker data is updated in real-time
         - High update frequency, large data volume
         - Update frequency varies by market and stock
         - Consider using callbacks for real-time processing
     """
-    ret, data = quote_ctx.get_ticker(symbol)
-    return handle_return_data(ret, data)
+    ret, data, stamp = await read_series(
+        SubType.TICKER, symbol,
+        lambda: run_quote('get_rt_ticker', symbol, pinned=True)
+    )
+    if ret != RET_OK:
+        return {'error': str(data)}
+    
+    return {
+        'ticker_list': shape_records(data, response_format, fields),
+        **stamp
+    }
 
 @mcp.tool()
-async def get_order_book(symbol: str) -> Dict[str, Any]:
+async def get_order_book(symbol: str, response_format: ResponseFormat = 'default',
+                         fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get order book data
     
     Args:
@@ -771,6 +1477,11 @@ async def get_order_book(symbol: str) -> Dict[str, Any]:
             - US: US stocks
             - SH: Shanghai stocks
             - SZ: Shenzhen stocks
+        response_format: "default" or "compact"; compact returns the Bid and Ask levels as
+            {"columns": [...], "rows": [[...]]} with each column name listed once
+        fields: Optional list of level columns to return, from "price", "volume", "order_num" and
+            "details", e.g. ["price", "volume"]; unknown names are ignored. Levels become
+            dicts when given in the default format
     
     Returns:
         Dict containing order book data including:
@@ -787,17 +1498,38 @@ async def get_order_book(symbol: str) -> Dict[str, Any]:
         - GET_ORDER_BOOK_FAILED: Failed to get order book data
         
     Note:
-        - IMPORTANT: Must subscribe to ORDER_BOOK first using subscribe()
+        - Subscribes to ORDER_BOOK automatically on first use
+        - Served from pushed data once subscribed; source, received_at and age report staleness
         - Order book data is updated in real-time
         - Contains latest bid/ask information only
         - Number of price levels may vary by market
         - Update frequency varies by market and stock
     """
-    ret, data = quote_ctx.get_order_book(symbol)
-    return handle_return_data(ret, data)
+    ret, data, stamp = await read_latest(
+        SubType.ORDER_BOOK, symbol,
+        lambda: run_quote('get_order_book', symbol, pinned=True)
+    )
+    if ret != RET_OK:
+        return {'error': str(data)}
+    
+    sides = {side: shape_levels(data[side], response_format, fields)
+             for side in ('Bid', 'Ask') if side in data}
+    return {**data, **sides, **stamp}
+
+async def pull_broker_queue(symbol: str):
+    """Fetch the broker queue from OpenD in the same layout the push handler stores"""
+    ret, bid, ask = await run_quote('get_broker_queue', symbol, pinned=True)
+    if ret != RET_OK:
+        return ret, bid
+    return RET_OK, {
+        'code': symbol,
+        'bid_broker': bid.to_dict('records'),
+        'ask_broker': ask.to_dict('records')
+    }
 
 @mcp.tool()
-async def get_broker_queue(symbol: str) -> Dict[str, Any]:
+async def get_broker_queue(symbol: str, response_format: ResponseFormat = 'default',
+                           fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get broker queue data
     
     Args:
@@ -807,19 +1539,20 @@ async def get_broker_queue(symbol: str) -> Dict[str, Any]:
             - US: US stocks
             - SH: Shanghai stocks
             - SZ: Shenzhen stocks
+        response_format: "default" or "compact"; compact returns bid_broker and ask_broker as
+            {"columns": [...], "rows": [[...]]} with each column name listed once
+        fields: Optional list of broker columns to return, applied to both sides, e.g.
+            ["bid_broker_name", "ask_broker_name", "bid_broker_pos", "ask_broker_pos"];
+            unknown names are ignored
     
     Returns:
         Dict containing broker queue data including:
         - code: Stock code
-        - update_time: Update time (YYYY-MM-DD HH:mm:ss)
-        - bid_broker_id: List of bid broker IDs
-        - bid_broker_name: List of bid broker names
-        - bid_broker_pos: List of bid broker positions
-        - ask_broker_id: List of ask broker IDs
-        - ask_broker_name: List of ask broker names
-        - ask_broker_pos: List of ask broker positions
-        - timestamp: Update timestamp
-        - broker_status: Broker queue status (0: Normal)
+        - bid_broker: List of bid brokers, each with bid_broker_id, bid_broker_name, bid_broker_pos
+        - ask_broker: List of ask brokers, each with ask_broker_id, ask_broker_name, ask_broker_pos
+        - source: "push" when served from pushed data, "pull" when fetched from OpenD
+        - received_at: Unix time the data was received
+        - age: Seconds since the data was received
         
     Raises:
         - INVALID_PARAM: Invalid parameter
@@ -827,18 +1560,24 @@ async def get_broker_queue(symbol: str) -> Dict[str, Any]:
         - GET_BROKER_QUEUE_FAILED: Failed to get broker queue data
         
     Note:
-        - IMPORTANT: Must subscribe to BROKER first using subscribe()
+        - Subscribes to BROKER automatically on first use
+        - Served from pushed data once subscribed; source, received_at and age report staleness
         - Broker queue data is updated in real-time
         - Shows broker information for both bid and ask sides
         - Number of brokers may vary by market
         - Update frequency varies by market and stock
         - Mainly used for displaying broker trading activities
     """
-    ret, data = quote_ctx.get_broker_queue(symbol)
-    return handle_return_data(ret, data)
+    ret, data, stamp = await read_latest(SubType.BROKER, symbol, lambda: pull_broker_queue(symbol))
+    if ret != RET_OK:
+        return {'error': str(data)}
+    
+    sides = {side: shape_records(data[side], response_format, fields)
+             for side in ('bid_broker', 'ask_broker') if side in data}
+    return {**data, **sides, **stamp}
 
 @mcp.tool()
-async def subscribe(symbols: List[str], sub_types: List[str]) -> Dict[str, Any]:
+async def subscribe(symbols: List[str], sub_types: List[str], ctx: Context) -> Dict[str, Any]:
     """Subscribe to real-time data
     
     Args:
@@ -867,15 +1606,20 @@ async def subscribe(symbols: List[str], sub_types: List[str]) -> Dict[str, Any]:
             - "K_YEAR": Yearly K-line
     
     Note:
-        - Maximum 100 symbols per request
-        - Maximum 5 subscription types per request
+        - Large symbol lists are split into batched OpenD requests automatically
+        - Invalid codes or types are rejected before anything is subscribed
+        - Subscriptions are reference counted per client; real-time tools also
+          subscribe on demand, so calling this first is optional
+        - Idle subscriptions are evicted least-recently-used first when the quota is nearly full
         - Each socket can subscribe up to 500 symbols
         - Data will be pushed through callbacks
         - Consider unsubscribing when data is no longer needed
     
     Returns:
         Dict containing subscription result:
-        - status: "success" or error message
+        - status: "success", "partial" or "failed"
+        - succeeded: Symbols subscribed to every requested type
+        - failed: Mapping of symbol to error message
         
     Raises:
         - INVALID_PARAM: Invalid parameter
@@ -883,15 +1627,16 @@ async def subscribe(symbols: List[str], sub_types: List[str]) -> Dict[str, Any]:
         - INVALID_SUBTYPE: Invalid subscription type
         - SUBSCRIBE_FAILED: Failed to subscribe
     """
-    for symbol in symbols:
-        for sub_type in sub_types:
-            ret, data = quote_ctx.subscribe(symbol, sub_type)
-            if ret != RET_OK:
-                return {'error': data}
-    return {"status": "success"}
+    ret, msg = validate_subscription(symbols, sub_types)
+    if ret != RET_OK:
+        return {'error': msg}
+    if sub_manager is None:
+        return {'error': 'Quote connection is not initialized'}
+    return await run_futu(sub_manager.acquire, client_key(ctx), symbols, sub_types,
+                          label='subscribe')
 
 @mcp.tool()
-async def unsubscribe(symbols: List[str], sub_types: List[str]) -> Dict[str, Any]:
+async def unsubscribe(symbols: List[str], sub_types: List[str], ctx: Context) -> Dict[str, Any]:
     """Unsubscribe from real-time data
     
     Args:
@@ -918,7 +1663,9 @@ async def unsubscribe(symbols: List[str], sub_types: List[str]) -> Dict[str, Any
             
     Returns:
         Dict containing unsubscription result:
-        - status: "success" or error message
+        - status: "success", "partial" or "failed"
+        - succeeded: Symbols unsubscribed from every requested type
+        - failed: Mapping of symbol to error message
         
     Raises:
         - INVALID_PARAM: Invalid parameter
@@ -926,16 +1673,19 @@ async def unsubscribe(symbols: List[str], sub_types: List[str]) -> Dict[str, Any
         - INVALID_SUBTYPE: Invalid subscription type
         - UNSUBSCRIBE_FAILED: Failed to unsubscribe
     """
-    for symbol in symbols:
-        for sub_type in sub_types:
-            ret, data = quote_ctx.unsubscribe(symbol, sub_type)
-            if ret != RET_OK:
-                return {'error': data}
-    return {"status": "success"}
+    ret, msg = validate_subscription(symbols, sub_types)
+    if ret != RET_OK:
+        return {'error': msg}
+    if sub_manager is None:
+        return {'error': 'Quote connection is not initialized'}
+    return await run_futu(sub_manager.release, client_key(ctx), symbols, sub_types,
+                          label='unsubscribe')
 
 # Derivatives Tools
 @mcp.tool()
-async def get_option_chain(symbol: str, start: str, end: str) -> Dict[str, Any]:
+async def get_option_chain(symbol: str, start: str, end: str,
+                           response_format: ResponseFormat = 'default',
+                           fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get option chain data
     
     Args:
@@ -945,6 +1695,10 @@ async def get_option_chain(symbol: str, start: str, end: str) -> Dict[str, Any]:
             - US: US stocks
         start: Start date in format "YYYY-MM-DD"
         end: End date in format "YYYY-MM-DD"
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["code", "option_type", "strike_price"];
+            unknown names are ignored
     
     Returns:
         Dict containing option chain data including:
@@ -979,12 +1733,14 @@ async def get_option_chain(symbol: str, start: str, end: str) -> Dict[str, Any]:
         - Includes Greeks for risk management
         - Data is updated during trading hours
         - Consider using with option expiration dates API
+        - Chains are cached per symbol and date range for FUTU_OPTION_CHAIN_CACHE_TTL seconds
     """
-    ret, data = quote_ctx.get_option_chain(symbol, start, end)
-    return data.to_dict() if ret == RET_OK else {'error': data}
+    ret, data = await fetch_option_chain(symbol, start, end)
+    return handle_return_data(ret, data, response_format, fields)
 
 @mcp.tool()
-async def get_option_expiration_date(symbol: str) -> Dict[str, Any]:
+async def get_option_expiration_date(symbol: str, response_format: ResponseFormat = 'default',
+                                     fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get option expiration dates
     
     Args:
@@ -992,6 +1748,10 @@ async def get_option_expiration_date(symbol: str) -> Dict[str, Any]:
             Format: {market}.{code}
             - HK: Hong Kong stocks
             - US: US stocks
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g.
+            ["strike_time", "option_expiry_date_distance"]; unknown names are ignored
     
     Returns:
         Dict containing expiration dates:
@@ -1010,11 +1770,121 @@ async def get_option_expiration_date(symbol: str) -> Dict[str, Any]:
         - Expiry dates are typically on monthly/weekly cycles
         - Not all stocks have listed options
     """
-    ret, data = quote_ctx.get_option_expiration_date(symbol)
-    return data.to_dict() if ret == RET_OK else {'error': data}
+    ret, data = await run_quote('get_option_expiration_date', symbol)
+    return handle_return_data(ret, data, response_format, fields)
+
+async def fetch_option_chain(symbol: str, start: str, end: str):
+    """get_option_chain through option_chain_cache
+
+    Returns:
+        (RET_OK, DataFrame) or (ret, error message)
+    """
+    key = (symbol, start, end)
+    chain = option_chain_cache.get(key)
+    if chain is not None:
+        return RET_OK, chain
+    ret, data = await run_quote('get_option_chain', code=symbol, start=start, end=end)
+    if ret == RET_OK:
+        option_chain_cache.put(key, data)
+    return ret, data
+
+async def load_option_chain(symbol: str, expiry: str):
+    """Cached chain of one expiry priced from snapshots of its options and the underlying
+
+    Returns:
+        (RET_OK, OptionChain) or (ret, error message)
+    """
+    ret, chain = await fetch_option_chain(symbol, expiry, expiry)
+    if ret != RET_OK:
+        return ret, chain
+    if chain is None or chain.empty:
+        return RET_ERROR, f'No options of {symbol} expire on {expiry}'
+    ret, rows, _ = await fetch_per_symbol(snapshot_cache, 'get_market_snapshot',
+                                          [symbol, *chain['code']])
+    if ret != RET_OK:
+        return ret, rows
+    snapshots = {row['code']: row for row in rows}
+    if symbol not in snapshots:
+        return RET_ERROR, f'No snapshot for {symbol}'
+    return RET_OK, OptionChain.from_chain(symbol, expiry, chain, snapshots,
+                                          snapshots[symbol]['last_price'])
 
 @mcp.tool()
-async def get_option_condor(symbol: str, expiry: str, strike_price: float) -> Dict[str, Any]:
+async def get_option_strategies(symbol: str, expiry: str,
+                                strategy: Literal['straddle', 'vertical', 'butterfly', 'condor'],
+                                option_type: Literal['CALL', 'PUT'] = 'CALL', width: int = 1,
+                                side: Literal['long', 'short'] = 'long',
+                                strike_price: Optional[float] = None, sort_by: str = 'strike',
+                                descending: bool = False, limit: Optional[int] = None,
+                                payoff_points: int = 9) -> Dict[str, Any]:
+    """Build an option strategy at every strike of an expiry with its payoff and risk
+
+    Args:
+        symbol: Underlying stock code, e.g. "HK.00700", "US.AAPL"
+        expiry: Option expiration date in format "YYYY-MM-DD"
+        strategy: Strategy to build, with the legs of its long version:
+            - "straddle": buy a call and a put at the same strike
+            - "vertical": buy one strike, sell the next one up
+            - "butterfly": buy one strike, sell two of the next, buy one of the one after
+            - "condor": buy one strike, sell the next two, buy the fourth
+        option_type: "CALL" or "PUT" legs for vertical, butterfly and condor
+        width: Strikes between adjacent legs, e.g. 2 skips every other strike
+        side: "long" as listed above, "short" reverses every leg
+        strike_price: Only return the strategies centred nearest this strike
+        sort_by: One of "strike", "net_premium", "max_profit", "max_loss", "reward_risk",
+            "pnl_at_spot"
+        descending: Sort from largest to smallest
+        limit: Maximum number of strategies returned
+        payoff_points: Underlying prices, spread evenly over spot ±20%, at which each payoff is
+            evaluated
+
+    Returns:
+        Dict containing:
+        - underlying, expiry, spot, contract_size: Chain the strategies were built from
+        - payoff_prices: Underlying prices of each strategy's payoff list
+        - strategies: One entry per anchor strike, each containing:
+            - strike: Mean strike of the legs
+            - legs: Option code, type, strike, quantity (negative when sold) and price per leg
+            - net_premium: Cost per share, positive for a debit and negative for a credit
+            - max_profit / max_loss: Per share at expiry, null when unlimited
+            - breakevens: Underlying prices where the expiry P&L is zero
+            - reward_risk: max_profit / max_loss
+            - pnl_at_spot: Expiry P&L if the underlying stays at spot
+            - payoff: Expiry P&L at each of payoff_prices
+        - matched: Number of strategies before limit
+
+    Note:
+        - Legs are priced at the bid/ask mid, or the last price when one side is missing
+        - All strikes are computed at once with NumPy from the cached chain and snapshots;
+          strategies with an unpriced leg are left out
+        - Multiply per-share values by contract_size for one contract
+    """
+    if sort_by not in SORT_FIELDS:
+        return {'error': f"Unknown sort field {sort_by}, expected one of {', '.join(SORT_FIELDS)}"}
+    ret, chain = await load_option_chain(symbol, expiry)
+    if ret != RET_OK:
+        return {'error': str(chain)}
+    prices = np.linspace(chain.spot * 0.8, chain.spot * 1.2, payoff_points) \
+        if payoff_points > 0 else np.array([])
+    try:
+        rows = build_strategies(chain, strategy, width, option_type, side, prices)
+    except ValueError as e:
+        return {'error': str(e)}
+    ranked = rank_strategies(rows, strike_price, sort_by, descending)
+    return {
+        'underlying': symbol,
+        'expiry': expiry,
+        'spot': chain.spot,
+        'contract_size': chain.contract_size,
+        'payoff_prices': np.round(prices, 4).tolist(),
+        'strategies': ranked if limit is None else ranked[:max(limit, 0)],
+        'matched': len(ranked)
+    }
+
+@mcp.tool()
+async def get_option_condor(symbol: str, expiry: str, strike_price: Optional[float] = None,
+                            option_type: Literal['CALL', 'PUT'] = 'CALL', width: int = 1,
+                            side: Literal['long', 'short'] = 'long') -> Dict[str, Any]:
     """Get option condor strategy data
     
     Args:
@@ -1023,22 +1893,13 @@ async def get_option_condor(symbol: str, expiry: str, strike_price: float) -> Di
             - HK: Hong Kong stocks
             - US: US stocks
         expiry: Option expiration date in format "YYYY-MM-DD"
-        strike_price: Strike price of the option
+        strike_price: Strike the condor is centred nearest to; every strike when omitted
+        option_type: Build the condor from "CALL" or "PUT" options
+        width: Strikes between adjacent legs
+        side: "long" buys the wings and sells the body, "short" the reverse
         
     Returns:
-        Dict containing condor strategy data including:
-        - strategy_name: Strategy name
-        - option_list: List of options in the strategy
-        - risk_metrics: Risk metrics for the strategy
-        - profit_loss: Profit/loss analysis
-        
-    Raises:
-        - INVALID_PARAM: Invalid parameter
-        - INVALID_MARKET: Invalid market code
-        - INVALID_STOCKCODE: Invalid stock code
-        - INVALID_EXPIRYDATE: Invalid expiry date
-        - INVALID_STRIKEPRICE: Invalid strike price
-        - GET_OPTION_CONDOR_FAILED: Failed to get condor data
+        Dict as get_option_strategies with strategy="condor"
         
     Note:
         - Condor is a neutral options trading strategy
@@ -1046,11 +1907,13 @@ async def get_option_condor(symbol: str, expiry: str, strike_price: float) -> Di
         - Limited risk and limited profit potential
         - Best used in low volatility environments
     """
-    ret, data = quote_ctx.get_option_condor(symbol, expiry, strike_price)
-    return data.to_dict() if ret == RET_OK else {'error': data}
+    return await get_option_strategies.fn(symbol, expiry, 'condor', option_type, width, side,
+                                          strike_price)
 
 @mcp.tool()
-async def get_option_butterfly(symbol: str, expiry: str, strike_price: float) -> Dict[str, Any]:
+async def get_option_butterfly(symbol: str, expiry: str, strike_price: Optional[float] = None,
+                               option_type: Literal['CALL', 'PUT'] = 'CALL', width: int = 1,
+                               side: Literal['long', 'short'] = 'long') -> Dict[str, Any]:
     """Get option butterfly strategy data
     
     Args:
@@ -1059,22 +1922,14 @@ async def get_option_butterfly(symbol: str, expiry: str, strike_price: float) ->
             - HK: Hong Kong stocks
             - US: US stocks
         expiry: Option expiration date in format "YYYY-MM-DD"
-        strike_price: Strike price of the option
+        strike_price: Middle strike of the butterfly, the nearest listed one is used; every
+            strike when omitted
+        option_type: Build the butterfly from "CALL" or "PUT" options
+        width: Strikes between adjacent legs
+        side: "long" buys the wings and sells the body, "short" the reverse
         
     Returns:
-        Dict containing butterfly strategy data including:
-        - strategy_name: Strategy name
-        - option_list: List of options in the strategy
-        - risk_metrics: Risk metrics for the strategy
-        - profit_loss: Profit/loss analysis
-        
-    Raises:
-        - INVALID_PARAM: Invalid parameter
-        - INVALID_MARKET: Invalid market code
-        - INVALID_STOCKCODE: Invalid stock code
-        - INVALID_EXPIRYDATE: Invalid expiry date
-        - INVALID_STRIKEPRICE: Invalid strike price
-        - GET_OPTION_BUTTERFLY_FAILED: Failed to get butterfly data
+        Dict as get_option_strategies with strategy="butterfly"
         
     Note:
         - Butterfly is a neutral options trading strategy
@@ -1083,70 +1938,158 @@ async def get_option_butterfly(symbol: str, expiry: str, strike_price: float) ->
         - Maximum profit at middle strike price
         - Best used when expecting low volatility
     """
-    ret, data = quote_ctx.get_option_butterfly(symbol, expiry, strike_price)
-    return data.to_dict() if ret == RET_OK else {'error': data}
+    return await get_option_strategies.fn(symbol, expiry, 'butterfly', option_type, width, side,
+                                          strike_price)
 
 # Account Query Tools
 @mcp.tool()
-async def get_account_list() -> Dict[str, Any]:
-    """Get account list"""
-    if not init_trade_connection():
-        return {'error': 'Failed to initialize trade connection'}
-    ret, data = trade_ctx.get_acc_list()
-    return handle_return_data(ret, data)
+async def get_account_list(markets: Optional[List[str]] = None,
+                           response_format: ResponseFormat = 'default',
+                           fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get account list
+    
+    Args:
+        markets: Trade markets to list accounts of, e.g. ["HK", "US"]; defaults to FUTU_TRD_MARKETS
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["acc_id", "trd_env"];
+            unknown names are ignored
+
+    Note:
+        - Markets are queried concurrently; an account authorized for several markets is listed once
+        - Markets that failed are listed under failed_markets
+    """
+    frame, errors = await fan_out_trade('get_acc_list', markets)
+    if 'acc_id' in frame:
+        frame = frame.drop_duplicates(subset=['acc_id', 'trd_env']).drop(columns='trd_market')
+        frame = frame.reset_index(drop=True)
+    return merged_trade_result(frame, errors, response_format, fields)
 
 @mcp.tool()
-async def get_funds() -> Dict[str, Any]:
-    """Get account funds information"""
-    if not init_trade_connection():
-        return {'error': 'Failed to initialize trade connection'}
+async def get_funds(markets: Optional[List[str]] = None, trd_env: Optional[str] = None,
+                    response_format: ResponseFormat = 'default',
+                    fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get account funds information
+
+    Args:
+        markets: Trade markets to query, e.g. ["HK", "US"]; defaults to FUTU_TRD_MARKETS
+        trd_env: "REAL" or "SIMULATE"; defaults to FUTU_TRADE_ENV
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["trd_market", "cash", "total_assets"];
+            unknown names are ignored
+
+    Note:
+        - Markets are queried concurrently, one row per market with a trd_market column
+        - Markets that failed are listed under failed_markets
+    """
     try:
-        ret, data = trade_ctx.accinfo_query()
-        if ret != RET_OK:
-            return {'error': str(data)}
-        
-        if data is None or data.empty:
+        frame, errors = await fan_out_trade('accinfo_query', markets, trd_env=trd_env or trade_env)
+        if frame.empty and not errors:
             return {'error': 'No account information available'}
-            
-        return handle_return_data(ret, data)
+        return merged_trade_result(frame, errors, response_format, fields)
     except Exception as e:
         return {'error': f'Failed to get account funds: {str(e)}'}
 
 @mcp.tool()
-async def get_positions() -> Dict[str, Any]:
-    """Get account positions"""
-    if not init_trade_connection():
-        return {'error': 'Failed to initialize trade connection'}
-    ret, data = trade_ctx.position_list_query()
-    return handle_return_data(ret, data)
+async def get_positions(markets: Optional[List[str]] = None, trd_env: Optional[str] = None,
+                        response_format: ResponseFormat = 'default',
+                        fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get account positions
+    
+    Args:
+        markets: Trade markets to query, e.g. ["HK", "US"]; defaults to FUTU_TRD_MARKETS
+        trd_env: "REAL" or "SIMULATE"; defaults to FUTU_TRADE_ENV
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["code", "qty"]; unknown names are ignored
+
+    Note:
+        - Markets are queried concurrently and their positions merged, with a trd_market column
+        - Markets that failed are listed under failed_markets
+    """
+    frame, errors = await fan_out_trade('position_list_query', markets,
+                                        trd_env=trd_env or trade_env)
+    return merged_trade_result(frame, errors, response_format, fields)
 
 @mcp.tool()
-async def get_max_power() -> Dict[str, Any]:
-    """Get maximum trading power for the account"""
-    if not init_trade_connection():
-        return {'error': 'Failed to initialize trade connection'}
-    ret, data = trade_ctx.get_max_power()
-    return handle_return_data(ret, data)
+async def get_max_power(symbol: str, price: Optional[float] = None, order_type: str = 'NORMAL',
+                        trd_env: Optional[str] = None, response_format: ResponseFormat = 'default',
+                        fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get maximum quantities that can be bought or sold for a security
+
+    Args:
+        symbol: Stock code, e.g. "HK.00700"; queried through the trade context of its market
+        price: Order price, defaults to the latest price from the market snapshot
+        order_type: Order type, e.g. "NORMAL" or "MARKET"
+        trd_env: "REAL" or "SIMULATE", defaults to FUTU_TRADE_ENV
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once
+        fields: Optional list of columns to return, e.g. ["max_cash_buy", "max_position_sell"];
+            unknown names are ignored
+
+    Returns:
+        Dict containing a single-row table with:
+        - max_cash_buy: Quantity buyable with cash only
+        - max_cash_and_margin_buy: Quantity buyable with cash and margin
+        - max_position_sell: Quantity sellable from the position
+        - max_sell_short: Quantity that can be sold short
+        - max_buy_back: Quantity needed to close a short position
+        - long_required_im / short_required_im: Initial margin per share
+
+    Note:
+        - Results are cached until an order or deal push for the market arrives,
+          or for at most FUTU_TRADE_CACHE_TTL seconds
+        - Without a price, calls share one cache entry per symbol, so the quantities may be
+          computed at a last price up to that old
+    """
+    query = {'order_type': order_type, 'code': symbol, 'price': price,
+             'trd_env': trd_env or trade_env}
+    # The snapshot price moves on every tick, keying on it would make defaulted calls always miss
+    key_kwargs = dict(query)
+    if price is None:
+        ret, rows, _ = await fetch_per_symbol(snapshot_cache, 'get_market_snapshot', [symbol])
+        if ret != RET_OK:
+            return {'error': str(rows)}
+        if not rows:
+            return {'error': f'No snapshot for {symbol}, pass a price'}
+        query['price'] = rows[0]['last_price']
+    ret, data = await run_trade_cached(trade_market_of(symbol), 'acctradinginfo_query',
+                                       key_kwargs=key_kwargs, **query)
+    return handle_return_data(ret, data, response_format, fields)
 
 @mcp.tool()
-async def get_margin_ratio(symbol: str) -> Dict[str, Any]:
-    """Get margin ratio for a security"""
-    if not init_trade_connection():
-        return {'error': 'Failed to initialize trade connection'}
-    ret, data = trade_ctx.get_margin_ratio(symbol)
-    return handle_return_data(ret, data)
+async def get_margin_ratio(symbol: str, response_format: ResponseFormat = 'default',
+                           fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get margin ratio for a security
+
+    Args:
+        symbol: Stock code, e.g. "HK.00700"; queried through the trade context of its market
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once
+        fields: Optional list of columns to return, e.g.
+            ["code", "im_long_ratio", "im_short_ratio"]; unknown names are ignored
+    """
+    ret, data = await run_trade(trade_market_of(symbol), 'get_margin_ratio', [symbol])
+    return handle_return_data(ret, data, response_format, fields)
 
 # Market Information Tools
 @mcp.tool()
-async def get_market_state(market: str) -> Dict[str, Any]:
+async def get_market_state(market: str, response_format: ResponseFormat = 'default',
+                           fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get market state
     
     Args:
         market: Market code, options:
-            - "HK": Hong Kong market (includes pre-market, continuous trading, afternoon, closing auction)
+            - "HK": Hong Kong market (includes pre-market, continuous trading, afternoon,
+              closing auction)
             - "US": US market (includes pre-market, continuous trading, after-hours)
             - "SH": Shanghai market (includes pre-opening, morning, afternoon, closing auction)
             - "SZ": Shenzhen market (includes pre-opening, morning, afternoon, closing auction)
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["code", "market_state"];
+            unknown names are ignored
     
     Returns:
         Dict containing market state information including:
@@ -1178,11 +2121,12 @@ async def get_market_state(market: str) -> Dict[str, Any]:
         - Market state affects trading operations
         - Recommended to check state before trading
     """
-    ret, data = quote_ctx.get_market_state(market)
-    return data.to_dict() if ret == RET_OK else {'error': data}
+    ret, data = await run_quote('get_market_state', market)
+    return handle_return_data(ret, data, response_format, fields)
 
 @mcp.tool()
-async def get_security_info(market: str, code: str) -> Dict[str, Any]:
+async def get_security_info(market: str, code: str, response_format: ResponseFormat = 'default',
+                            fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get security information
     
     Args:
@@ -1192,29 +2136,24 @@ async def get_security_info(market: str, code: str) -> Dict[str, Any]:
             - "SH": Shanghai market
             - "SZ": Shenzhen market
         code: Stock code without market prefix, e.g. "00700" for "HK.00700"
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["code", "lot_size"];
+            unknown names are ignored
     
     Returns:
         Dict containing security information including:
-        - stock_code: Stock code
-        - stock_name: Stock name
-        - market: Market code
-        - stock_type: Stock type (e.g., "STOCK", "ETF", "WARRANT")
-        - stock_child_type: Stock subtype (e.g., "MAIN_BOARD", "GEM")
-        - list_time: Listing date
-        - delist_time: Delisting date (if applicable)
+        - code: Stock code
+        - name: Stock name
         - lot_size: Lot size
-        - stock_owner: Company name
-        - issue_price: IPO price
-        - issue_size: IPO size
-        - net_profit: Net profit
-        - net_profit_growth: Net profit growth rate
-        - revenue: Revenue
-        - revenue_growth: Revenue growth rate
-        - eps: Earnings per share
-        - pe_ratio: Price-to-earnings ratio
-        - pb_ratio: Price-to-book ratio
-        - dividend_ratio: Dividend ratio
-        - stock_derivatives: List of related derivatives
+        - stock_type: Stock type (e.g., "STOCK", "ETF", "WARRANT")
+        - stock_child_type: Warrant subtype
+        - stock_owner: Underlying of a warrant or option
+        - listing_date: Listing date
+        - stock_id: Security ID
+        - delisting: Whether delisted
+        - suspension: Whether suspended
+        - exchange_type: Exchange
         
     Raises:
         - INVALID_PARAM: Invalid parameter
@@ -1224,15 +2163,29 @@ async def get_security_info(market: str, code: str) -> Dict[str, Any]:
         
     Note:
         - Contains static information about the security
-        - Financial data may be delayed
-        - Some fields may be empty for certain security types
-        - Important for fundamental analysis
+        - Stocks are looked up in the cached security list of the day; other types
+          (ETFs, warrants, ...) are fetched from OpenD
     """
-    ret, data = quote_ctx.get_security_info(market, code)
-    return data.to_dict() if ret == RET_OK else {'error': data}
+    symbol = code if '.' in code else f'{market}.{code}'
+    ret, table = await get_reference(market)
+    if ret != RET_OK:
+        return {'error': str(table)}
+    row = table.get(symbol)
+    if row is None:
+        ret, data = await run_quote('get_stock_basicinfo', market, code_list=[symbol])
+        if ret != RET_OK:
+            return {'error': str(data)}
+        if len(data) == 0:
+            return {'error': f'Unknown security {symbol}'}
+        row = dict(zip(data.columns, compact_frame(data.head(1))['rows'][0], strict=True))
+    shaped = shape_records([row], response_format, fields)
+    return shaped if response_format == 'compact' else shaped[0]
 
 @mcp.tool()
-async def get_security_list(market: str) -> Dict[str, Any]:
+async def get_security_list(market: str, stock_type: str = 'STOCK',
+                            name_prefix: Optional[str] = None, lot_size: Optional[int] = None,
+                            response_format: ResponseFormat = 'default',
+                            fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get security list
     
     Args:
@@ -1241,6 +2194,12 @@ async def get_security_list(market: str) -> Dict[str, Any]:
             - "US": US market
             - "SH": Shanghai market
             - "SZ": Shenzhen market
+        stock_type: Security type, e.g. "STOCK", "ETF", "WARRANT", "IDX", "BOND"
+        name_prefix: Only securities whose name starts with this text (case-insensitive)
+        lot_size: Only securities with this lot size
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["code", "name"]; unknown names are ignored
             
     Returns:
         Dict containing list of securities:
@@ -1249,11 +2208,13 @@ async def get_security_list(market: str) -> Dict[str, Any]:
             - name: Security name
             - lot_size: Lot size
             - stock_type: Security type
-            - list_time: Listing date
+            - listing_date: Listing date
             - stock_id: Security ID
             - delisting: Whether delisted
             - main_contract: Whether it's the main contract (futures)
             - last_trade_time: Last trade time (futures/options)
+        - count: Number of securities returned
+        - trading_date: Market date the list was downloaded for
             
     Raises:
         - INVALID_PARAM: Invalid parameter
@@ -1261,14 +2222,227 @@ async def get_security_list(market: str) -> Dict[str, Any]:
         - GET_SECURITY_LIST_FAILED: Failed to get security list
         
     Note:
-        - Returns all securities in the specified market
-        - Includes stocks, ETFs, warrants, etc.
-        - Updated daily
-        - Useful for market analysis and monitoring
-        - Consider caching results for better performance
+        - Returns all securities of one type in the specified market
+        - The list is downloaded once per market day, kept in memory and on disk
+          (FUTU_REFERENCE_DIR), so repeated calls and restarts do not hit OpenD
+        - Use name_prefix, lot_size and fields to keep responses small
+    """
+    ret, table = await get_reference(market, stock_type)
+    if ret != RET_OK:
+        return {'error': str(table)}
+    records = table.records(table.positions(name_prefix, lot_size))
+    return {
+        'security_list': shape_records(records, response_format, fields),
+        'count': len(records),
+        'trading_date': table.trading_date.isoformat()
+    }
+
+async def query_universe(market: str, ranges: Optional[Dict[str, List[Optional[float]]]],
+                         sort_by: Optional[str], descending: bool, limit: int,
+                         response_format: ResponseFormat,
+                         fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Run a filter/sort query on the in-memory snapshot table of a market
+
+    The table is loaded on first use.
+    """
+    table = universe.table(market)
+    if table is None:
+        ret, table = await run_futu(universe.load, market, label='universe_load')
+        if ret != RET_OK:
+            return {'error': str(table)}
+    try:
+        rows, matched = table.select(ranges, sort_by, descending, limit, fields)
+    except KeyError as e:
+        return {'error': str(e.args[0])}
+    return {
+        'rows': shape_records(rows, response_format),
+        'matched': matched,
+        'total': len(table),
+        **freshness(table.updated_at, 'universe')
+    }
+
+@mcp.tool()
+async def screen_universe(market: str, filters: Optional[Dict[str, List[Optional[float]]]] = None,
+                          sort_by: Optional[str] = 'turnover', descending: bool = True,
+                          limit: int = 50, response_format: ResponseFormat = 'default',
+                          fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Filter and sort a whole-market snapshot held in memory
+
+    Args:
+        market: Market code, options:
+            - "HK": Hong Kong market
+            - "US": US market
+            - "SH": Shanghai market
+            - "SZ": Shenzhen market
+        filters: Ranges of numeric snapshot fields as {field: [min, max]}, either bound may be null,
+            e.g. {"last_price": [10, null], "turnover_rate": [1, 5]}
+        sort_by: Numeric field to sort on, e.g. "change_rate", "volume", "turnover"; null keeps
+            market order
+        descending: Sort from largest to smallest
+        limit: Maximum number of rows returned
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["code", "last_price"];
+            unknown names are ignored
+
+    Returns:
+        Dict containing:
+        - rows: Matching snapshot rows (same fields as get_market_snapshot plus change_rate in
+          percent)
+        - matched: Number of securities matching the filters before the limit
+        - total: Number of securities in the market table
+        - source, received_at, age: When the table was refreshed
+
+    Note:
+        - Queries run locally against a table refreshed every FUTU_UNIVERSE_REFRESH_INTERVAL
+          seconds, so results are up to that old; check age
+        - Markets in FUTU_UNIVERSE_MARKETS are loaded at startup, others on their first query,
+          which takes a few seconds per thousand securities
+        - Covers stocks only (no ETFs, warrants or options)
+        - An unknown field name returns an error listing the available fields
+    """
+    return await query_universe(market, filters, sort_by, descending, limit, response_format,
+                                fields)
+
+@mcp.tool()
+async def get_top_movers(market: str, direction: Literal['gainers', 'losers'] = 'gainers',
+                         limit: int = 20, min_turnover: float = 0,
+                         response_format: ResponseFormat = 'default',
+                         fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get the biggest gainers or losers of a market by change rate
+
+    Args:
+        market: Market code, "HK", "US", "SH" or "SZ"
+        direction: "gainers" (highest change_rate first) or "losers" (lowest first)
+        limit: Number of rows returned
+        min_turnover: Skip securities that traded less than this turnover, to filter out
+            illiquid names
+        response_format: "default" or "compact"
+        fields: Optional list of columns to return, e.g. ["code", "name", "change_rate"]
+
+    Returns:
+        Dict with rows, matched, total and freshness fields as screen_universe
+
+    Note:
+        - Served from the in-memory market snapshot, see screen_universe
+    """
+    ranges = {'turnover': [min_turnover, None]} if min_turnover else None
+    return await query_universe(market, ranges, 'change_rate', direction == 'gainers', limit,
+                                response_format, fields)
+
+@mcp.tool()
+async def get_volume_leaders(market: str,
+                             by: Literal['turnover', 'volume', 'turnover_rate'] = 'turnover',
+                             limit: int = 20, response_format: ResponseFormat = 'default',
+                             fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get the most traded securities of a market
+
+    Args:
+        market: Market code, "HK", "US", "SH" or "SZ"
+        by: Rank by "turnover" (traded value), "volume" (shares) or "turnover_rate"
+        limit: Number of rows returned
+        response_format: "default" or "compact"
+        fields: Optional list of columns to return, e.g. ["code", "name", "turnover"]
+
+    Returns:
+        Dict with rows, matched, total and freshness fields as screen_universe
+
+    Note:
+        - Served from the in-memory market snapshot, see screen_universe
+    """
+    return await query_universe(market, None, by, True, limit, response_format, fields)
+
+# Resources
+async def pull_quote(symbol: str):
+    """Fetch one quote row from OpenD in the same layout the push handler stores"""
+    ret, data = await run_quote('get_stock_quote', [symbol], pinned=True)
+    if ret != RET_OK:
+        return ret, data
+    return RET_OK, data.to_dict('records')[0]
+
+@mcp.resource("market://{symbol}/quote", mime_type="application/json")
+async def quote_resource(symbol: str) -> Dict[str, Any]:
+    """Latest quote of a symbol, e.g. market://HK.00700/quote
+
+    Subscribe to be notified when it changes.
+    """
+    ret, data, stamp = await read_latest(SubType.QUOTE, symbol, lambda: pull_quote(symbol))
+    if ret != RET_OK:
+        raise ResourceError(str(data))
+    return {**data, **stamp}
+
+@mcp.resource("market://{symbol}", mime_type="application/json")
+async def market_resource(symbol: str) -> Dict[str, Any]:
+    """Alias of market://{symbol}/quote"""
+    return await quote_resource.fn(symbol)
+
+@mcp.resource("market://{symbol}/ticker", mime_type="application/json")
+async def ticker_resource(symbol: str) -> Dict[str, Any]:
+    """Recent ticks of a symbol, e.g. market://HK.00700/ticker
+
+    Subscribe to be notified on new trades.
     """
-    ret, data = quote_ctx.get_security_list(market)
-    return data.to_dict() if ret == RET_OK else {'error': data}
+    ret, data, stamp = await read_series(
+        SubType.TICKER, symbol,
+        lambda: run_quote('get_rt_ticker', symbol, pinned=True)
+    )
+    if ret != RET_OK:
+        raise ResourceError(str(data))
+    return {'ticker_list': data, **stamp}
+
+@mcp.resource("market://{symbol}/orderbook", mime_type="application/json")
+async def orderbook_resource(symbol: str) -> Dict[str, Any]:
+    """Order book of a symbol, e.g. market://HK.00700/orderbook
+
+    Subscribe to be notified when it changes.
+    """
+    ret, data, stamp = await read_latest(
+        SubType.ORDER_BOOK, symbol,
+        lambda: run_quote('get_order_book', symbol, pinned=True)
+    )
+    if ret != RET_OK:
+        raise ResourceError(str(data))
+    return {**data, **stamp}
+
+async def hold_resource_subscription(client: str, symbol: str, sub_type: str) -> None:
+    """Keep the OpenD subscription behind a watched resource referenced"""
+    ret, msg = validate_subscription([symbol], [sub_type])
+    if ret != RET_OK:
+        raise ValueError(msg)
+    result = await run_futu(sub_manager.acquire, client, [symbol], [sub_type], label='subscribe')
+    if result['failed']:
+        raise ValueError(result['failed'][symbol])
+
+async def release_resource_subscription(client: str, symbol: str, sub_type: str) -> None:
+    if sub_manager:
+        await run_futu(sub_manager.release, client, [symbol], [sub_type], label='unsubscribe')
+
+resource_notifier = ResourceNotifier(
+    realtime_store,
+    interval=float(os.getenv('FUTU_RESOURCE_NOTIFY_INTERVAL', '0.5')),
+    on_subscribe=hold_resource_subscription,
+    on_unsubscribe=release_resource_subscription
+)
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    await resource_notifier.subscribe(str(uri), mcp._mcp_server.request_context.session)
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    await resource_notifier.unsubscribe(str(uri), mcp._mcp_server.request_context.session)
+
+def _advertise_resource_subscribe(get_capabilities):
+    """The MCP SDK always reports resources.subscribe=False, even with a subscribe handler"""
+    @functools.wraps(get_capabilities)
+    def wrapper(*args, **kwargs):
+        capabilities = get_capabilities(*args, **kwargs)
+        if capabilities.resources is not None:
+            capabilities.resources.subscribe = True
+        return capabilities
+    return wrapper
+
+mcp._mcp_server.get_capabilities = _advertise_resource_subscribe(mcp._mcp_server.get_capabilities)
 
 # Prompts
 @mcp.prompt()
@@ -1287,7 +2461,9 @@ async def get_stock_filter(base_filters: List[Dict[str, Any]] = None,
                          financial_filters: List[Dict[str, Any]] = None,
                          market: str = None,
                          page: int = 1,
-                         page_size: int = 200) -> Dict[str, Any]:
+                         page_size: int = 200,
+                         response_format: ResponseFormat = 'default',
+                         fields: Optional[List[str]] = None) -> Dict[str, Any]:
     """Get filtered stock list based on conditions
     
     Args:
@@ -1297,7 +2473,8 @@ async def get_stock_filter(base_filters: List[Dict[str, Any]] = None,
                 "filter_min": float,  # Optional minimum value
                 "filter_max": float,  # Optional maximum value
                 "is_no_filter": bool,  # Optional, whether to skip filtering
-                "sort_dir": int  # Optional, sort direction (0: No sort, 1: Ascending, 2: Descending)
+                # Optional, sort direction (0: No sort, 1: Ascending, 2: Descending)
+                "sort_dir": int
             }
         accumulate_filters: List of accumulate filters with structure:
             {
@@ -1330,6 +2507,10 @@ async def get_stock_filter(base_filters: List[Dict[str, Any]] = None,
             - "SZ.3000004": Shenzhen ChiNext
         page: Page number, starting from 1 (default: 1)
         page_size: Number of results per page, max 200 (default: 200)
+        response_format: "default" or "compact"; compact returns {"columns": [...], "rows": [[...]]}
+            with each column name listed once, which is much smaller for long results
+        fields: Optional list of columns to return, e.g. ["stock_code", "stock_name"];
+            unknown names are ignored
     """
     # Create filter request
     req = {
@@ -1392,8 +2573,8 @@ async def get_stock_filter(base_filters: List[Dict[str, Any]] = None,
                 filter_item["sortDir"] = f["sort_dir"]
             req["financialFilterList"].append(filter_item)
 
-    ret, data = quote_ctx.get_stock_filter(req)
-    return data.to_dict() if ret == RET_OK else {'error': data}
+    ret, data = await run_quote('get_stock_filter', req)
+    return handle_return_data(ret, data, response_format, fields)
 
 @mcp.tool()
 async def get_current_time() -> Dict[str, Any]:
@@ -1416,6 +2597,125 @@ async def get_current_time() -> Dict[str, Any]:
         'timezone': datetime.now().astimezone().tzname()
     }
 
+@mcp.tool()
+async def get_server_stats() -> Dict[str, Any]:
+    """Get server performance counters
+
+    Returns:
+        Dict containing:
+        - dispatcher: Futu call executor pool size, queue depth and counters
+        - quote_pool: Quote connection pool health and load per connection
+        - caches: Hit/miss counters for each response cache
+        - kline_store: On-disk history K-line store hits and OpenD fetches
+        - subscriptions: Subscription quota usage and auto-subscribe/eviction counters
+        - realtime: Push counts per type and reads served from pushed data
+        - resources: Watched market:// resources and notifications sent or coalesced
+        - rate_limits: Per-method OpenD frequency limits with queued calls and wait times
+        - coalescing: Identical concurrent tool calls that shared one in-flight call
+        - universe: In-memory market snapshot tables with their size, age and refresh time
+        - reference_data: Cached security lists and how often they came from memory, disk or OpenD
+        - trade_contexts: Connected trade contexts per market and security firm
+        - trade_cache: Cached funds, positions and max power with hits and push invalidations
+        - kline_resampled: K-line requests answered by aggregating 1-minute bars, per tool
+    """
+    return {
+        'dispatcher': dispatcher.stats(),
+        'quote_pool': quote_pool.stats() if quote_pool else None,
+        'caches': {
+            'quote': quote_cache.stats(),
+            'snapshot': snapshot_cache.stats(),
+            'option_chain': option_chain_cache.stats()
+        },
+        'kline_store': kline_store.stats() if kline_store else None,
+        'subscriptions': sub_manager.stats() if sub_manager else None,
+        'realtime': realtime_store.stats(),
+        'resources': resource_notifier.stats(),
+        'rate_limits': rate_limiter.stats(),
+        'coalescing': coalescing.stats() if coalescing else None,
+        'universe': universe.stats(),
+        'reference_data': reference_store.stats(),
+        'trade_contexts': trade_pool.stats(),
+        'trade_cache': trade_cache.stats(),
+        'kline_resampled': dict(resampled)
+    }
+
+def _cache_samples(key: str):
+    """(labels, value) samples of one counter across every response cache"""
+    stats = {'quote': quote_cache.stats(), 'snapshot': snapshot_cache.stats(),
+             'option_chain': option_chain_cache.stats()}
+    realtime = realtime_store.stats()
+    stats['realtime'] = {'hits': realtime['served'], 'misses': realtime['missed']}
+    stats['trade'] = trade_cache.stats()
+    if kline_store is not None:
+        store = kline_store.stats()
+        stats['kline_store'] = {'hits': store['hits'], 'misses': store['fetches']}
+    return [({'cache': name}, values[key]) for name, values in stats.items()]
+
+def _hit_ratio_samples():
+    hits = dict((labels['cache'], value) for labels, value in _cache_samples('hits'))
+    misses = dict((labels['cache'], value) for labels, value in _cache_samples('misses'))
+    return [({'cache': name},
+             hits[name] / (hits[name] + misses[name]) if hits[name] + misses[name] else 0.0)
+            for name in hits]
+
+def _subscription_samples(key: str):
+    return [({}, sub_manager.stats()[key])] if sub_manager is not None else []
+
+def _dispatcher_samples():
+    stats = dispatcher.stats()
+    return [({'state': state}, stats[state]) for state in ('running', 'queued')]
+
+def _quote_pool_samples():
+    if quote_pool is None:
+        return []
+    stats = quote_pool.stats()
+    return [({'state': 'healthy'}, stats['healthy']), ({'state': 'configured'}, stats['size'])]
+
+metrics.collector('futu_mcp_cache_hits_total', 'counter',
+                  'Reads served from a cache or pushed data',
+                  lambda: _cache_samples('hits'))
+metrics.collector('futu_mcp_cache_misses_total', 'counter', 'Reads that had to go to OpenD',
+                  lambda: _cache_samples('misses'))
+metrics.collector('futu_mcp_cache_hit_ratio', 'gauge', 'Fraction of reads served without OpenD',
+                  _hit_ratio_samples)
+metrics.collector('futu_subscription_quota', 'gauge', 'OpenD subscription quota',
+                  lambda: _subscription_samples('quota'))
+metrics.collector('futu_subscription_used', 'gauge', 'OpenD subscription quota in use',
+                  lambda: _subscription_samples('used'))
+metrics.collector('futu_subscription_evicted_total', 'counter',
+                  'Idle subscriptions evicted to free quota',
+                  lambda: _subscription_samples('evicted'))
+metrics.collector('futu_dispatcher_calls', 'gauge',
+                  'Futu calls running on or queued for the executor',
+                  _dispatcher_samples)
+metrics.collector('futu_dispatcher_rejected_total', 'counter',
+                  'Futu calls rejected because the queue was full',
+                  lambda: [({}, dispatcher.stats()['rejected'])])
+metrics.collector('futu_dispatcher_timeouts_total', 'counter',
+                  'Futu calls that exceeded FUTU_CALL_TIMEOUT',
+                  lambda: [({}, dispatcher.stats()['timeouts'])])
+metrics.collector('futu_quote_connections', 'gauge', 'Quote connections in the pool',
+                  _quote_pool_samples)
+metrics.collector('futu_universe_rows', 'gauge',
+                  'Securities in the in-memory market snapshot table',
+                  lambda: [({'market': m}, t['rows'])
+                           for m, t in universe.stats()['markets'].items()])
+metrics.collector('futu_universe_age_seconds', 'gauge',
+                  'Seconds since the market snapshot table was refreshed',
+                  lambda: [({'market': m}, t['age'])
+                           for m, t in universe.stats()['markets'].items()])
+metrics.collector('futu_realtime_pushes_total', 'counter',
+                  'Pushes received from OpenD by subscription type',
+                  lambda: [({'sub_type': t}, n)
+                           for t, n in realtime_store.stats()['pushes'].items()])
+
+# Prometheus scrape endpoint on the MCP HTTP server, set FUTU_METRICS_PATH= to disable
+metrics_path = os.getenv('FUTU_METRICS_PATH', '/metrics')
+if metrics_path:
+    @mcp.custom_route(metrics_path, methods=['GET'], include_in_schema=False)
+    async def metrics_endpoint(request) -> PlainTextResponse:
+        return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
 if __name__ == "__main__":
     import sys
     try:
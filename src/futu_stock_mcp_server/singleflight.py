@@ -0,0 +1,108 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from typing import Any
+
+from fastmcp.server.middleware import Middleware
+
+from futu_stock_mcp_server.metrics import Counter, current_call
+
+
+def call_key(tool: str, arguments: dict[str, Any] | None) -> str:
+    """Key of a tool call: tool name and its arguments in canonical JSON
+
+    Arguments left at ``None`` are dropped so an omitted optional argument
+    and an explicit ``null`` coalesce. List order is kept because tools
+    return rows in the order symbols were given.
+    """
+    arguments = {k: v for k, v in (arguments or {}).items() if v is not None}
+    return tool + ':' + json.dumps(arguments, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key
+
+    The first caller of a key starts the call as a task; callers arriving
+    while it runs await the same task and get its result or exception.
+    The task is shielded, so a caller that goes away (client disconnect,
+    timeout) does not cancel the call for the others. Nothing is kept once
+    the call finishes: this only deduplicates concurrent calls, caching is
+    left to the TTL caches.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, tuple[asyncio.Task, dict[str, Any]]] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]],
+                 shared: dict[str, Any] | None = None) -> tuple[Any, bool, dict[str, Any]]:
+        """Run ``fn`` once for all concurrent callers of ``key``
+
+        Args:
+            key: Identity of the call
+            fn: Coroutine function doing the work, only called by the first caller
+            shared: State of the first caller, handed to the callers that join it
+
+        Returns:
+            Tuple of the result, whether this caller joined another caller's
+            call, and the first caller's ``shared`` state
+        """
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if joined:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            flight = self._flights[key] = (task, shared if shared is not None else {})
+            self.leaders += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(flight[0]), joined, flight[1]
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        self._flights.pop(key, None)
+        # Retrieve the exception so it is not reported as unhandled when every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            'in_flight': len(self._flights),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'coalesced_ratio': round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+
+class CoalescingMiddleware(Middleware):
+    """Coalesce concurrent identical MCP tool calls into one
+
+    Calls are keyed on the tool name and normalized arguments (see
+    ``call_key``). Tools in ``exclude`` always run on their own, which is
+    needed for anything that acts per client, such as ``subscribe``. Add
+    this after ToolMetricsMiddleware so every caller is still timed and
+    counted; Futu errors of the shared call are reported to each caller.
+    """
+
+    def __init__(self, exclude: Iterable[str] = (), coalesced: Counter | None = None):
+        self.exclude = frozenset(exclude)
+        self.coalesced = coalesced
+        self.flights = SingleFlight()
+
+    async def on_call_tool(self, context, call_next):
+        tool = context.message.name
+        if tool in self.exclude:
+            return await call_next(context)
+        call = current_call.get()
+        result, joined, leader = await self.flights.do(
+            call_key(tool, context.message.arguments), lambda: call_next(context), call)
+        if joined:
+            if self.coalesced is not None:
+                self.coalesced.inc(tool=tool)
+            if call is not None and leader:
+                call['futu_errors'] += leader.get('futu_errors', 0)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        return self.flights.stats()
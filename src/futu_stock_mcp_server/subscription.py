@@ -0,0 +1,322 @@
+import math
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from futu import KLINE_SUBTYPE_LIST, RET_ERROR, RET_OK, SubType
+from futu.common.utils import split_stock_str
+from loguru import logger
+
+# Per-request limit on codes, and on codes x K-line subtypes, used by the Futu SDK itself
+MAX_SUB_PAIRS_PER_REQUEST = 100
+
+SubCall = Callable[[str, list[str], list[str]], tuple[int, Any]]
+
+
+def validate_subscription(symbols: list[str], sub_types: list[str]) -> tuple[int, str]:
+    """Check codes and subtypes locally before anything is sent to OpenD"""
+    if not symbols:
+        return RET_ERROR, 'symbols is empty'
+    if not sub_types:
+        return RET_ERROR, 'sub_types is empty'
+    for sub_type in sub_types:
+        if not SubType.if_has_key(sub_type):
+            return RET_ERROR, f'Invalid subscription type: {sub_type}'
+    for symbol in symbols:
+        ret, msg = split_stock_str(symbol)
+        if ret != RET_OK:
+            return RET_ERROR, msg
+    return RET_OK, ''
+
+
+def plan_batches(symbols: list[str], sub_types: list[str]) -> list[tuple[list[str], list[str]]]:
+    """Split symbols x sub_types into the fewest requests OpenD accepts
+
+    K-line subtypes count once per code against the per-request limit, so
+    they are sent separately from the other subtypes, the same way the Futu
+    SDK re-subscribes after a reconnect.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    kline_types = [t for t in dict.fromkeys(sub_types) if t in KLINE_SUBTYPE_LIST]
+    other_types = [t for t in dict.fromkeys(sub_types) if t not in KLINE_SUBTYPE_LIST]
+    batches = []
+    kline_size = math.floor(MAX_SUB_PAIRS_PER_REQUEST / max(len(kline_types), 1))
+    for types, size in ((other_types, MAX_SUB_PAIRS_PER_REQUEST), (kline_types, kline_size)):
+        if not types:
+            continue
+        for i in range(0, len(symbols), size):
+            batches.append((symbols[i:i + size], types))
+    return batches
+
+
+def run_batches(call: SubCall, method: str, symbols: list[str],
+                sub_types: list[str]) -> dict[str, Any]:
+    """Subscribe or unsubscribe in batched requests with per-symbol results
+
+    A failed batch is bisected until the offending symbols are isolated, so
+    every valid symbol still ends up in the requested state and every
+    failure is attributed to the symbol that caused it.
+
+    Args:
+        call: ``call(method, codes, sub_types)`` returning ``(ret, msg)``
+        method: "subscribe" or "unsubscribe"
+
+    Returns:
+        Dict with status ("success", "partial" or "failed"), succeeded and failed symbols
+    """
+    failed: dict[str, str] = {}
+    requests = 0
+    pending = plan_batches(symbols, sub_types)[::-1]
+    while pending:
+        codes, types = pending.pop()
+        ret, msg = call(method, codes, types)
+        requests += 1
+        if ret == RET_OK:
+            continue
+        if len(codes) == 1:
+            failed[codes[0]] = str(msg)
+            continue
+        mid = len(codes) // 2
+        pending.append((codes[mid:], types))
+        pending.append((codes[:mid], types))
+
+    ordered = list(dict.fromkeys(symbols))
+    succeeded = [s for s in ordered if s not in failed]
+    logger.debug(f"{method}: {len(succeeded)} ok, {len(failed)} failed in {requests} request(s)")
+    if not failed:
+        status = 'success'
+    elif succeeded:
+        status = 'partial'
+    else:
+        status = 'failed'
+    return {'status': status, 'succeeded': succeeded, 'failed': failed}
+
+
+class _Entry:
+    """One (symbol, sub_type) subscription held on the primary connection"""
+
+    def __init__(self, subscribed_at: float):
+        self.refs: dict[str, int] = {}
+        self.subscribed_at = subscribed_at
+        self.last_used = subscribed_at
+
+    @property
+    def ref_count(self) -> int:
+        return sum(self.refs.values())
+
+
+class SubscriptionManager:
+    """Server-side registry of OpenD subscriptions
+
+    Tracks every (symbol, sub_type) pair subscribed through the primary quote
+    connection. Explicit ``subscribe`` calls are reference counted per client,
+    and real-time tools call ``ensure`` to subscribe on demand. When a new
+    subscription would push usage above ``high_watermark`` of the quota, the
+    least recently used unreferenced pairs are unsubscribed, skipping any
+    subscribed less than ``min_hold`` seconds ago since OpenD refuses to
+    unsubscribe those. ``query_subscription`` is used to reconcile the
+    registry and the quota with OpenD every ``reconcile_interval`` seconds.
+    ``on_removed(symbol, sub_type)`` is called whenever a pair stops being subscribed.
+    """
+
+    def __init__(self, call: Callable[..., tuple[int, Any]], quota: int = 0,
+                 high_watermark: float = 0.9, min_hold: float = 60.0,
+                 reconcile_interval: float = 60.0,
+                 on_removed: Callable[[str, str], None] | None = None):
+        self._call = call
+        self._on_removed = on_removed
+        self.quota = quota
+        self.high_watermark = high_watermark
+        self.min_hold = min_hold
+        self.reconcile_interval = reconcile_interval
+        self.used = 0
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._lock = threading.RLock()
+        self._last_reconcile = 0.0
+        self.auto_subscribed = 0
+        self.evicted = 0
+
+    def reconcile(self) -> tuple[int, Any]:
+        """Sync the registry and quota usage with OpenD"""
+        with self._lock:
+            ret, data = self._call('query_subscription', is_all_conn=False)
+            if ret != RET_OK:
+                logger.warning(f"query_subscription failed: {data}")
+                return ret, data
+            now = time.monotonic()
+            actual = {(code, sub_type)
+                      for sub_type, codes in data.get('sub_list', {}).items()
+                      for code in codes}
+            for key in list(self._entries):
+                if key not in actual:
+                    self._remove(key)
+            for key in actual:
+                self._entries.setdefault(key, _Entry(now))
+            self.used = data['total_used']
+            if not self.quota:
+                self.quota = data['total_used'] + data['remain']
+            self._last_reconcile = now
+            return RET_OK, data
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        del self._entries[key]
+        if self._on_removed is not None:
+            self._on_removed(*key)
+
+    def _maybe_reconcile(self) -> None:
+        if time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+            self.reconcile()
+
+    def _make_room(self, needed: int) -> None:
+        if not self.quota:
+            return
+        excess = self.used + needed - int(self.quota * self.high_watermark)
+        if excess <= 0:
+            return
+        now = time.monotonic()
+        candidates = sorted(
+            ((key, entry) for key, entry in self._entries.items()
+             if entry.ref_count == 0 and now - entry.subscribed_at >= self.min_hold),
+            key=lambda item: item[1].last_used
+        )[:excess]
+        if not candidates:
+            logger.warning(f"Subscription quota nearly full ({self.used}/{self.quota}), "
+                           f"nothing evictable")
+            return
+        by_type: dict[str, list[str]] = {}
+        for (symbol, sub_type), _ in candidates:
+            by_type.setdefault(sub_type, []).append(symbol)
+        for sub_type, symbols in by_type.items():
+            result = run_batches(self._call, 'unsubscribe', symbols, [sub_type])
+            for symbol in result['succeeded']:
+                self._remove((symbol, sub_type))
+                self.used -= 1
+                self.evicted += 1
+        logger.info(f"Evicted {len(candidates)} idle subscription(s), "
+                    f"quota {self.used}/{self.quota}")
+
+    def _subscribe_missing(self, pairs: list[tuple[str, str]]) -> tuple[int, dict[str, str]]:
+        """Subscribe pairs not yet in the registry, grouped by identical subtype sets
+
+        Returns:
+            (number of pairs subscribed, failed symbols with their error)
+        """
+        missing: dict[str, list[str]] = {}
+        for symbol, sub_type in pairs:
+            if (symbol, sub_type) not in self._entries and sub_type not in missing.get(symbol, []):
+                missing.setdefault(symbol, []).append(sub_type)
+        failed: dict[str, str] = {}
+        added = 0
+        if not missing:
+            return added, failed
+        self._make_room(sum(len(types) for types in missing.values()))
+        groups: dict[tuple[str, ...], list[str]] = {}
+        for symbol, types in missing.items():
+            groups.setdefault(tuple(types), []).append(symbol)
+        now = time.monotonic()
+        for types, symbols in groups.items():
+            result = run_batches(self._call, 'subscribe', symbols, list(types))
+            for symbol in result['succeeded']:
+                for sub_type in types:
+                    self._entries[(symbol, sub_type)] = _Entry(now)
+                    self.used += 1
+                    added += 1
+            failed.update(result['failed'])
+        if failed:
+            # Quota or permission errors usually mean our view is stale
+            self._last_reconcile = 0.0
+        return added, failed
+
+    def ensure(self, symbols: list[str], sub_types: list[str]) -> tuple[int, str]:
+        """Make sure symbols are subscribed before a real-time read
+
+        Returns:
+            (RET_OK, '') or (RET_ERROR, message naming the symbols that failed)
+        """
+        ret, msg = validate_subscription(symbols, sub_types)
+        if ret != RET_OK:
+            return ret, msg
+        with self._lock:
+            self._maybe_reconcile()
+            pairs = [(symbol, sub_type) for symbol in symbols for sub_type in sub_types]
+            added, failed = self._subscribe_missing(pairs)
+            self.auto_subscribed += added
+            now = time.monotonic()
+            for key in pairs:
+                if key in self._entries:
+                    self._entries[key].last_used = now
+        if failed:
+            return RET_ERROR, '; '.join(f'{symbol}: {msg}' for symbol, msg in failed.items())
+        return RET_OK, ''
+
+    def touch(self, symbols: list[str], sub_types: list[str]) -> None:
+        """Mark pairs as recently used when a read is served without calling ``ensure``"""
+        now = time.monotonic()
+        for symbol in symbols:
+            for sub_type in sub_types:
+                entry = self._entries.get((symbol, sub_type))
+                if entry is not None:
+                    entry.last_used = now
+
+    def acquire(self, client: str, symbols: list[str], sub_types: list[str]) -> dict[str, Any]:
+        """Explicitly subscribe on behalf of a client, adding one reference per pair"""
+        with self._lock:
+            self._maybe_reconcile()
+            pairs = [(symbol, sub_type) for symbol in dict.fromkeys(symbols)
+                     for sub_type in dict.fromkeys(sub_types)]
+            _, failed = self._subscribe_missing(pairs)
+            now = time.monotonic()
+            for key in pairs:
+                entry = self._entries.get(key)
+                if entry is not None and key[0] not in failed:
+                    entry.refs[client] = entry.refs.get(client, 0) + 1
+                    entry.last_used = now
+        return self._result(symbols, failed)
+
+    def release(self, client: str, symbols: list[str], sub_types: list[str]) -> dict[str, Any]:
+        """Drop a client's references and unsubscribe pairs nobody else holds
+
+        Pairs still inside OpenD's minimum hold time stay subscribed without
+        references and are evicted later when quota is needed.
+        """
+        failed: dict[str, str] = {}
+        with self._lock:
+            now = time.monotonic()
+            releasable: dict[str, list[str]] = {}
+            for symbol in dict.fromkeys(symbols):
+                for sub_type in dict.fromkeys(sub_types):
+                    entry = self._entries.get((symbol, sub_type))
+                    if entry is None:
+                        continue
+                    if entry.refs.get(client):
+                        entry.refs[client] -= 1
+                        if not entry.refs[client]:
+                            del entry.refs[client]
+                    if entry.ref_count == 0 and now - entry.subscribed_at >= self.min_hold:
+                        releasable.setdefault(sub_type, []).append(symbol)
+            for sub_type, codes in releasable.items():
+                result = run_batches(self._call, 'unsubscribe', codes, [sub_type])
+                for symbol in result['succeeded']:
+                    self._remove((symbol, sub_type))
+                    self.used -= 1
+                failed.update(result['failed'])
+        return self._result(symbols, failed)
+
+    @staticmethod
+    def _result(symbols: list[str], failed: dict[str, str]) -> dict[str, Any]:
+        ordered = list(dict.fromkeys(symbols))
+        succeeded = [s for s in ordered if s not in failed]
+        status = 'success' if not failed else ('partial' if succeeded else 'failed')
+        return {'status': status, 'succeeded': succeeded, 'failed': failed}
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'quota': self.quota,
+                'used': self.used,
+                'tracked': len(self._entries),
+                'referenced': sum(1 for e in self._entries.values() if e.ref_count),
+                'auto_subscribed': self.auto_subscribed,
+                'evicted': self.evicted,
+            }
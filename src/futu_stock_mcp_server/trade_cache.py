@@ -0,0 +1,154 @@
+import threading
+import time
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+from futu import RET_OK, TradeDealHandlerBase, TradeOrderHandlerBase
+from loguru import logger
+
+# Trade queries whose results only change when orders change or fill
+ORDER_SENSITIVE = frozenset({'accinfo_query', 'acctradinginfo_query'})
+DEAL_SENSITIVE = ORDER_SENSITIVE | {'position_list_query'}
+
+Scope = tuple[str, str]
+
+
+class TradeStateCache:
+    """Account state (funds, positions, max power) cached until a trade push says it changed
+
+    Entries are keyed on ``(market, trd_env, method, arguments)``. Order
+    pushes drop the cached funds and max power of their market and
+    environment, because a new, changed or cancelled order moves frozen
+    cash. Deal pushes drop positions as well. Only the affected queries are
+    fetched again on the next read. ``ttl`` bounds staleness when pushes do
+    not arrive, e.g. for changes made outside OpenD's push scope. A TTL of 0
+    disables caching.
+
+    A fetch that started before an invalidation of its scope is not stored,
+    so a slow query cannot put back state older than the push.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._generations: dict[Scope, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.pushes = {'order': 0, 'deal': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def key(market: str, trd_env: str, method: str, args: Iterable[Any] = (),
+            kwargs: dict[str, Any] | None = None) -> tuple:
+        return (market, str(trd_env), method, tuple(args), tuple(sorted((kwargs or {}).items())))
+
+    def generation(self, market: str, trd_env: str) -> int:
+        return self._generations.get((market, str(trd_env)), 0)
+
+    def get(self, key: tuple) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, value: Any, generation: int) -> None:
+        """Store a fetched value unless its scope was invalidated since ``generation`` was read"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._generations.get(key[:2], 0) == generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, market: str, trd_env: str | None = None,
+                   methods: Iterable[str] = DEAL_SENSITIVE) -> int:
+        """Drop cached queries of a market (and environment, when given), returns entries dropped"""
+        methods = frozenset(methods)
+        with self._lock:
+            scopes = [s for s in self._generations if s[0] == market and trd_env in (None, s[1])]
+            if trd_env is not None and (market, str(trd_env)) not in scopes:
+                scopes.append((market, str(trd_env)))
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+            stale = [k for k in self._entries
+                     if k[0] == market and (trd_env is None or k[1] == str(trd_env))
+                     and k[2] in methods]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += 1
+        return len(stale)
+
+    def on_trade_push(self, kind: str, market: str, data: Any) -> None:
+        """Invalidate what an order or deal push may have changed"""
+        self.pushes[kind] += 1
+        methods = DEAL_SENSITIVE if kind == 'deal' else ORDER_SENSITIVE
+        envs = {str(env) for env in data['trd_env']} if 'trd_env' in data else {None}
+        for env in envs:
+            dropped = self.invalidate(market, env, methods)
+            logger.debug(f"Trade {kind} push for {market}/{env} invalidated "
+                         f"{dropped} cached entries")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'ttl': self.ttl,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            'invalidations': self.invalidations,
+            'pushes': dict(self.pushes),
+        }
+
+
+class _OrderHandler(TradeOrderHandlerBase):
+    def __init__(self, cache: TradeStateCache, market: str):
+        super().__init__()
+        self.cache = cache
+        self.market = market
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, data = super().on_recv_rsp(rsp_pb)
+        if ret == RET_OK:
+            self.on_push(data)
+        return ret, data
+
+    def on_push(self, data):
+        self.cache.on_trade_push('order', self.market, data)
+
+
+class _DealHandler(TradeDealHandlerBase):
+    def __init__(self, cache: TradeStateCache, market: str):
+        super().__init__()
+        self.cache = cache
+        self.market = market
+
+    def on_recv_rsp(self, rsp_pb):
+        ret, data = super().on_recv_rsp(rsp_pb)
+        if ret == RET_OK:
+            self.on_push(data)
+        return ret, data
+
+    def on_push(self, data):
+        self.cache.on_trade_push('deal', self.market, data)
+
+
+def register_trade_handlers(ctx: Any, cache: TradeStateCache, market: str) -> Any:
+    """Attach order and deal push handlers that invalidate ``cache`` to a trade context"""
+    ctx.set_handler(_OrderHandler(cache, market))
+    ctx.set_handler(_DealHandler(cache, market))
+    logger.debug(f"Registered trade push handlers on {market} trade context {id(ctx)}")
+    return ctx
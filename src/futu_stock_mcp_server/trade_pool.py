@@ -0,0 +1,112 @@
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from futu import RET_ERROR, RET_OK
+from loguru import logger
+
+TradeKey = tuple[str, str]
+
+
+class _Entry:
+    __slots__ = ('ctx', 'accounts', 'created', 'calls')
+
+    def __init__(self, ctx: Any, accounts: int):
+        self.ctx = ctx
+        self.accounts = accounts
+        self.created = time.time()
+        self.calls = 0
+
+
+class TradeContextPool:
+    """Trade contexts keyed on (trade market, security firm), created on first use
+
+    OpenSecTradeContext only sees the accounts of one trade market and
+    connects synchronously in its constructor. Every key therefore gets its
+    own context, and creation holds a per-key lock only. Contexts for
+    different markets connect concurrently, and a slow market does not
+    block calls to one that is already connected. A new context must list
+    at least one account before it is used. A context that fails that check
+    is closed, and the next call retries. The trading environment (REAL or
+    SIMULATE) is a parameter of each query, so both share a context.
+
+    Args:
+        factory: ``factory(market, security_firm)`` creating a connected trade context
+    """
+
+    def __init__(self, factory: Callable[[str, str], Any]):
+        self._factory = factory
+        self._entries: dict[TradeKey, _Entry] = {}
+        self._locks: dict[TradeKey, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self.created = 0
+        self.failures = 0
+
+    def _lock(self, key: TradeKey) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, market: str, security_firm: str) -> tuple[int, Any]:
+        """Return the context for a market and firm, connecting it if needed (blocking)
+
+        Returns:
+            (RET_OK, context) or (RET_ERROR, error message)
+        """
+        key = (market.upper(), security_firm)
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock(key):
+                entry = self._entries.get(key)
+                if entry is None:
+                    ret, created = self._create(key)
+                    if ret != RET_OK:
+                        return ret, created
+                    entry = self._entries[key] = created
+        entry.calls += 1
+        return RET_OK, entry.ctx
+
+    def _create(self, key: TradeKey) -> tuple[int, Any]:
+        market, security_firm = key
+        started = time.monotonic()
+        ctx = None
+        try:
+            ctx = self._factory(market, security_firm)
+            ret, data = ctx.get_acc_list()
+            if ret != RET_OK:
+                raise RuntimeError(f"Failed to get account list: {data}")
+            if data is None or len(data) == 0:
+                raise RuntimeError("No trading accounts available")
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Trade connection {market}/{security_firm} not created: {str(e)}")
+            if ctx is not None:
+                self._close(key, ctx)
+            return RET_ERROR, f"Failed to initialize {market} trade connection: {str(e)}"
+        self.created += 1
+        logger.info(f"Trade connection {market}/{security_firm} ready with {len(data)} account(s) "
+                    f"in {time.monotonic() - started:.2f}s")
+        return RET_OK, _Entry(ctx, len(data))
+
+    @staticmethod
+    def _close(key: TradeKey, ctx: Any) -> None:
+        try:
+            ctx.close()
+        except Exception as e:
+            logger.error(f"Error closing trade context {key[0]}/{key[1]}: {str(e)}")
+
+    def close(self) -> None:
+        with self._guard:
+            entries, self._entries = self._entries, {}
+        for key, entry in entries.items():
+            self._close(key, entry.ctx)
+        if entries:
+            logger.info(f"Closed {len(entries)} trade context(s)")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'contexts': {f'{market}/{firm}': {'accounts': entry.accounts, 'calls': entry.calls}
+                         for (market, firm), entry in list(self._entries.items())},
+            'created': self.created,
+            'failures': self.failures,
+        }
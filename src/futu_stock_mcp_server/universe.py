@@ -0,0 +1,278 @@
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from futu import RET_ERROR, RET_OK
+from loguru import logger
+
+# Snapshot columns kept as text; every other numeric column becomes a float64 array
+TEXT_FIELDS = ('code', 'name', 'update_time')
+
+Fetcher = Callable[..., tuple[int, Any]]
+
+
+class SnapshotTable:
+    """Columnar market snapshot: one NumPy array per field, one row per security
+
+    Numeric fields are float64 with NaN for missing values, so filters and
+    sorts run as vectorized array operations over the whole market.
+    ``change_rate`` (percent) and ``change_val`` are derived from
+    ``last_price`` and ``prev_close_price`` when OpenD does not send them.
+    """
+
+    def __init__(self, market: str, columns: dict[str, np.ndarray], updated_at: float):
+        self.market = market
+        self.columns = columns
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_frame(cls, market: str, frame: pd.DataFrame,
+                   updated_at: float | None = None) -> 'SnapshotTable':
+        columns = {}
+        for field in frame.columns:
+            values = frame[field]
+            if field in TEXT_FIELDS:
+                columns[field] = values.astype(str).to_numpy(dtype=object)
+            elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                columns[field] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        last, prev = columns.get('last_price'), columns.get('prev_close_price')
+        if last is not None and prev is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if 'change_val' not in columns:
+                    columns['change_val'] = last - prev
+                if 'change_rate' not in columns:
+                    columns['change_rate'] = np.where(prev > 0, (last / prev - 1) * 100, np.nan)
+        return cls(market, columns, time.time() if updated_at is None else updated_at)
+
+    def __len__(self) -> int:
+        codes = self.columns.get('code')
+        return 0 if codes is None else len(codes)
+
+    @property
+    def numeric_fields(self) -> list[str]:
+        return [field for field, values in self.columns.items() if values.dtype != object]
+
+    def mask(self, ranges: dict[str, Sequence[float | None]] | None = None) -> np.ndarray:
+        """Rows whose fields fall inside ``{field: [min, max]}``, either bound may be None
+
+        Raises:
+            KeyError: A field is not a numeric snapshot column
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for field, bounds in (ranges or {}).items():
+            values = self._numeric(field)
+            low, high = (list(bounds) + [None, None])[:2]
+            with np.errstate(invalid='ignore'):
+                if low is not None:
+                    selected &= values >= low
+                if high is not None:
+                    selected &= values <= high
+        return selected
+
+    def select(self, ranges: dict[str, Sequence[float | None]] | None = None,
+               sort_by: str | None = None, descending: bool = True, limit: int | None = None,
+               fields: Iterable[str] | None = None) -> tuple[list[dict[str, Any]], int]:
+        """Filter, sort and cut the table
+
+        Rows with NaN in ``sort_by`` sort last. Only the first ``limit`` rows
+        are fully ordered (``argpartition`` then ``argsort``), so top-N
+        queries stay linear in the market size.
+
+        Returns:
+            Tuple of (row dicts, number of rows matching ``ranges``)
+
+        Raises:
+            KeyError: ``sort_by`` or a filter field is not a numeric snapshot column
+        """
+        index = np.flatnonzero(self.mask(ranges))
+        matched = len(index)
+        if sort_by:
+            keys = self._numeric(sort_by)[index]
+            keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+            if limit is not None and limit < len(index):
+                top = np.argpartition(keys, limit - 1)[:limit] if limit > 0 else \
+                    np.array([], dtype=np.intp)
+                index, keys = index[top], keys[top]
+            index = index[np.argsort(keys, kind='stable')]
+        if limit is not None:
+            index = index[:max(limit, 0)]
+        names = [f for f in (fields or self.columns) if f in self.columns]
+        values = {field: self.columns[field][index].tolist() for field in names}
+        rows = [{field: _clean(values[field][i]) for field in names} for i in range(len(index))]
+        return rows, matched
+
+    def _numeric(self, field: str) -> np.ndarray:
+        values = self.columns.get(field)
+        if values is None or values.dtype == object:
+            raise KeyError(f"Unknown numeric field {field}, "
+                           f"expected one of {', '.join(self.numeric_fields)}")
+        return values
+
+
+def _clean(value: Any) -> Any:
+    # NaN is not valid JSON
+    return None if isinstance(value, float) and value != value else value
+
+
+class UniverseSnapshot:
+    """Whole-market snapshot tables per market, refreshed by a background thread
+
+    Each refresh lists the market's securities (once per ``codes_max_age``
+    seconds), fetches snapshots in chunks of ``chunk_size`` codes through
+    ``snapshot`` and swaps in a new SnapshotTable, so readers always see a
+    complete table. A failed refresh keeps the previous table. Markets
+    queried before they are configured are loaded on first use and refreshed
+    from then on.
+
+    Args:
+        list_codes: ``list_codes(market)`` returning (ret, DataFrame with a ``code`` column)
+        snapshot: ``snapshot(codes)`` returning (ret, DataFrame), expected to wait for its
+            own rate limit token
+        markets: Markets refreshed from startup
+        interval: Seconds between the starts of two refreshes of a market
+    """
+
+    def __init__(self, list_codes: Fetcher, snapshot: Fetcher, markets: Iterable[str] = (),
+                 interval: float = 60.0, chunk_size: int = 400, codes_max_age: float = 86400.0):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.codes_max_age = codes_max_age
+        self._list_codes = list_codes
+        self._snapshot = snapshot
+        self._markets = list(dict.fromkeys(m.upper() for m in markets))
+        self._tables: dict[str, SnapshotTable] = {}
+        self._codes: dict[str, tuple[float, list[str]]] = {}
+        self._load_locks: dict[str, threading.Lock] = {}
+        self._attempted: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_duration: dict[str, float] = {}
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='futu-universe', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self._tables.clear()
+            self._codes.clear()
+            self._attempted.clear()
+
+    def table(self, market: str) -> SnapshotTable | None:
+        return self._tables.get(market.upper())
+
+    def load(self, market: str) -> tuple[int, Any]:
+        """Return the market's table, refreshing it now if there is none (blocking)
+
+        The market is added to the background refresh from then on.
+
+        Returns:
+            (RET_OK, SnapshotTable) or (ret, error message)
+        """
+        market = market.upper()
+        with self._lock:
+            if market not in self._markets:
+                self._markets.append(market)
+            load_lock = self._load_locks.setdefault(market, threading.Lock())
+        # Concurrent first queries wait for one refresh instead of each starting their own
+        with load_lock:
+            table = self._tables.get(market)
+            if table is not None:
+                return RET_OK, table
+            ret, data = self.refresh(market)
+        if ret != RET_OK:
+            # Do not keep retrying a market that never loaded, e.g. a mistyped one
+            with self._lock:
+                if market not in self._tables and market in self._markets:
+                    self._markets.remove(market)
+        return ret, data
+
+    def refresh(self, market: str) -> tuple[int, Any]:
+        """Fetch a full snapshot of ``market`` and swap it in (blocking)
+
+        Returns:
+            (RET_OK, SnapshotTable) or (ret, error message)
+        """
+        started = time.monotonic()
+        self._attempted[market] = time.time()
+        ret, codes = self._market_codes(market)
+        if ret != RET_OK:
+            return self._failed(market, ret, codes)
+        if not codes:
+            return self._failed(market, RET_ERROR, f'No securities listed in market {market}')
+        frames = []
+        for i in range(0, len(codes), self.chunk_size):
+            if self._stop.is_set():
+                return self._failed(market, RET_ERROR, 'Universe refresh stopped')
+            ret, frame = self._snapshot(codes[i:i + self.chunk_size])
+            if ret != RET_OK:
+                return self._failed(market, ret, frame)
+            frames.append(frame)
+        frame = pd.concat(frames, ignore_index=True)
+        table = SnapshotTable.from_frame(market, frame)
+        with self._lock:
+            self._tables[market] = table
+            self.refreshes += 1
+            self.last_duration[market] = time.monotonic() - started
+        logger.debug(f"Universe {market}: {len(table)} snapshots "
+                     f"in {self.last_duration[market]:.2f}s")
+        return RET_OK, table
+
+    def _market_codes(self, market: str) -> tuple[int, Any]:
+        listed = self._codes.get(market)
+        if listed is not None and time.time() - listed[0] < self.codes_max_age:
+            return RET_OK, listed[1]
+        ret, data = self._list_codes(market)
+        if ret != RET_OK:
+            return ret, data
+        codes = list(data['code'])
+        self._codes[market] = (time.time(), codes)
+        return RET_OK, codes
+
+    def _failed(self, market: str, ret: int, error: Any) -> tuple[int, Any]:
+        with self._lock:
+            self.failures += 1
+        logger.warning(f"Universe refresh of {market} failed: {error}")
+        return ret, error
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                markets = list(self._markets)
+            for market in markets:
+                if self._stop.is_set():
+                    return
+                if time.time() - self._attempted.get(market, 0.0) < self.interval:
+                    continue
+                try:
+                    self.refresh(market)
+                except Exception as e:
+                    self._failed(market, RET_ERROR, str(e))
+            due = [self._attempted.get(m, 0.0) + self.interval for m in markets]
+            self._stop.wait(min(max(min(due, default=0.0) - time.time(), 0.5), self.interval))
+
+    def stats(self) -> dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                'markets': {
+                    market: {
+                        'rows': len(table),
+                        'age': round(now - table.updated_at, 3),
+                        'refresh_seconds': round(self.last_duration.get(market, 0.0), 3),
+                    } for market, table in self._tables.items()
+                },
+                'refresh_interval': self.interval,
+                'refreshes': self.refreshes,
+                'failures': self.failures,
+            }
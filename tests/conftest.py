@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+import pytest
+
+# The server reads its configuration when it is imported: serve everything from the
+# fake OpenD without latency and keep the on-disk stores out of the checkout
+_data_dir = tempfile.mkdtemp(prefix='futu-mcp-tests-')
+os.environ.setdefault('FUTU_FAKE_OPEND', '1')
+os.environ.setdefault('FUTU_FAKE_LATENCY_MS', '0')
+os.environ.setdefault('FUTU_KLINE_STORE_DIR', os.path.join(_data_dir, 'kline'))
+os.environ.setdefault('FUTU_REFERENCE_DIR', os.path.join(_data_dir, 'reference'))
+
+
+@pytest.fixture(scope='session')
+def quote_server():
+    """The server module with its quote connections to the fake OpenD open"""
+    from futu_stock_mcp_server import server
+    assert server.init_quote_connection()
+    return server
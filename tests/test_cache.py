@@ -0,0 +1,39 @@
+import time
+
+from futu_stock_mcp_server.cache import TTLCache
+
+
+def test_entries_expire_after_the_ttl():
+    cache = TTLCache(ttl=0.05)
+    cache.put('HK.00700', 1)
+    assert cache.get('HK.00700') == 1
+    time.sleep(0.06)
+    assert cache.get('HK.00700') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.put_many({'HK.00700': 1, 'HK.09988': 2})
+    cache.get('HK.00700')
+    cache.put('US.AAPL', 3)
+    found, missing = cache.get_many(['HK.00700', 'HK.09988', 'US.AAPL', 'HK.00700'])
+    assert found == {'HK.00700': 1, 'US.AAPL': 3}
+    assert missing == ['HK.09988']
+    assert cache.stats()['evictions'] == 1
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = TTLCache(ttl=0)
+    cache.put('HK.00700', 1)
+    assert cache.get('HK.00700', 'missing') == 'missing'
+    assert cache.stats()['size'] == 0
+
+
+def test_invalidate():
+    cache = TTLCache(ttl=60)
+    cache.put_many({'HK.00700': 1, 'HK.09988': 2})
+    cache.invalidate('HK.00700')
+    assert cache.get_many(['HK.00700', 'HK.09988']) == ({'HK.09988': 2}, ['HK.00700'])
+    cache.invalidate()
+    assert cache.stats()['size'] == 0
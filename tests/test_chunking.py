@@ -0,0 +1,54 @@
+import asyncio
+
+from futu import RET_ERROR, RET_OK
+
+from futu_stock_mcp_server.cache import TTLCache
+
+SYMBOLS = [f'HK.{i:05d}' for i in range(1, 11)]
+
+
+def spy_on_run_quote(monkeypatch, server, fail_on=None):
+    """Record the code lists sent to OpenD, failing chunks that contain ``fail_on``"""
+    chunks = []
+    run_quote = server.run_quote
+
+    async def spy(method, codes, **kwargs):
+        chunks.append(list(codes))
+        if fail_on in codes:
+            return RET_ERROR, 'Injected error'
+        return await run_quote(method, codes, **kwargs)
+
+    monkeypatch.setattr(server, 'run_quote', spy)
+    monkeypatch.setitem(server.chunk_sizes, 'get_market_snapshot', 3)
+    return chunks
+
+
+def test_long_lists_are_split_into_chunks(quote_server, monkeypatch):
+    chunks = spy_on_run_quote(monkeypatch, quote_server)
+    ret, error, records = asyncio.run(quote_server.fetch_chunked('get_market_snapshot', SYMBOLS))
+    assert error is None
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [row['code'] for row in records] == SYMBOLS
+
+
+def test_failed_chunk_keeps_the_other_rows(quote_server, monkeypatch):
+    spy_on_run_quote(monkeypatch, quote_server, fail_on='HK.00005')
+    ret, error, records = asyncio.run(quote_server.fetch_chunked('get_market_snapshot', SYMBOLS))
+    assert ret == RET_ERROR and error == 'Injected error'
+    assert [row['code'] for row in records] == SYMBOLS[:3] + SYMBOLS[6:]
+
+
+def test_retry_only_fetches_the_failed_chunk(quote_server, monkeypatch):
+    cache = TTLCache(60)
+    spy_on_run_quote(monkeypatch, quote_server, fail_on='HK.00005')
+    fetch = quote_server.fetch_per_symbol
+    ret, error, _ = asyncio.run(fetch(cache, 'get_market_snapshot', SYMBOLS))
+    assert ret == RET_ERROR
+
+    monkeypatch.undo()
+    chunks = spy_on_run_quote(monkeypatch, quote_server)
+    ret, rows, received_at = asyncio.run(fetch(cache, 'get_market_snapshot', SYMBOLS))
+    assert ret == RET_OK
+    assert chunks == [SYMBOLS[3:6]]
+    assert [row['code'] for row in rows] == SYMBOLS
+    assert set(received_at) == set(SYMBOLS)
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from futu_stock_mcp_server.dispatch import (
+    DispatchQueueFullError,
+    DispatchTimeoutError,
+    FutuDispatcher,
+)
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = FutuDispatcher(max_workers=1, max_queue=1, timeout=1.0)
+    yield dispatcher
+    dispatcher.shutdown()
+
+
+def test_runs_calls_off_the_event_loop(dispatcher):
+    async def main():
+        return await dispatcher.run(threading.current_thread)
+
+    worker = asyncio.run(main())
+    assert worker is not threading.main_thread()
+    assert dispatcher.stats()['completed'] == 1
+
+
+def test_call_errors_propagate(dispatcher):
+    def fail():
+        raise KeyError('HK.00700')
+
+    with pytest.raises(KeyError):
+        asyncio.run(dispatcher.run(fail))
+    assert dispatcher.stats()['failed'] == 1
+
+
+def test_slow_call_times_out(dispatcher):
+    release = threading.Event()
+
+    with pytest.raises(DispatchTimeoutError, match='wait timed out after 0.05s'):
+        asyncio.run(dispatcher.run(release.wait, timeout=0.05))
+    release.set()
+    assert dispatcher.stats()['timeouts'] == 1
+
+
+def test_rejects_calls_past_the_queue_depth(dispatcher):
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        running = asyncio.ensure_future(dispatcher.run(release.wait))
+        queued = asyncio.ensure_future(dispatcher.run(ran.append, 'queued'))
+        await asyncio.sleep(0.05)
+        with pytest.raises(DispatchQueueFullError, match='append rejected'):
+            await dispatcher.run(ran.append, 'rejected')
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+    assert ran == ['queued']
+    stats = dispatcher.stats()
+    assert stats['rejected'] == 1
+    assert stats['pending'] == 0
+
+
+def test_timed_out_call_is_dropped_before_it_starts(dispatcher):
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        running = asyncio.ensure_future(dispatcher.run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(DispatchTimeoutError):
+            await dispatcher.run(ran.append, 'late', timeout=0.05)
+        assert dispatcher.stats()['queued'] == 0
+        release.set()
+        await running
+
+    asyncio.run(main())
+    time.sleep(0.05)
+    assert ran == []
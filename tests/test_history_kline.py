@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+from futu_stock_mcp_server.dispatch import (
+    DispatchQueueFullError,
+    DispatchTimeoutError,
+    FutuDispatcher,
+)
+from futu_stock_mcp_server.ratelimit import RateLimiter
+
+
+@pytest.fixture
+def throttled(quote_server, monkeypatch):
+    """A 1s call timeout and a history K-line limit of 8 per 2s: a burst of 2, then 3 pages/s"""
+    dispatcher = FutuDispatcher(max_workers=2, max_queue=4, timeout=1.0)
+    limiter = RateLimiter({'request_history_kline': (8, 2)}, max_wait=5)
+    monkeypatch.setattr(quote_server, 'dispatcher', dispatcher)
+    monkeypatch.setattr(quote_server, 'rate_limiter', limiter)
+    yield limiter
+    dispatcher.shutdown()
+
+
+def test_range_longer_than_the_burst_pages_past_the_call_timeout(quote_server, throttled):
+    # Half a year of US 5-minute bars is about 10 pages, far more than the burst of 2 and
+    # several seconds of token waits against a 1s call timeout
+    result = asyncio.run(quote_server.get_history_kline.fn(
+        'US.MSFT', 'K_5M', '2025-01-01', '2025-06-30', count=100,
+        response_format='compact', fields=['time_key']))
+    assert 'error' not in result
+    bars = len(result['rows'])
+    assert bars > 5000
+    # count no longer sets the page size: every page but the last is full
+    assert throttled.stats()['request_history_kline']['granted'] == -(-bars // 1000)
+
+
+def test_paging_stops_at_the_deadline(quote_server, throttled):
+    with pytest.raises(DispatchTimeoutError):
+        quote_server.fetch_history_kline('US.MSFT', 'K_1M', '2025-01-01', '2025-06-30',
+                                         deadline=time.monotonic() - 1)
+    assert 'request_history_kline' not in throttled.stats()
+
+
+def test_history_pages_bound_the_range(quote_server):
+    assert quote_server.history_pages('HK.00700', 'K_DAY', '2024-01-01', '2024-12-31') == 1
+    # 78 five-minute bars a day over 184 calendar days
+    assert quote_server.history_pages('US.AAPL', 'K_5M', '2025-01-01', '2025-07-03') == 15
+    with pytest.raises(ValueError):
+        quote_server.history_pages('US.AAPL', 'K_5M', '2025-01-01', 'soon')
+
+
+def test_dispatch_errors_are_returned_as_errors(quote_server, monkeypatch):
+    async def saturated(*args, **kwargs):
+        raise DispatchTimeoutError('request_history_kline timed out after 30s')
+    monkeypatch.setattr(quote_server, 'load_history_kline', saturated)
+
+    result = asyncio.run(quote_server.get_history_kline.fn(
+        'HK.00700', 'K_DAY', '2024-01-01', '2024-03-31'))
+    assert result == {'error': 'request_history_kline timed out after 30s'}
+
+    async def full(*args, **kwargs):
+        raise DispatchQueueFullError('Too many pending Futu calls, kline_store rejected')
+    monkeypatch.setattr(quote_server, 'load_history_kline', full)
+
+    result = asyncio.run(quote_server.get_technical_indicators.fn(['HK.00700'], 'K_DAY'))
+    assert result == {'error': 'HK.00700: Too many pending Futu calls, kline_store rejected'}
+
+
+def test_futu_errors_are_strings(quote_server, monkeypatch):
+    async def failed(*args, **kwargs):
+        return -1, KeyError('US.NOPE')
+    monkeypatch.setattr(quote_server, 'load_history_kline', failed)
+
+    result = asyncio.run(quote_server.get_history_kline.fn(
+        'US.NOPE', 'K_DAY', '2024-01-01', '2024-03-31'))
+    assert result == {'error': "'US.NOPE'"}
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from futu_stock_mcp_server.indicators import compute, parse_spec, stack
+from futu_stock_mcp_server.kline_store import KLINE_DTYPE
+
+
+def make_bars(closes):
+    bars = np.zeros(len(closes), dtype=KLINE_DTYPE)
+    bars['time_key'] = np.datetime64('2024-01-02') + np.arange(len(closes)).astype('timedelta64[D]')
+    bars['close'] = closes
+    bars['open'] = bars['high'] = bars['low'] = closes
+    bars['volume'] = 100
+    bars['turnover'] = np.asarray(closes) * 100
+    return bars
+
+
+def test_parse_spec_fills_defaults_as_ints():
+    assert parse_spec('macd') == ('macd', (12, 26, 9))
+    assert parse_spec('MACD:5') == ('macd', (5, 26, 9))
+    assert parse_spec('sma:50.0') == ('sma', (50,))
+    assert all(isinstance(p, int) for p in parse_spec('rsi:7')[1])
+
+
+def test_parse_spec_allows_fractional_bollinger_width():
+    assert parse_spec('bollinger:20,2.5') == ('bollinger', (20, 2.5))
+
+
+@pytest.mark.parametrize('spec', ['sma:0.5', 'sma:2.7', 'ema:0.5', 'rsi:0.5', 'rsi:0',
+                                  'macd:12,26.5,9', 'bollinger:0.5,2', 'bollinger:20,0',
+                                  'atr:1.5', 'sma:1.2.3', 'sma:1,2', 'foo:3'])
+def test_parse_spec_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_spec(spec)
+
+
+def test_compute_labels_match_the_window_used():
+    closes = np.arange(1.0, 31.0)
+    result = compute(stack([make_bars(closes)], 30), ['sma:3', 'bollinger:5,1.5'])
+    assert set(result) == {'sma_3', 'bollinger_5_1.5.mid', 'bollinger_5_1.5.upper',
+                           'bollinger_5_1.5.lower'}
+    assert result['sma_3'][0, -1] == pytest.approx(29.0)
+    assert np.isnan(result['sma_3'][0, 1])
+
+
+def test_compute_rejects_invalid_specs():
+    with pytest.raises(ValueError):
+        compute(stack([make_bars(np.ones(5))], 5), ['sma:2.7'])
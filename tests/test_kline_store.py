@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+
+from futu_stock_mcp_server.fake_opend import FakeOpenD, FakeQuoteContext
+from futu_stock_mcp_server.kline_store import KlineStore, add_range, collect_pages, subtract_ranges
+from futu_stock_mcp_server.reference import market_date
+
+CODE = 'HK.00700'
+
+
+@pytest.fixture
+def ctx():
+    ctx = FakeQuoteContext(opend=FakeOpenD())
+    yield ctx
+    ctx.close()
+
+
+@pytest.fixture
+def fetches(ctx):
+    """Fetcher for KlineStore.get that records every range it is asked for"""
+    calls = []
+
+    def fetch(start, end):
+        calls.append((start, end))
+        return collect_pages(lambda key: ctx.request_history_kline(
+            CODE, start=start, end=end, ktype='K_DAY', max_count=100, page_req_key=key))
+    fetch.calls = calls
+    return fetch
+
+
+def direct(ctx, start, end):
+    _, acc = collect_pages(lambda key: ctx.request_history_kline(
+        CODE, start=start, end=end, ktype='K_DAY', max_count=1000, page_req_key=key))
+    return acc.to_frame(CODE)
+
+
+def test_range_helpers():
+    d = market_date('HK')
+    covered = add_range([], d, d + timedelta(days=9))
+    covered = add_range(covered, d + timedelta(days=10), d + timedelta(days=12))
+    assert covered == [[d, d + timedelta(days=12)]]
+    assert subtract_ranges(d - timedelta(days=2), d + timedelta(days=14), covered) == [
+        (d - timedelta(days=2), d - timedelta(days=1)),
+        (d + timedelta(days=13), d + timedelta(days=14)),
+    ]
+
+
+def test_only_gaps_are_fetched(tmp_path, ctx, fetches):
+    store = KlineStore(str(tmp_path))
+    ret, first = store.get(CODE, 'K_DAY', 'qfq', '2024-01-01', '2024-03-31', fetches)
+    assert ret == 0 and len(first) > 50
+    assert fetches.calls == [('2024-01-01', '2024-03-31')]
+
+    ret, wider = store.get(CODE, 'K_DAY', 'qfq', '2023-12-01', '2024-05-31', fetches)
+    assert fetches.calls[1:] == [('2023-12-01', '2023-12-31'), ('2024-04-01', '2024-05-31')]
+    expected = direct(ctx, '2023-12-01', '2024-05-31')
+    assert wider['time_key'].tolist() == expected['time_key'].tolist()
+    assert wider['close'].tolist() == pytest.approx(expected['close'].tolist())
+
+    ret, inner = store.get(CODE, 'K_DAY', 'qfq', '2024-02-01', '2024-04-30', fetches)
+    assert len(fetches.calls) == 3 and store.stats()['hits'] == 1
+    assert inner['time_key'].iloc[0] >= '2024-02-01' and inner['time_key'].iloc[-1] < '2024-05-01'
+    assert store.covers(CODE, 'K_DAY', 'qfq', '2023-12-15', '2024-05-01')
+    assert not store.covers(CODE, 'K_DAY', 'qfq', '2023-11-15', '2024-05-01')
+
+
+def test_store_is_read_back_from_disk(tmp_path, fetches):
+    KlineStore(str(tmp_path)).get(CODE, 'K_DAY', 'qfq', '2024-01-01', '2024-03-31', fetches)
+    reopened = KlineStore(str(tmp_path))
+    ret, frame = reopened.get(CODE, 'K_DAY', 'qfq', '2024-01-01', '2024-03-31', fetches)
+    assert ret == 0 and len(frame) > 50
+    assert len(fetches.calls) == 1
+
+
+def test_open_trading_day_is_always_fetched(tmp_path, fetches):
+    store = KlineStore(str(tmp_path))
+    today = market_date('HK')
+    start = (today - timedelta(days=30)).isoformat()
+    store.get(CODE, 'K_DAY', 'qfq', start, today.isoformat(), fetches)
+    store.get(CODE, 'K_DAY', 'qfq', start, today.isoformat(), fetches)
+    live_start = (KlineStore.closed_until(CODE) + timedelta(days=1)).isoformat()
+    assert fetches.calls[-1] == (live_start, today.isoformat())
+    assert fetches.calls.count((live_start, today.isoformat())) == 2
@@ -0,0 +1,96 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from futu_stock_mcp_server.options import OptionChain, build_strategies, rank_strategies
+
+
+def make_chain(calls, puts, strikes=(90.0, 100.0, 110.0, 120.0), spot=100.0):
+    strikes = np.array(strikes)
+    codes = {kind: np.array([f'{kind}{k:g}' for k in strikes], dtype=object)
+             for kind in ('CALL', 'PUT')}
+    prices = {'CALL': np.array(calls, dtype=float), 'PUT': np.array(puts, dtype=float)}
+    return OptionChain('HK.00700', '2024-06-28', spot, strikes, prices, codes, 100.0)
+
+
+CHAIN = make_chain(calls=[12.0, 5.0, 2.0, 0.5], puts=[1.0, 4.0, 11.0, 20.0])
+
+
+def by_strike(rows):
+    return {tuple(row['strikes']): row for row in rows}
+
+
+def test_long_call_vertical():
+    row = by_strike(build_strategies(CHAIN, 'vertical'))[(100.0, 110.0)]
+    assert row['net_premium'] == 3.0
+    assert row['max_profit'] == 7.0 and row['max_loss'] == 3.0
+    assert row['breakevens'] == [103.0]
+    assert row['reward_risk'] == pytest.approx(7 / 3, abs=1e-4)
+    assert [leg['quantity'] for leg in row['legs']] == [1, -1]
+
+
+def test_short_vertical_mirrors_long():
+    long_row = by_strike(build_strategies(CHAIN, 'vertical'))[(100.0, 110.0)]
+    short_row = by_strike(build_strategies(CHAIN, 'vertical', side='short'))[(100.0, 110.0)]
+    assert short_row['net_premium'] == -long_row['net_premium']
+    assert short_row['max_profit'] == long_row['max_loss']
+    assert short_row['max_loss'] == long_row['max_profit']
+    assert short_row['breakevens'] == long_row['breakevens']
+
+
+def test_straddle_has_unlimited_profit_and_two_breakevens():
+    row = by_strike(build_strategies(CHAIN, 'straddle'))[(100.0, 100.0)]
+    assert row['net_premium'] == 9.0
+    assert row['max_profit'] is None and row['reward_risk'] is None
+    assert row['max_loss'] == 9.0
+    assert row['breakevens'] == [91.0, 109.0]
+    assert row['pnl_at_spot'] == -9.0
+
+
+def test_butterfly_payoff_grid():
+    rows = build_strategies(CHAIN, 'butterfly', payoff_prices=[80, 94, 100, 106, 130])
+    row = by_strike(rows)[(90.0, 100.0, 110.0)]
+    assert row['net_premium'] == 4.0
+    assert row['max_profit'] == 6.0 and row['max_loss'] == 4.0
+    assert row['breakevens'] == [94.0, 106.0]
+    assert row['payoff'] == [-4.0, 0.0, 6.0, 0.0, -4.0]
+
+
+def test_width_and_missing_prices():
+    chain = make_chain(calls=[12.0, np.nan, 2.0, 0.5], puts=[1.0, 4.0, 11.0, 20.0])
+    strikes = [row['strikes'] for row in build_strategies(chain, 'vertical')]
+    assert strikes == [[110.0, 120.0]]
+    wide = build_strategies(CHAIN, 'vertical', width=2, option_type='PUT')
+    assert [row['strikes'] for row in wide] == [[90.0, 110.0], [100.0, 120.0]]
+    with pytest.raises(ValueError):
+        build_strategies(CHAIN, 'vertical', width=0)
+    with pytest.raises(ValueError):
+        build_strategies(CHAIN, 'iron_fly')
+
+
+def test_rank_strategies():
+    rows = build_strategies(CHAIN, 'vertical')
+    assert [row['strike'] for row in rank_strategies(rows, strike_price=104)] == [105.0]
+    ranked = rank_strategies(rows, sort_by='max_profit', descending=True, limit=2)
+    assert [row['max_profit'] for row in ranked] == [8.5, 7.0]
+    with pytest.raises(ValueError):
+        rank_strategies(rows, sort_by='delta')
+
+
+def test_breakevens_are_zero_crossings_on_the_fake_chain(quote_server):
+    async def run():
+        expiries = await quote_server.get_option_expiration_date.fn('HK.00700')
+        expiry = list(expiries['strike_time'].values())[0]
+        return await quote_server.get_option_strategies.fn('HK.00700', expiry, 'condor')
+
+    result = asyncio.run(run())
+    assert 'error' not in result
+    assert any(row['breakevens'] for row in result['strategies'])
+    for row in result['strategies']:
+        for price in row['breakevens']:
+            value = 0.0
+            for leg in row['legs']:
+                diff = price - leg['strike_price']
+                value += leg['quantity'] * max(diff if leg['option_type'] == 'CALL' else -diff, 0)
+            assert value - row['net_premium'] == pytest.approx(0, abs=1e-3)
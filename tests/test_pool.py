@@ -0,0 +1,67 @@
+import pytest
+from futu import RET_OK, ContextStatus
+
+from futu_stock_mcp_server.pool import QuoteContextPool
+
+
+class StubContext:
+    def __init__(self, index):
+        self.index = index
+        self.status = ContextStatus.READY
+        self.closed = False
+
+    def get_market_state(self, codes):
+        return RET_OK, self.index
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool():
+    contexts = []
+
+    def factory():
+        contexts.append(StubContext(len(contexts)))
+        return contexts[-1]
+
+    pool = QuoteContextPool(factory, size=2, check_interval=3600, max_unhealthy_checks=3)
+    pool.start()
+    pool.contexts = contexts
+    yield pool
+    pool.close()
+
+
+def test_calls_are_spread_and_pinned_calls_use_the_primary(pool):
+    assert sorted(pool.call('get_market_state', ['HK.00700'])[1] for _ in range(4)) == [0, 0, 1, 1]
+    assert {pool.call('get_market_state', ['HK.00700'], pinned=True)[1] for _ in range(3)} == {0}
+
+
+def test_calls_avoid_disconnected_contexts(pool):
+    pool.contexts[1].status = ContextStatus.CONNECTING
+    assert {pool.call('get_market_state', ['HK.00700'])[1] for _ in range(4)} == {0}
+
+
+def test_context_dead_for_several_checks_is_replaced(pool):
+    dead = pool.contexts[1]
+    dead.status = ContextStatus.CLOSED
+    pool.check_health()
+    pool.check_health()
+    assert len(pool.contexts) == 2
+
+    pool.check_health()
+    assert len(pool.contexts) == 3
+    assert dead.closed
+    assert pool.call('get_market_state', ['HK.00700'])[1] in (0, 2)
+    assert [ctx['replacements'] for ctx in pool.stats()['contexts']] == [0, 1]
+
+
+def test_recovered_context_is_kept(pool):
+    pool.contexts[1].status = ContextStatus.CONNECTING
+    pool.check_health()
+    pool.check_health()
+    pool.contexts[1].status = ContextStatus.READY
+    pool.check_health()
+    pool.contexts[1].status = ContextStatus.CONNECTING
+    pool.check_health()
+    assert len(pool.contexts) == 2
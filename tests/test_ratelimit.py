@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from futu_stock_mcp_server.ratelimit import RateLimiter, RateLimitTimeoutError, parse_rate_limits
+
+
+def test_parse_rate_limits():
+    limits = parse_rate_limits(' get_market_snapshot=60/30, get_stock_filter=10,get_rehab=0/30,')
+    assert limits == {
+        'get_market_snapshot': (60, 30.0),
+        'get_stock_filter': (10, 30.0),
+        'get_rehab': (0, 30.0),
+    }
+    limiter = RateLimiter(limits)
+    assert limiter.limited('get_market_snapshot')
+    assert not limiter.limited('get_rehab')
+
+
+def test_budget_covers_the_refill():
+    # 60 per 30s: a burst of 15, then 1.5 tokens/s
+    limiter = RateLimiter({'request_history_kline': (60, 30)})
+    assert limiter.budget('request_history_kline', 15) == pytest.approx(10)
+    assert limiter.budget('get_market_snapshot', 15) == 0
+
+
+def test_burst_then_refill_pacing():
+    # 8 per 0.4s: a burst of 2, then 15 tokens/s
+    limiter = RateLimiter({'get_market_snapshot': (8, 0.4)})
+    start = time.monotonic()
+    waits = [limiter.acquire('get_market_snapshot') for _ in range(5)]
+    elapsed = time.monotonic() - start
+    assert waits[:2] == [0, 0]
+    assert all(wait > 0 for wait in waits[2:])
+    assert elapsed >= 3 / 15 * 0.9
+    stats = limiter.stats()['get_market_snapshot']
+    assert stats['granted'] == 5
+    assert stats['delayed'] == 3
+
+
+def test_unlimited_methods_pass_through():
+    limiter = RateLimiter({'get_market_snapshot': (4, 30)})
+    assert [limiter.acquire('get_stock_quote') for _ in range(100)] == [0] * 100
+    assert limiter.stats() == {}
+
+
+def test_interactive_waiters_are_served_before_queued_bulk_waiters():
+    # 4 per 0.3s: a burst of 1, then one token every 0.1s
+    limiter = RateLimiter({'request_history_kline': (4, 0.3)})
+    limiter.acquire('request_history_kline')
+    order = []
+    lock = threading.Lock()
+
+    def call(name, priority):
+        limiter.acquire('request_history_kline', priority)
+        with lock:
+            order.append(name)
+
+    threads = []
+    for name, priority in [('bulk-1', 'bulk'), ('bulk-2', 'bulk'),
+                           ('interactive-1', 'interactive'), ('interactive-2', 'interactive')]:
+        thread = threading.Thread(target=call, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(5)
+    assert order == ['interactive-1', 'interactive-2', 'bulk-1', 'bulk-2']
+
+
+def test_sync_and_async_callers_share_the_bucket():
+    limiter = RateLimiter({'get_market_snapshot': (4, 0.3)})
+
+    async def main():
+        first = await limiter.acquire_async('get_market_snapshot')
+        second = await limiter.acquire_async('get_market_snapshot', 'bulk')
+        third = await asyncio.to_thread(limiter.acquire, 'get_market_snapshot')
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+    assert first == 0
+    assert second > 0 and third > 0
+    assert limiter.stats()['get_market_snapshot']['granted'] == 3
+
+
+def test_waiting_past_max_wait_raises():
+    # A burst of 1, then one token every 10s
+    limiter = RateLimiter({'get_stock_filter': (4, 30)}, max_wait=0.05)
+    limiter.acquire('get_stock_filter')
+    with pytest.raises(RateLimitTimeoutError, match='get_stock_filter waited more than 0.05s'):
+        limiter.acquire('get_stock_filter')
+    with pytest.raises(RateLimitTimeoutError):
+        asyncio.run(limiter.acquire_async('get_stock_filter'))
+    assert limiter.stats()['get_stock_filter']['queued'] == 0
+
+
+def test_observer_sees_every_grant():
+    seen = []
+    limiter = RateLimiter({'get_market_snapshot': (4, 0.3)},
+                          on_wait=lambda method, priority, waited: seen.append((method, priority)))
+    limiter.acquire('get_market_snapshot')
+    limiter.acquire('get_market_snapshot', 'bulk')
+    assert seen == [('get_market_snapshot', 'interactive'), ('get_market_snapshot', 'bulk')]
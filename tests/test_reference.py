@@ -0,0 +1,67 @@
+import pandas as pd
+from futu import RET_ERROR, RET_OK
+
+from futu_stock_mcp_server.reference import ReferenceStore
+
+BASIC_INFO = pd.DataFrame({
+    'code': ['HK.00700', 'HK.09988', 'HK.03690', 'HK.00005'],
+    'name': ['Tencent', 'Alibaba', 'Meituan', 'HSBC Holdings'],
+    'lot_size': [100, 100, 100, 400],
+})
+
+
+class Fetcher:
+    def __init__(self, result=(RET_OK, BASIC_INFO)):
+        self.result = result
+        self.calls = []
+
+    def __call__(self, market, stock_type):
+        self.calls.append((market, stock_type))
+        return self.result
+
+
+def test_table_indexes():
+    _, table = ReferenceStore('', Fetcher()).get('hk')
+    assert len(table) == 4
+    assert table.get('HK.03690') == {'code': 'HK.03690', 'name': 'Meituan', 'lot_size': 100}
+    assert table.get('HK.99999') is None
+    assert table.positions(name_prefix='al') == [1]
+    assert table.positions(lot_size=100) == [0, 1, 2]
+    assert table.positions(name_prefix='h', lot_size=100) == []
+    assert [row['code'] for row in table.records(table.positions(lot_size=400))] == ['HK.00005']
+    assert table.positions() == [0, 1, 2, 3]
+
+
+def test_tables_are_fetched_once_per_day_and_reloaded_from_disk(tmp_path):
+    fetch = Fetcher()
+    store = ReferenceStore(str(tmp_path), fetch)
+    store.get('HK')
+    store.get('HK')
+    assert store.peek('HK') is not None
+    assert fetch.calls == [('HK', 'STOCK')]
+    assert (tmp_path / 'HK' / 'STOCK.json').exists()
+
+    restarted = ReferenceStore(str(tmp_path), Fetcher((RET_ERROR, 'disconnected')))
+    ret, table = restarted.get('HK')
+    assert ret == RET_OK
+    assert table.get('HK.00700')['name'] == 'Tencent'
+    assert restarted.stats()['disk_loads'] == 1
+
+
+def test_failed_fetch_is_not_cached(tmp_path):
+    fetch = Fetcher((RET_ERROR, 'disconnected'))
+    store = ReferenceStore(str(tmp_path), fetch)
+    assert store.get('US', 'ETF') == (RET_ERROR, 'disconnected')
+    assert store.peek('US', 'ETF') is None
+    fetch.result = (RET_OK, BASIC_INFO)
+    assert store.get('US', 'ETF')[0] == RET_OK
+    assert len(fetch.calls) == 2
+
+
+def test_unreadable_file_is_refetched(tmp_path):
+    (tmp_path / 'HK').mkdir()
+    (tmp_path / 'HK' / 'STOCK.json').write_text('{not json')
+    fetch = Fetcher()
+    ret, table = ReferenceStore(str(tmp_path), fetch).get('HK')
+    assert ret == RET_OK and len(table) == 4
+    assert fetch.calls == [('HK', 'STOCK')]
@@ -0,0 +1,99 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from futu_stock_mcp_server.fake_opend import FakeOpenD, FakeQuoteContext
+from futu_stock_mcp_server.kline_store import KLINE_DTYPE, collect_pages
+from futu_stock_mcp_server.resample import bucket_ends, bucket_starts, ktype_minutes, resample
+
+
+def minute_bars(day, minutes):
+    """1-minute bars stamped at the given minutes after midnight, close = minute"""
+    bars = np.zeros(len(minutes), dtype=KLINE_DTYPE)
+    bars['time_key'] = np.datetime64(day, 's') + np.asarray(minutes) * 60
+    bars['open'] = bars['close'] = bars['high'] = bars['low'] = minutes
+    bars['volume'] = 1
+    bars['turnover'] = bars['turnover_rate'] = bars['pe_ratio'] = np.nan
+    bars['last_close'] = 100.0
+    return bars
+
+
+def hk_day(day='2024-03-04'):
+    # Opening auction bar stamped at 09:30, then one bar per minute of both sessions
+    return minute_bars(day, [570] + list(range(571, 721)) + list(range(781, 961)))
+
+
+def test_ktype_minutes():
+    assert ktype_minutes('K_60M') == 60
+    assert ktype_minutes('K_DAY') is None
+    assert ktype_minutes('K_0M') is None
+
+
+def test_buckets_restart_at_each_session():
+    assert bucket_ends('HK', 60).tolist() == [630, 690, 720, 840, 900, 960]
+    assert bucket_starts('HK', 60).tolist() == [570, 630, 690, 780, 840, 900]
+    assert len(bucket_starts('US', 7)) == len(bucket_ends('US', 7))
+
+
+def test_resample_hk_hour_bars():
+    out = resample(hk_day(), 'HK', 60)
+    stamps = np.datetime_as_string(out['time_key'], unit='m')
+    assert [s[-5:] for s in stamps] == ['10:30', '11:30', '12:00', '14:00', '15:00', '16:00']
+    # The auction bar joins the first hour; volume is conserved
+    assert out['volume'].tolist() == [61, 60, 30, 60, 60, 60]
+    assert out['open'][0] == 570 and out['close'][0] == 630
+    assert out['high'][3] == 840 and out['low'][3] == 781
+    assert np.isnan(out['turnover']).all()
+
+
+def test_resample_drops_extended_hours():
+    bars = minute_bars('2024-03-04', list(range(571, 961)) + [965, 1000])
+    assert resample(bars, 'US', 30)['volume'].sum() == 390
+
+
+def test_drop_partial_leaves_out_a_cut_first_bar():
+    bars = hk_day()[20:]
+    assert resample(bars, 'HK', 60)['volume'][0] == 41
+    out = resample(bars, 'HK', 60, drop_partial=True)
+    assert len(out) == 5 and out['volume'][0] == 60
+    # A window starting on a bar boundary keeps its first bar
+    assert len(resample(hk_day()[61:], 'HK', 60, drop_partial=True)) == 5
+    assert len(resample(hk_day(), 'HK', 60, drop_partial=True)) == 6
+
+
+def fake_history(ctx, code, ktype, day):
+    _, acc = collect_pages(lambda key: ctx.request_history_kline(
+        code, start=day, end=day, ktype=ktype, max_count=1000, page_req_key=key))
+    return acc.array
+
+
+@pytest.mark.parametrize('code, ktype', [('HK.00700', 'K_60M'), ('HK.00700', 'K_15M'),
+                                         ('US.AAPL', 'K_30M'), ('SH.600519', 'K_5M')])
+def test_resampled_bars_line_up_with_native_ones(code, ktype):
+    ctx = FakeQuoteContext(opend=FakeOpenD())
+    try:
+        minute = fake_history(ctx, code, 'K_1M', '2024-03-04')
+        native = fake_history(ctx, code, ktype, '2024-03-04')
+    finally:
+        ctx.close()
+    out = resample(minute, code.split('.')[0], ktype_minutes(ktype))
+    assert out['time_key'].tolist() == native['time_key'].tolist()
+    assert out['volume'].sum() == minute['volume'].sum()
+    assert (out['high'] >= np.fmax(out['open'], out['close'])).all()
+
+
+def test_cur_kline_resamples_only_when_the_minutes_cover_the_request(quote_server):
+    async def run():
+        await quote_server.get_cur_kline.fn('HK.00700', 'K_1M', 10)
+        before = quote_server.resampled['cur']
+        hours = await quote_server.get_cur_kline.fn('HK.00700', 'K_60M', 100)
+        after_hours = quote_server.resampled['cur']
+        fives = await quote_server.get_cur_kline.fn('HK.00700', 'K_5M', 20)
+        return before, hours, after_hours, fives, quote_server.resampled['cur']
+
+    before, hours, after_hours, fives, after_fives = asyncio.run(run())
+    # 100 hour bars need 6000 minutes, more than OpenD returns: served natively in full
+    assert len(hours['kline_list']) == 100 and after_hours == before
+    assert after_fives == before + 1
+    assert len(fives['kline_list']) == 20
@@ -0,0 +1,38 @@
+import math
+
+import pandas as pd
+
+from futu_stock_mcp_server.serialize import (
+    compact_frame,
+    compact_records,
+    shape_levels,
+    shape_records,
+)
+
+
+def test_compact_records_ignores_unknown_fields():
+    records = [{'code': 'HK.00700', 'last_price': 300.0}, {'code': 'US.AAPL', 'volume': 5}]
+    result = compact_records(records, ['volume', 'nope', 'code', 'volume'])
+    assert result == {'columns': ['volume', 'code'], 'rows': [[None, 'HK.00700'], [5, 'US.AAPL']]}
+
+
+def test_compact_records_matches_compact_frame():
+    records = [{'code': 'HK.00700', 'last_price': math.nan}, {'code': 'US.AAPL', 'last_price': 1.5}]
+    fields = ['last_price', 'missing']
+    assert compact_records(records, fields) == compact_frame(pd.DataFrame(records), fields)
+    assert compact_records(records) == compact_frame(pd.DataFrame(records))
+
+
+def test_shape_records_projects_default_format():
+    records = [{'code': 'HK.00700', 'last_price': 300.0}]
+    assert shape_records(records, fields=['last_price', 'nope']) == [{'last_price': 300.0}]
+    assert shape_records(records) is records
+
+
+def test_shape_levels_names_tuple_columns():
+    levels = [(10.0, 100, 2, {}), (9.9, 200, 1, {})]
+    assert shape_levels(levels) is levels
+    assert shape_levels(levels, fields=['volume', 'price']) == [{'volume': 100, 'price': 10.0},
+                                                                {'volume': 200, 'price': 9.9}]
+    compact = {'columns': ['price'], 'rows': [[10.0], [9.9]]}
+    assert shape_levels(levels, 'compact', ['price']) == compact
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from futu_stock_mcp_server.singleflight import SingleFlight, call_key
+
+
+def test_call_key_drops_none_and_sorts_keys():
+    assert call_key('t', {'b': 1, 'a': None, 'c': [2, 1]}) == call_key('t', {'c': [2, 1], 'b': 1})
+    assert call_key('t', {'c': [1, 2]}) != call_key('t', {'c': [2, 1]})
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'result'
+
+    async def run():
+        return await asyncio.gather(*(flights.do('key', fetch, {'caller': i}) for i in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [r[0] for r in results] == ['result'] * 5
+    assert [r[1] for r in results] == [False, True, True, True, True]
+    assert all(r[2] == {'caller': 0} for r in results)
+    assert flights.stats() == {'in_flight': 0, 'leaders': 1, 'coalesced': 4, 'coalesced_ratio': 0.8}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    async def run():
+        await asyncio.gather(flights.do('a', fetch), flights.do('b', fetch))
+        return await flights.do('a', fetch)
+
+    assert asyncio.run(run())[0] == 3
+    assert flights.stats()['coalesced'] == 0
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('boom')
+
+    async def run():
+        calls = [flights.do('key', fail) for _ in range(3)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_caller_does_not_cancel_the_call():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def run():
+        first = asyncio.ensure_future(flights.do('key', fetch))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flights.do('key', fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run())[0] == 'done'
@@ -0,0 +1,129 @@
+from futu import RET_ERROR, RET_OK
+
+from futu_stock_mcp_server.subscription import SubscriptionManager, plan_batches, run_batches
+
+SYMBOLS = [f'HK.{i:05d}' for i in range(1, 12)]
+
+
+class FakeOpenD:
+    """Subscription side of OpenD: a quota, unknown codes and a request log"""
+
+    def __init__(self, quota=10, unknown=()):
+        self.quota = quota
+        self.unknown = set(unknown)
+        self.subs = set()
+        self.requests = []
+
+    def __call__(self, method, *args, **kwargs):
+        if method == 'query_subscription':
+            sub_list = {}
+            for code, sub_type in sorted(self.subs):
+                sub_list.setdefault(sub_type, []).append(code)
+            return RET_OK, {'sub_list': sub_list, 'total_used': len(self.subs),
+                            'remain': self.quota - len(self.subs)}
+        codes, sub_types = args
+        self.requests.append((method, list(codes)))
+        unknown = [code for code in codes if code in self.unknown]
+        if unknown:
+            return RET_ERROR, f'Unknown stock {unknown[0]}'
+        pairs = {(code, sub_type) for code in codes for sub_type in sub_types}
+        if method == 'unsubscribe':
+            self.subs -= pairs
+        elif len(self.subs | pairs) > self.quota:
+            return RET_ERROR, 'Subscription quota exceeded'
+        else:
+            self.subs |= pairs
+        return RET_OK, None
+
+    def codes(self):
+        return sorted(code for code, _ in self.subs)
+
+
+def test_plan_batches_caps_pairs_per_request():
+    symbols = [f'HK.{i:05d}' for i in range(150)]
+    batches = plan_batches(symbols + symbols[:10], ['QUOTE', 'K_1M', 'K_DAY'])
+    assert [(len(codes), types) for codes, types in batches] == [
+        (100, ['QUOTE']), (50, ['QUOTE']),
+        (50, ['K_1M', 'K_DAY']), (50, ['K_1M', 'K_DAY']), (50, ['K_1M', 'K_DAY']),
+    ]
+
+
+def test_failed_batches_are_bisected_down_to_the_bad_symbols():
+    opend = FakeOpenD(quota=100, unknown={'HK.00003', 'HK.00006'})
+    result = run_batches(opend, 'subscribe', SYMBOLS[:8], ['QUOTE'])
+    assert result['status'] == 'partial'
+    assert result['failed'] == {'HK.00003': 'Unknown stock HK.00003',
+                                'HK.00006': 'Unknown stock HK.00006'}
+    assert result['succeeded'] == [s for s in SYMBOLS[:8] if s not in result['failed']]
+    assert opend.codes() == result['succeeded']
+    assert opend.requests[0] == ('subscribe', SYMBOLS[:8])
+
+
+def test_quota_evicts_least_recently_used_unreferenced_pairs():
+    opend = FakeOpenD(quota=10)
+    removed = []
+    manager = SubscriptionManager(opend, quota=10, high_watermark=0.9, min_hold=0,
+                                  on_removed=lambda symbol, sub_type: removed.append(symbol))
+    for symbol in SYMBOLS[:9]:
+        assert manager.ensure([symbol], ['QUOTE']) == (RET_OK, '')
+    manager.touch(['HK.00001'], ['QUOTE'])
+    manager.acquire('client-a', ['HK.00002'], ['QUOTE'])
+
+    # 9 used + 2 new is past 90% of 10, so the two oldest idle pairs make room
+    assert manager.ensure(SYMBOLS[9:11], ['QUOTE']) == (RET_OK, '')
+    assert removed == ['HK.00003', 'HK.00004']
+    assert opend.codes() == sorted(set(SYMBOLS) - {'HK.00003', 'HK.00004'})
+    stats = manager.stats()
+    assert stats['used'] == 9
+    assert stats['evicted'] == 2
+    assert stats['referenced'] == 1
+    assert stats['auto_subscribed'] == 11
+
+
+def test_pairs_inside_the_minimum_hold_are_not_evicted():
+    opend = FakeOpenD(quota=10)
+    manager = SubscriptionManager(opend, quota=10, high_watermark=0.9, min_hold=60)
+    manager.ensure(SYMBOLS[:9], ['QUOTE'])
+
+    ret, msg = manager.ensure(SYMBOLS[9:11], ['QUOTE'])
+    assert ret == RET_ERROR
+    assert msg == 'HK.00011: Subscription quota exceeded'
+    assert opend.codes() == SYMBOLS[:10]
+    assert manager.stats()['evicted'] == 0
+
+
+def test_release_unsubscribes_once_no_client_holds_the_pair():
+    opend = FakeOpenD()
+    manager = SubscriptionManager(opend, quota=10, min_hold=0)
+    manager.acquire('client-a', ['HK.00001', 'HK.00002'], ['QUOTE'])
+    manager.acquire('client-b', ['HK.00001'], ['QUOTE'])
+
+    assert manager.release('client-a', ['HK.00001', 'HK.00002'], ['QUOTE'])['status'] == 'success'
+    assert opend.codes() == ['HK.00001']
+    manager.release('client-b', ['HK.00001'], ['QUOTE'])
+    assert opend.subs == set()
+    assert manager.stats()['tracked'] == 0
+
+
+def test_release_inside_the_minimum_hold_keeps_the_pair_for_later_eviction():
+    opend = FakeOpenD()
+    manager = SubscriptionManager(opend, quota=10, min_hold=60)
+    manager.acquire('client-a', ['HK.00001'], ['QUOTE'])
+    manager.release('client-a', ['HK.00001'], ['QUOTE'])
+    assert opend.codes() == ['HK.00001']
+    assert manager.stats()['referenced'] == 0
+
+
+def test_reconcile_adopts_the_quota_and_drops_pairs_opend_forgot():
+    opend = FakeOpenD(quota=20)
+    removed = []
+    manager = SubscriptionManager(opend, on_removed=lambda symbol, sub_type: removed.append(symbol))
+    manager.ensure(['HK.00001', 'HK.00002'], ['QUOTE'])
+    assert manager.stats()['quota'] == 20
+
+    opend.subs.discard(('HK.00002', 'QUOTE'))
+    opend.subs.add(('HK.00003', 'QUOTE'))
+    manager.reconcile()
+    assert removed == ['HK.00002']
+    assert manager.stats()['used'] == 2
+    assert manager.stats()['tracked'] == 2
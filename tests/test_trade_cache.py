@@ -0,0 +1,100 @@
+import asyncio
+import functools
+
+import pandas as pd
+import pytest
+
+from futu_stock_mcp_server import server
+from futu_stock_mcp_server.fake_opend import FakeOpenD, FakeTradeContext
+from futu_stock_mcp_server.trade_cache import TradeStateCache
+
+
+def cache_with(*methods, trd_env='REAL'):
+    cache = TradeStateCache(ttl=30)
+    for method in methods:
+        key = cache.key('HK', trd_env, method)
+        cache.put(key, method, cache.generation('HK', trd_env))
+    return cache
+
+
+def test_order_push_only_drops_funds_and_max_power():
+    cache = cache_with('accinfo_query', 'acctradinginfo_query', 'position_list_query')
+    cache.on_trade_push('order', 'HK', pd.DataFrame({'trd_env': ['REAL']}))
+    assert cache.get(cache.key('HK', 'REAL', 'accinfo_query')) is None
+    assert cache.get(cache.key('HK', 'REAL', 'acctradinginfo_query')) is None
+    assert cache.get(cache.key('HK', 'REAL', 'position_list_query')) == 'position_list_query'
+
+
+def test_deal_push_drops_positions_of_its_environment_only():
+    cache = cache_with('position_list_query')
+    simulated = cache.key('HK', 'SIMULATE', 'position_list_query')
+    cache.put(simulated, 'simulated', cache.generation('HK', 'SIMULATE'))
+    cache.on_trade_push('deal', 'HK', pd.DataFrame({'trd_env': ['REAL']}))
+    assert cache.get(cache.key('HK', 'REAL', 'position_list_query')) is None
+    assert cache.get(simulated) == 'simulated'
+    assert cache.stats()['pushes'] == {'order': 0, 'deal': 1}
+
+
+def test_result_fetched_before_a_push_is_not_stored():
+    cache = TradeStateCache(ttl=30)
+    key = cache.key('HK', 'REAL', 'position_list_query')
+    generation = cache.generation('HK', 'REAL')
+    cache.on_trade_push('deal', 'HK', pd.DataFrame({'trd_env': ['REAL']}))
+    cache.put(key, 'stale', generation)
+    assert cache.get(key) is None
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = cache_with('accinfo_query')
+    assert cache.get(cache.key('HK', 'REAL', 'accinfo_query')) == 'accinfo_query'
+    disabled = TradeStateCache(ttl=0)
+    key = disabled.key('HK', 'REAL', 'accinfo_query')
+    disabled.put(key, 'value', 0)
+    assert disabled.get(key) is None
+
+
+@pytest.fixture
+def opend(monkeypatch):
+    opend = FakeOpenD()
+    monkeypatch.setattr(server, 'TradeContext', functools.partial(FakeTradeContext, opend=opend))
+    server.close_trade_connection()
+    yield opend
+    server.close_trade_connection()
+
+
+def positions():
+    result = asyncio.run(server.get_positions.fn(['HK'], response_format='compact',
+                                                 fields=['code', 'qty']))
+    return dict(result['rows'])
+
+
+def cash():
+    result = asyncio.run(server.get_funds.fn(['HK'], response_format='compact', fields=['cash']))
+    return result['rows'][0][0]
+
+
+def test_fill_push_invalidates_cached_positions_and_funds(opend):
+    before, funds = positions(), cash()
+    assert positions() == before and cash() == funds
+    assert opend.calls['position_list_query'] == 1 and opend.calls['accinfo_query'] == 1
+
+    code = next(iter(before))
+    _, ctx = server.trade_pool.get('HK', server.security_firm)
+    ctx.fill(code, 100)
+    after = positions()
+    assert after[code] == before[code] + 100
+    assert cash() < funds
+    assert opend.calls['position_list_query'] == 2 and opend.calls['accinfo_query'] == 2
+
+
+def test_max_power_at_the_snapshot_price_is_cached(quote_server, opend):
+    for _ in range(3):
+        result = asyncio.run(server.get_max_power.fn('HK.00001'))
+        assert 'error' not in result
+    assert opend.calls['acctradinginfo_query'] == 1
+    asyncio.run(server.get_max_power.fn('HK.00001', price=10.0))
+    assert opend.calls['acctradinginfo_query'] == 2
+    _, ctx = server.trade_pool.get('HK', server.security_firm)
+    ctx.fill('HK.00001', 100)
+    asyncio.run(server.get_max_power.fn('HK.00001'))
+    assert opend.calls['acctradinginfo_query'] == 3
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from futu import RET_ERROR, RET_OK
+
+from futu_stock_mcp_server.trade_pool import TradeContextPool
+
+
+class StubTradeContext:
+    def __init__(self, market, accounts=1, connect_seconds=0.0):
+        time.sleep(connect_seconds)
+        self.market = market
+        self.accounts = accounts
+        self.closed = False
+
+    def get_acc_list(self):
+        return RET_OK, [{'acc_id': i} for i in range(self.accounts)]
+
+    def close(self):
+        self.closed = True
+
+
+def test_one_context_per_market_created_on_first_use():
+    created = []
+
+    def factory(market, firm):
+        created.append((market, firm))
+        return StubTradeContext(market)
+
+    pool = TradeContextPool(factory)
+    ret, hk = pool.get('hk', 'FUTUSECURITIES')
+    assert ret == RET_OK and hk.market == 'HK'
+    assert pool.get('HK', 'FUTUSECURITIES') == (RET_OK, hk)
+    pool.get('US', 'FUTUSECURITIES')
+    assert created == [('HK', 'FUTUSECURITIES'), ('US', 'FUTUSECURITIES')]
+    assert pool.stats()['contexts']['HK/FUTUSECURITIES'] == {'accounts': 1, 'calls': 2}
+
+    pool.close()
+    assert hk.closed
+    assert pool.stats()['contexts'] == {}
+
+
+def test_context_without_accounts_is_closed_and_retried():
+    contexts = []
+
+    def factory(market, firm):
+        contexts.append(StubTradeContext(market, accounts=len(contexts)))
+        return contexts[-1]
+
+    pool = TradeContextPool(factory)
+    ret, msg = pool.get('HK', 'FUTUSECURITIES')
+    assert ret == RET_ERROR
+    assert msg == 'Failed to initialize HK trade connection: No trading accounts available'
+    assert contexts[0].closed
+    assert pool.get('HK', 'FUTUSECURITIES') == (RET_OK, contexts[1])
+    assert (pool.stats()['created'], pool.stats()['failures']) == (1, 1)
+
+
+def test_slow_market_does_not_block_a_connected_one():
+    pool = TradeContextPool(
+        lambda market, firm: StubTradeContext(market, connect_seconds=0.5 if market == 'US' else 0))
+    pool.get('HK', 'FUTUSECURITIES')
+    slow = threading.Thread(target=pool.get, args=('US', 'FUTUSECURITIES'))
+    slow.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    assert pool.get('HK', 'FUTUSECURITIES')[0] == RET_OK
+    assert time.monotonic() - started < 0.1
+    slow.join()
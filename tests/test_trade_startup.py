@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import threading
+import time
+
+import pytest
+
+from futu_stock_mcp_server import server
+from futu_stock_mcp_server.fake_opend import FakeOpenD, FakeTradeContext
+
+CONNECT_MS = 200
+
+
+class CountingOpenD(FakeOpenD):
+    """Fake OpenD that records how many trade contexts were connecting at the same time"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.connecting = 0
+        self.peak_connecting = 0
+        self._connect_lock = threading.Lock()
+
+    def connect(self) -> None:
+        with self._connect_lock:
+            self.connecting += 1
+            self.peak_connecting = max(self.peak_connecting, self.connecting)
+        try:
+            super().connect()
+        finally:
+            with self._connect_lock:
+                self.connecting -= 1
+
+
+@pytest.fixture
+def opend(monkeypatch):
+    opend = CountingOpenD(latency_ms=5, connect_ms=CONNECT_MS)
+    monkeypatch.setattr(server, 'TradeContext', functools.partial(FakeTradeContext, opend=opend))
+    server.close_trade_connection()
+    yield opend
+    server.close_trade_connection()
+
+
+def timed_account_list(markets):
+    started = time.perf_counter()
+    result = asyncio.run(server.get_account_list.fn(markets=markets))
+    return result, time.perf_counter() - started
+
+
+def test_first_call_only_waits_for_the_connect(opend):
+    result, elapsed = timed_account_list(['HK'])
+    assert 'error' not in result and result['acc_id']
+    # Connect plus two 5ms queries; the fixed sleep that used to follow the connect was 1s alone
+    assert elapsed < CONNECT_MS / 1000 + 0.3
+    assert opend.calls['get_acc_list'] == 2
+
+
+def test_later_calls_reuse_the_context(opend):
+    timed_account_list(['HK'])
+    _, elapsed = timed_account_list(['HK'])
+    assert elapsed < CONNECT_MS / 1000
+    assert server.trade_pool.stats()['contexts']['HK/FUTUSECURITIES']['calls'] >= 2
+
+
+def test_markets_connect_concurrently(opend):
+    markets = ['HK', 'US', 'CN']
+    result, elapsed = timed_account_list(markets)
+    assert 'error' not in result and 'failed_markets' not in result
+    assert opend.peak_connecting == len(markets)
+    # One connect for all markets rather than one per market
+    assert elapsed < 2 * CONNECT_MS / 1000
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from futu import RET_ERROR, RET_OK
+
+from futu_stock_mcp_server.universe import SnapshotTable, UniverseSnapshot
+
+SNAPSHOT = pd.DataFrame({
+    'code': ['HK.00700', 'HK.09988', 'HK.03690', 'HK.00005'],
+    'name': ['Tencent', 'Alibaba', 'Meituan', 'HSBC Holdings'],
+    'last_price': [400.0, 80.0, None, 60.0],
+    'prev_close_price': [380.0, 90.0, 120.0, 60.0],
+    'volume': [1000, 3000, 2000, 4000],
+    'suspension': [False, False, True, False],
+})
+
+
+def test_change_rate_is_derived_and_missing_values_are_none():
+    table = SnapshotTable.from_frame('HK', SNAPSHOT)
+    assert 'suspension' not in table.columns
+    rows, matched = table.select(fields=['code', 'change_rate'])
+    assert matched == 4
+    assert rows[0]['change_rate'] == pytest.approx(400 / 380 * 100 - 100)
+    assert rows[2] == {'code': 'HK.03690', 'change_rate': None}
+
+
+def test_select_filters_sorts_and_limits():
+    table = SnapshotTable.from_frame('HK', SNAPSHOT)
+    rows, matched = table.select({'last_price': [70, None]}, sort_by='volume', limit=1,
+                                 fields=['code'])
+    assert (rows, matched) == ([{'code': 'HK.09988'}], 2)
+    rows, _ = table.select(sort_by='last_price', descending=False, fields=['code'])
+    # NaN sorts last either way
+    assert [row['code'] for row in rows] == ['HK.00005', 'HK.09988', 'HK.00700', 'HK.03690']
+    with pytest.raises(KeyError):
+        table.select(sort_by='name')
+
+
+def test_refresh_fetches_in_chunks_and_keeps_the_last_table_on_failure():
+    chunks = []
+
+    def snapshot(codes):
+        chunks.append(codes)
+        if fail:
+            return RET_ERROR, 'disconnected'
+        return RET_OK, SNAPSHOT[SNAPSHOT['code'].isin(codes)]
+
+    fail = False
+    universe = UniverseSnapshot(lambda market: (RET_OK, SNAPSHOT[['code']]), snapshot,
+                                chunk_size=3)
+    ret, table = universe.load('hk')
+    assert ret == RET_OK and len(table) == 4
+    assert [len(codes) for codes in chunks] == [3, 1]
+    assert universe.load('HK') == (RET_OK, table)
+
+    fail = True
+    assert universe.refresh('HK') == (RET_ERROR, 'disconnected')
+    assert universe.table('HK') is table
+    stats = universe.stats()
+    assert (stats['refreshes'], stats['failures']) == (1, 1)
+    assert stats['markets']['HK']['rows'] == 4
+
+
+def test_market_that_never_loads_is_not_refreshed():
+    universe = UniverseSnapshot(lambda market: (RET_ERROR, f'Unknown market {market}'),
+                                lambda codes: (RET_OK, SNAPSHOT))
+    assert universe.load('XX') == (RET_ERROR, 'Unknown market XX')
+    assert universe.table('XX') is None
+    assert universe.stats()['markets'] == {}